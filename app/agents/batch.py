@@ -0,0 +1,171 @@
+import asyncio
+import logging
+import uuid
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional, Set, Tuple
+from sqlalchemy import insert, update
+from app.agents.graph import graph
+from app.agents.checkpoints import ticket_config
+from app.agents.events import TICKET_ROW_COLUMNS, ticket_events, ticket_row
+from app.agents.worker import agent_log_values, discard_checkpoints, initial_state_for, renew_leases, running_tickets
+from app.core.config import settings
+from app.core.database import AsyncSessionLocal
+from app.models.sql_models import Ticket, AgentLog, TicketStatus
+
+logger = logging.getLogger(__name__)
+
+# (ticket_id, user_email, issue_description)
+BatchItem = Tuple[int, str, str]
+
+@dataclass
+class BatchJob:
+    job_id: str
+    ticket_ids: List[int]
+    done: bool = False
+    results: Optional[List[Dict[str, Any]]] = None
+    error: Optional[str] = None
+
+# Recent jobs for polling; oldest are forgotten beyond BATCH_JOB_HISTORY
+batch_jobs: "OrderedDict[str, BatchJob]" = OrderedDict()
+# Strong references so running jobs aren't garbage-collected
+_running_tasks: Set[asyncio.Task] = set()
+
+async def insert_tickets(db, tickets: List[Tuple[str, str]]) -> List[int]:
+    """
+    Inserts all tickets in one INSERT ... RETURNING, announces them on the change feed
+    and returns their ids in input order. The claim lease is set by run_batch.
+    """
+    stmt = insert(Ticket).returning(*TICKET_ROW_COLUMNS, sort_by_parameter_order=True)
+    result = await db.execute(stmt, [
+        {"user_email": email, "issue_description": description, "status": TicketStatus.PROCESSING}
+        for email, description in tickets
+    ])
+    rows = result.all()
+    await db.commit()
+    for row in rows:
+        ticket_events.created(ticket_row(*row))
+    return [row.id for row in rows]
+
+async def run_batch(items: List[BatchItem]) -> List[Dict[str, Any]]:
+    """
+    Runs every ticket through the graph with bounded concurrency, then writes all
+    AgentLog rows and status updates in bulk. A failing ticket is marked FAILED
+    without affecting the others.
+
+    The tickets count as running in this process until their outcome is written,
+    so their leases are renewed however long the batch takes.
+    """
+    ticket_ids = [ticket_id for ticket_id, _, _ in items]
+    running_tickets.update(ticket_ids)
+    try:
+        return await _run_batch(items)
+    finally:
+        running_tickets.difference_update(ticket_ids)
+
+async def _run_batch(items: List[BatchItem]) -> List[Dict[str, Any]]:
+    semaphore = asyncio.Semaphore(settings.BATCH_CONCURRENCY)
+
+    async def run_one(ticket_id: int, email: str, description: str) -> Dict[str, Any]:
+        async with semaphore:
+            # The lease restarts with the ticket's own run, not with the batch
+            try:
+                await renew_leases([ticket_id])
+            except Exception as e:
+                logger.warning("could not start batch ticket lease", extra={"ticket_id": ticket_id, "error": str(e)})
+            return await graph.ainvoke(initial_state_for(ticket_id, description),
+                                       config=ticket_config(ticket_id, email))
+
+    outcomes = await asyncio.gather(*(run_one(*item) for item in items), return_exceptions=True)
+
+    results: List[Dict[str, Any]] = []
+    status_updates: List[Dict[str, Any]] = []
+    log_rows: List[Dict[str, Any]] = []
+    for (ticket_id, _, _), outcome in zip(items, outcomes):
+        if isinstance(outcome, BaseException):
+            logger.error("batch ticket failed", extra={"ticket_id": ticket_id, "error": str(outcome)})
+            status_updates.append({"id": ticket_id, "status": TicketStatus.FAILED})
+            results.append({"ticket_id": ticket_id, "status": TicketStatus.FAILED.value, "error": str(outcome)})
+            continue
+
+        status = TicketStatus.AWAITING_REVIEW if outcome["needs_human_review"] else TicketStatus.RESOLVED
+        status_updates.append({"id": ticket_id, "status": status})
+        log_rows.append(agent_log_values(ticket_id, outcome))
+        results.append({
+            "ticket_id": ticket_id,
+            "status": status.value,
+            "category": outcome["category"],
+            "priority": outcome["priority"],
+            "final_response": outcome["draft_response"],
+        })
+
+    try:
+        await _write_outcomes(status_updates, log_rows)
+    except Exception as e:
+        logger.warning("bulk write failed, saving batch tickets one by one", extra={"tickets": len(items), "error": str(e)})
+        log_rows = await _write_outcomes_one_by_one(status_updates, log_rows, results)
+    for (ticket_id, email, description), status in zip(items, status_updates):
+        ticket_events.status_changed(ticket_row(ticket_id, email, description, status["status"]))
+    for row in log_rows:
+        await discard_checkpoints(row["ticket_id"])
+    return results
+
+async def _write_outcomes(status_updates: List[Dict[str, Any]], log_rows: List[Dict[str, Any]]):
+    async with AsyncSessionLocal() as db:
+        # Bulk UPDATE by primary key, bulk INSERT of logs
+        await db.execute(update(Ticket), status_updates)
+        if log_rows:
+            await db.execute(insert(AgentLog), log_rows)
+        await db.commit()
+
+async def _write_outcomes_one_by_one(status_updates: List[Dict[str, Any]], log_rows: List[Dict[str, Any]],
+                                     results: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """
+    Fallback for a failed bulk write: every ticket commits on its own, and one that
+    still can't be saved is marked FAILED (its checkpoint is kept for /retry).
+    Updates `status_updates` and `results` in place; returns the log rows written.
+    """
+    logs = {row["ticket_id"]: row for row in log_rows}
+    written = []
+    for status_update, result in zip(status_updates, results):
+        ticket_id = status_update["id"]
+        log_row = logs.get(ticket_id)
+        try:
+            await _write_outcomes([status_update], [log_row] if log_row else [])
+            if log_row:
+                written.append(log_row)
+            continue
+        except Exception as e:
+            logger.error("could not save batch ticket", extra={"ticket_id": ticket_id, "error": str(e)})
+            error = str(e)
+        status_update["status"] = TicketStatus.FAILED
+        result.clear()
+        result.update(ticket_id=ticket_id, status=TicketStatus.FAILED.value, error=error)
+        try:
+            await _write_outcomes([status_update], [])
+        except Exception as e:
+            logger.error("could not mark batch ticket failed", extra={"ticket_id": ticket_id, "error": str(e)})
+    return written
+
+def submit_batch_job(items: List[BatchItem]) -> BatchJob:
+    """
+    Starts `run_batch` in the background and registers the job for polling.
+    """
+    job = BatchJob(job_id=uuid.uuid4().hex, ticket_ids=[ticket_id for ticket_id, _, _ in items])
+
+    async def _run():
+        try:
+            job.results = await run_batch(items)
+        except Exception as e:
+            logger.error("batch job failed", extra={"job_id": job.job_id, "error": str(e)})
+            job.error = str(e)
+        finally:
+            job.done = True
+
+    task = asyncio.create_task(_run(), name=f"batch-{job.job_id}")
+    _running_tasks.add(task)
+    task.add_done_callback(_running_tasks.discard)
+    batch_jobs[job.job_id] = job
+    while len(batch_jobs) > settings.BATCH_JOB_HISTORY:
+        batch_jobs.popitem(last=False)
+    return job
@@ -0,0 +1,145 @@
+import json
+import os
+import re
+import shutil
+from collections import Counter, defaultdict
+from typing import Iterable, List, Optional, Tuple
+import numpy as np
+
+# Keeps compound tokens such as vpn.example.com, 0x800704cf, KB-1234 intact
+TOKEN_RE = re.compile(r"[a-z0-9]+(?:[._\-/][a-z0-9]+)*")
+SUB_TOKEN_RE = re.compile(r"[._\-/]")
+
+def tokenize(text: str) -> List[str]:
+    """
+    Lowercased tokens; compound tokens are also indexed by their parts,
+    so "vpn.example.com" matches both itself and "vpn".
+    """
+    tokens = []
+    for token in TOKEN_RE.findall(text.lower()):
+        tokens.append(token)
+        parts = SUB_TOKEN_RE.split(token)
+        if len(parts) > 1:
+            tokens.extend(p for p in parts if p)
+    return tokens
+
+class BM25Index:
+    """
+    Inverted-index BM25 over knowledge-base chunks.
+
+    Postings are stored as flat NumPy arrays (doc ids and term frequencies,
+    sliced per term via `offsets`) and written as .npy files, so a saved index
+    is memory-mapped on load instead of being read into the heap.
+    """
+
+    FILES = ("offsets.npy", "postings_docs.npy", "postings_tf.npy", "doc_lens.npy")
+
+    def __init__(self, vocab: dict, doc_ids: List[str], offsets: np.ndarray, postings_docs: np.ndarray,
+                 postings_tf: np.ndarray, doc_lens: np.ndarray, k1: float = 1.5, b: float = 0.75):
+        self.vocab = vocab
+        self.doc_ids = doc_ids
+        self.offsets = offsets
+        self.postings_docs = postings_docs
+        self.postings_tf = postings_tf
+        self.doc_lens = doc_lens
+        self.k1 = k1
+        self.b = b
+        self.avg_len = float(doc_lens.mean()) if len(doc_lens) else 0.0
+        # Length normalisation term per document, precomputed once
+        self._norm = (k1 * (1 - b + b * doc_lens / self.avg_len)).astype(np.float32) if len(doc_lens) else doc_lens
+
+    def __len__(self) -> int:
+        return len(self.doc_ids)
+
+    @classmethod
+    def build(cls, chunks: Iterable[Tuple[str, str]]) -> "BM25Index":
+        doc_ids: List[str] = []
+        doc_lens: List[int] = []
+        postings = defaultdict(list)
+        for doc_index, (chunk_id, text) in enumerate(chunks):
+            tokens = tokenize(text)
+            doc_ids.append(chunk_id)
+            doc_lens.append(len(tokens))
+            for term, tf in Counter(tokens).items():
+                postings[term].append((doc_index, tf))
+
+        vocab = {term: i for i, term in enumerate(sorted(postings))}
+        offsets = np.zeros(len(vocab) + 1, dtype=np.int64)
+        docs, tfs = [], []
+        for term, term_id in vocab.items():
+            entries = postings[term]
+            offsets[term_id + 1] = offsets[term_id] + len(entries)
+            docs.extend(d for d, _ in entries)
+            tfs.extend(tf for _, tf in entries)
+        return cls(
+            vocab, doc_ids, offsets,
+            np.asarray(docs, dtype=np.int32), np.asarray(tfs, dtype=np.float32),
+            np.asarray(doc_lens, dtype=np.float32),
+        )
+
+    def search(self, query: str, k: int) -> List[Tuple[str, float]]:
+        """
+        Returns up to k (chunk_id, score) pairs, best first.
+        """
+        n_docs = len(self.doc_ids)
+        if not n_docs:
+            return []
+        scores = np.zeros(n_docs, dtype=np.float32)
+        for term in set(tokenize(query)):
+            term_id = self.vocab.get(term)
+            if term_id is None:
+                continue
+            start, end = self.offsets[term_id], self.offsets[term_id + 1]
+            docs = self.postings_docs[start:end]
+            tf = self.postings_tf[start:end]
+            df = end - start
+            idf = np.log(1 + (n_docs - df + 0.5) / (df + 0.5))
+            scores[docs] += idf * tf * (self.k1 + 1) / (tf + self._norm[docs])
+
+        hit_count = int(np.count_nonzero(scores))
+        if not hit_count:
+            return []
+        k = min(k, hit_count)
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top])]
+        return [(self.doc_ids[i], float(scores[i])) for i in top]
+
+    def save(self, directory: str):
+        """
+        Writes the index atomically: into a temp dir, then swapped into place.
+        """
+        tmp_dir = directory + ".tmp"
+        old_dir = directory + ".old"
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+        os.makedirs(tmp_dir)
+        arrays = (self.offsets, self.postings_docs, self.postings_tf, self.doc_lens)
+        for name, array in zip(self.FILES, arrays):
+            np.save(os.path.join(tmp_dir, name), array)
+        with open(os.path.join(tmp_dir, "meta.json"), "w") as f:
+            json.dump({"vocab": self.vocab, "doc_ids": self.doc_ids, "k1": self.k1, "b": self.b}, f)
+
+        shutil.rmtree(old_dir, ignore_errors=True)
+        if os.path.exists(directory):
+            os.rename(directory, old_dir)
+        os.rename(tmp_dir, directory)
+        shutil.rmtree(old_dir, ignore_errors=True)
+
+    @classmethod
+    def load(cls, directory: str) -> Optional["BM25Index"]:
+        meta_path = os.path.join(directory, "meta.json")
+        if not os.path.exists(meta_path):
+            return None
+        with open(meta_path) as f:
+            meta = json.load(f)
+        arrays = [np.load(os.path.join(directory, name), mmap_mode="r") for name in cls.FILES]
+        return cls(meta["vocab"], meta["doc_ids"], *arrays, k1=meta["k1"], b=meta["b"])
+
+def reciprocal_rank_fusion(rankings: List[List[str]], k: int = 60) -> List[str]:
+    """
+    Fuses ranked id lists: score(id) = sum over lists of 1 / (k + rank).
+    """
+    scores = defaultdict(float)
+    for ranking in rankings:
+        for rank, doc_id in enumerate(ranking, start=1):
+            scores[doc_id] += 1.0 / (k + rank)
+    return sorted(scores, key=lambda d: (-scores[d], d))
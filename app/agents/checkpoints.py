@@ -0,0 +1,89 @@
+import logging
+import os
+from contextlib import AsyncExitStack
+from typing import Any, Dict, Optional
+from langgraph.types import StateSnapshot
+from app.agents.graph import graph
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+def thread_id_for(ticket_id: int) -> str:
+    return f"ticket-{ticket_id}"
+
+def ticket_config(ticket_id: int, user_email: str, **extra) -> Dict[str, Any]:
+    """
+    Graph run config for a ticket: one checkpoint thread per ticket.
+    """
+    return {
+        "configurable": {"thread_id": thread_id_for(ticket_id)},
+        "metadata": {"ticket_id": ticket_id, "user_email": user_email},
+        **extra,
+    }
+
+def checkpoint_backend() -> str:
+    backend = settings.CHECKPOINT_BACKEND
+    if backend == "auto":
+        return "postgres" if settings.DATABASE_URL.startswith("postgresql") else "sqlite"
+    return backend
+
+class CheckpointStore:
+    """
+    Durable checkpointer for the compiled graph, opened by the app lifespan.
+
+    After every node the run's state is saved under the ticket's thread, so a run
+    can resume from the node that didn't complete instead of repeating triage and
+    retrieval: a failed one via POST /tickets/{id}/retry, one cut short by a
+    restart once the worker pool requeues it (see WORKER_LEASE_SECONDS).
+    """
+
+    def __init__(self):
+        self._stack: Optional[AsyncExitStack] = None
+
+    @property
+    def enabled(self) -> bool:
+        return graph.checkpointer is not None
+
+    async def open(self):
+        backend = checkpoint_backend()
+        if backend == "none" or self._stack is not None:
+            return
+        stack = AsyncExitStack()
+        if backend == "postgres":
+            from langgraph.checkpoint.postgres.aio import AsyncPostgresSaver
+            # psycopg takes a plain libpq URL, not SQLAlchemy's driver-qualified one
+            conn_string = settings.DATABASE_URL.replace("postgresql+asyncpg://", "postgresql://", 1)
+            saver = await stack.enter_async_context(AsyncPostgresSaver.from_conn_string(conn_string))
+        else:
+            from langgraph.checkpoint.sqlite.aio import AsyncSqliteSaver
+            os.makedirs(os.path.dirname(settings.CHECKPOINT_SQLITE_PATH) or ".", exist_ok=True)
+            saver = await stack.enter_async_context(AsyncSqliteSaver.from_conn_string(settings.CHECKPOINT_SQLITE_PATH))
+        await saver.setup()
+        self._stack = stack
+        graph.checkpointer = saver
+        logger.info("checkpointer opened", extra={"backend": backend})
+
+    async def close(self):
+        graph.checkpointer = None
+        if self._stack is not None:
+            await self._stack.aclose()
+            self._stack = None
+
+    async def saved_run(self, config: Dict[str, Any]) -> Optional[StateSnapshot]:
+        """
+        The ticket's last checkpoint, or None if it has none.
+        `snapshot.next` names the nodes still to run (empty when the run finished).
+        """
+        if not self.enabled:
+            return None
+        snapshot = await graph.aget_state(config)
+        return snapshot if snapshot.values else None
+
+    async def discard(self, ticket_id: int):
+        """
+        Drops a ticket's checkpoints once its result is persisted.
+        """
+        if self.enabled:
+            await graph.checkpointer.adelete_thread(thread_id_for(ticket_id))
+
+checkpoints = CheckpointStore()
@@ -0,0 +1,151 @@
+import math
+import re
+from collections import Counter
+from dataclasses import dataclass
+from typing import Dict, List, Set, Tuple
+from app.core.config import settings
+from app.agents.bm25 import TOKEN_RE, tokenize
+
+# Sentence boundaries: end punctuation followed by whitespace, or a line break
+SENTENCE_RE = re.compile(r"(?<=[.!?])\s+|\s*\n+\s*")
+# Rough size of the drafter prompt around the context and query
+PROMPT_OVERHEAD_TOKENS = 80
+CHARS_PER_TOKEN = 4
+
+def estimate_tokens(text: str) -> int:
+    """
+    Cheap token estimate (~4 characters per token for English with llama tokenizers).
+    """
+    return (len(text) + CHARS_PER_TOKEN - 1) // CHARS_PER_TOKEN
+
+def split_sentences(text: str) -> List[str]:
+    return [s.strip() for s in SENTENCE_RE.split(text) if s and s.strip()]
+
+@dataclass
+class BuiltContext:
+    text: str
+    tokens: int
+    source_tokens: int  # all retrieved docs joined, before budgeting
+    chunks_used: int
+    chunks_dropped: int
+    sentences_used: int
+
+def context_budget(query: str) -> int:
+    """
+    Context tokens the drafter can spend: DRAFTER_CONTEXT_TOKENS, capped by what the
+    drafter model's window leaves after the reply, the prompt scaffold and the query.
+    """
+    window_left = (settings.DRAFTER_NUM_CTX - settings.DRAFTER_NUM_PREDICT
+                   - PROMPT_OVERHEAD_TOKENS - estimate_tokens(query))
+    return max(0, min(settings.DRAFTER_CONTEXT_TOKENS, window_left))
+
+def _words(sentence: str) -> Tuple[str, ...]:
+    return tuple(TOKEN_RE.findall(sentence.lower()))
+
+def _is_tail(words: Tuple[str, ...], tails: Dict[Tuple[str, ...], Set[str]]) -> bool:
+    """
+    Whether `words` ends a seen sentence, possibly starting mid-word.
+    """
+    if words in tails:
+        return True
+    return len(words) > 1 and any(w.endswith(words[0]) for w in tails.get(words[1:], ()))
+
+def _is_head(words: Tuple[str, ...], heads: Dict[Tuple[str, ...], Set[str]]) -> bool:
+    """
+    Whether `words` starts a seen sentence, possibly ending mid-word.
+    """
+    if words in heads:
+        return True
+    return len(words) > 1 and any(w.startswith(words[-1]) for w in heads.get(words[:-1], ()))
+
+def _dedupe_sentences(docs: List[str]) -> List[List[str]]:
+    """
+    Splits each doc into sentences and drops ones already seen in an earlier doc.
+    A chunk overlap cuts sentences at the chunk edges, so a doc's first sentence is
+    also dropped when it is the tail of a seen sentence, and its last when it is the head.
+    """
+    seen: Set[Tuple[str, ...]] = set()
+    # Word-level tails / heads of seen sentences -> the word just before / after them
+    tails: Dict[Tuple[str, ...], Set[str]] = {}
+    heads: Dict[Tuple[str, ...], Set[str]] = {}
+    chunks = []
+    for doc in docs:
+        sentences = split_sentences(doc)
+        kept = []
+        for i, sentence in enumerate(sentences):
+            words = _words(sentence)
+            if not words or words in seen:
+                continue
+            if i == 0 and _is_tail(words, tails):
+                continue
+            if i == len(sentences) - 1 and _is_head(words, heads):
+                continue
+            seen.add(words)
+            for j in range(1, len(words)):
+                tails.setdefault(words[j:], set()).add(words[j - 1])
+                heads.setdefault(words[:j], set()).add(words[j])
+            kept.append(sentence)
+        chunks.append(kept)
+    return chunks
+
+def build_context(query: str, docs: List[str], budget_tokens: int,
+                  min_relative_score: float = 0.2) -> BuiltContext:
+    """
+    Compresses retrieved docs into a prompt context of at most `budget_tokens`.
+
+    1. Sentences repeated across chunks (chunk overlap) are kept once.
+    2. Sentences are scored by the IDF-weighted query terms they contain; chunks whose
+       best sentence scores below `min_relative_score` of the best chunk are dropped
+       (the retriever's top hit is always kept).
+    3. If the rest is still over budget, the highest scoring sentences are kept,
+       in their original order.
+    """
+    source_tokens = estimate_tokens("\n\n".join(docs))
+    chunks = _dedupe_sentences(docs)
+    query_terms = set(tokenize(query))
+
+    sentence_terms = [[set(tokenize(s)) for s in chunk] for chunk in chunks]
+    df = Counter(t for chunk in sentence_terms for terms in chunk for t in terms & query_terms)
+    n_sentences = max(1, sum(len(chunk) for chunk in chunks))
+    idf = {t: math.log(1 + n_sentences / df[t]) for t in df}
+    scores = [[sum(idf[t] for t in terms & query_terms) for terms in chunk] for chunk in sentence_terms]
+
+    chunk_scores = [max(s, default=0.0) for s in scores]
+    best = max(chunk_scores, default=0.0)
+    keep = [
+        i for i, chunk in enumerate(chunks)
+        if chunk and (i == 0 or best == 0 or chunk_scores[i] >= min_relative_score * best)
+    ]
+    chunks_dropped = sum(1 for chunk in chunks if chunk) - len(keep)
+
+    # (chunk, sentence) positions, best first; retrieval rank breaks ties
+    candidates = sorted(
+        ((i, j) for i in keep for j in range(len(chunks[i]))),
+        key=lambda pos: (-scores[pos[0]][pos[1]], keep.index(pos[0]), pos[1]),
+    )
+    total = sum(estimate_tokens(chunks[i][j]) + 1 for i, j in candidates)
+    if total <= budget_tokens:
+        selected = set(candidates)
+    else:
+        selected, used = set(), 0
+        for i, j in candidates:
+            cost = estimate_tokens(chunks[i][j]) + 1
+            if used + cost > budget_tokens:
+                continue
+            selected.add((i, j))
+            used += cost
+
+    parts = []
+    for i in keep:
+        sentences = [chunks[i][j] for j in range(len(chunks[i])) if (i, j) in selected]
+        if sentences:
+            parts.append(" ".join(sentences))
+    text = "\n\n".join(parts)
+    return BuiltContext(
+        text=text,
+        tokens=estimate_tokens(text),
+        source_tokens=source_tokens,
+        chunks_used=len(parts),
+        chunks_dropped=chunks_dropped,
+        sentences_used=len(selected),
+    )
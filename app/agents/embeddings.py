@@ -0,0 +1,225 @@
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+from array import array
+from collections import OrderedDict
+from typing import Dict, List, Optional, Tuple
+from langchain_core.embeddings import Embeddings
+from langchain_community.embeddings import OllamaEmbeddings
+from app.core.config import settings
+
+# Memory hits whose disk recency is written back in one batch
+TOUCH_BATCH = 256
+
+def normalize_text(text: str) -> str:
+    """
+    Canonical form used for cache keys: case-folded, whitespace collapsed.
+    """
+    return " ".join(text.split()).casefold()
+
+def text_hash(text: str) -> str:
+    return hashlib.sha256(normalize_text(text).encode("utf-8")).hexdigest()
+
+class EmbeddingCache:
+    """
+    Two-level embedding cache keyed by (model, normalized-text hash).
+
+    Front: in-memory LRU of `memory_entries` vectors.
+    Back: SQLite file with vectors stored as raw float32 bytes, bounded to
+    `max_entries` rows; least recently used rows are evicted first. Memory hits
+    count as uses too: their access times are written back in batches, so hot
+    vectors served from memory aren't the first to leave the disk.
+    """
+
+    def __init__(self, path: str, max_entries: int, memory_entries: int):
+        self.path = path
+        self.max_entries = max_entries
+        self.memory_entries = memory_entries
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self._memory: "OrderedDict[Tuple[str, str], List[float]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._conn: Optional[sqlite3.Connection] = None
+        # Rows on disk, counted once when the file is opened and then kept up to date
+        self._rows = 0
+        self._touched: Dict[Tuple[str, str], float] = {}
+
+    def _db(self) -> sqlite3.Connection:
+        if self._conn is None:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            self._conn = sqlite3.connect(self.path, check_same_thread=False)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS embeddings ("
+                " model TEXT NOT NULL, text_hash TEXT NOT NULL, vector BLOB NOT NULL,"
+                " accessed_at REAL NOT NULL, PRIMARY KEY (model, text_hash))"
+            )
+            self._conn.execute("CREATE INDEX IF NOT EXISTS ix_embeddings_accessed ON embeddings (accessed_at)")
+            (self._rows,) = self._conn.execute("SELECT COUNT(*) FROM embeddings").fetchone()
+        return self._conn
+
+    def _flush_touched(self, db: sqlite3.Connection):
+        if self._touched:
+            db.executemany(
+                "UPDATE embeddings SET accessed_at = ? WHERE model = ? AND text_hash = ?",
+                [(at, model, h) for (model, h), at in self._touched.items()]
+            )
+            self._touched.clear()
+
+    def _remember(self, key: Tuple[str, str], vector: List[float]):
+        self._memory[key] = vector
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.memory_entries:
+            self._memory.popitem(last=False)
+
+    def get_many(self, model: str, texts: List[str]) -> Dict[int, List[float]]:
+        """
+        Returns {index: vector} for every text already cached.
+        """
+        found: Dict[int, List[float]] = {}
+        to_load: Dict[str, List[int]] = {}
+        now = time.time()
+        with self._lock:
+            for i, text in enumerate(texts):
+                key = (model, text_hash(text))
+                vector = self._memory.get(key)
+                if vector is not None:
+                    self._memory.move_to_end(key)
+                    self._touched[key] = now
+                    found[i] = vector
+                    self.hits += 1
+                else:
+                    to_load.setdefault(key[1], []).append(i)
+
+            if len(self._touched) >= TOUCH_BATCH:
+                db = self._db()
+                self._flush_touched(db)
+                if not to_load:
+                    db.commit()
+
+            if to_load:
+                db = self._db()
+                hashes = list(to_load)
+                # Stay under SQLite's bound-parameter limit
+                for start in range(0, len(hashes), 500):
+                    chunk = hashes[start:start + 500]
+                    placeholders = ",".join("?" * len(chunk))
+                    rows = db.execute(
+                        f"SELECT text_hash, vector FROM embeddings WHERE model = ? AND text_hash IN ({placeholders})",
+                        [model, *chunk]
+                    ).fetchall()
+                    for h, blob in rows:
+                        vector = array("f", blob).tolist()
+                        self._remember((model, h), vector)
+                        for i in to_load.pop(h):
+                            found[i] = vector
+                            self.hits += 1
+                            self.disk_hits += 1
+                    if rows:
+                        db.executemany(
+                            "UPDATE embeddings SET accessed_at = ? WHERE model = ? AND text_hash = ?",
+                            [(now, model, h) for h, _ in rows]
+                        )
+                db.commit()
+                self.misses += sum(len(v) for v in to_load.values())
+        return found
+
+    def put_many(self, model: str, texts: List[str], vectors: List[List[float]]):
+        now = time.time()
+        rows = []
+        with self._lock:
+            for text, vector in zip(texts, vectors):
+                h = text_hash(text)
+                self._remember((model, h), list(vector))
+                rows.append((model, h, array("f", vector).tobytes(), now))
+            db = self._db()
+            inserted = db.executemany("INSERT OR IGNORE INTO embeddings VALUES (?, ?, ?, ?)", rows).rowcount
+            if inserted < len(rows):
+                # Some were already stored: refresh those in place
+                db.executemany(
+                    "UPDATE embeddings SET vector = ?, accessed_at = ? WHERE model = ? AND text_hash = ?",
+                    [(blob, at, m, h) for m, h, blob, at in rows]
+                )
+            self._rows += inserted
+            # Recency of memory hits must be on disk before choosing what to evict
+            self._flush_touched(db)
+            self._evict(db)
+            db.commit()
+
+    def _evict(self, db: sqlite3.Connection):
+        overflow = self._rows - self.max_entries
+        if overflow > 0:
+            deleted = db.execute(
+                "DELETE FROM embeddings WHERE rowid IN "
+                "(SELECT rowid FROM embeddings ORDER BY accessed_at LIMIT ?)",
+                (overflow,)
+            ).rowcount
+            self._rows -= deleted
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "hits": self.hits,
+            "disk_hits": self.disk_hits,
+            "misses": self.misses,
+            "memory_entries": len(self._memory),
+        }
+
+    def close(self):
+        with self._lock:
+            if self._conn is not None:
+                self._flush_touched(self._conn)
+                self._conn.commit()
+                self._conn.close()
+                self._conn = None
+
+class CachedEmbeddings(Embeddings):
+    """
+    LangChain `Embeddings` wrapper that consults the cache before calling the model.
+    Only cache misses are sent to the underlying embedder, in a single batch.
+    """
+
+    def __init__(self, underlying: Embeddings, model: str, cache: EmbeddingCache):
+        self.underlying = underlying
+        self.model = model
+        self.cache = cache
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        found = self.cache.get_many(self.model, texts)
+        missing = [i for i in range(len(texts)) if i not in found]
+        if missing:
+            # Embed each distinct text once even if it repeats within the batch
+            unique = list(dict.fromkeys(texts[i] for i in missing))
+            vectors = self.underlying.embed_documents(unique)
+            self.cache.put_many(self.model, unique, vectors)
+            by_text = dict(zip(unique, vectors))
+            for i in missing:
+                found[i] = by_text[texts[i]]
+        return [found[i] for i in range(len(texts))]
+
+    def embed_query(self, text: str) -> List[float]:
+        # Query and document embeddings may use different instructions, so key them apart
+        key = f"{self.model}#query"
+        found = self.cache.get_many(key, [text])
+        if 0 in found:
+            return found[0]
+        vector = self.underlying.embed_query(text)
+        self.cache.put_many(key, [text], [vector])
+        return vector
+
+embedding_cache = EmbeddingCache(
+    path=settings.EMBEDDING_CACHE_PATH,
+    max_entries=settings.EMBEDDING_CACHE_MAX_ENTRIES,
+    memory_entries=settings.EMBEDDING_CACHE_MEMORY_ENTRIES,
+)
+
+# Shared, cache-backed Ollama embedder used for both ingestion and retrieval
+embedder = CachedEmbeddings(
+    OllamaEmbeddings(base_url=settings.OLLAMA_BASE_URL, model=settings.OLLAMA_EMBEDDING_MODEL),
+    model=settings.OLLAMA_EMBEDDING_MODEL,
+    cache=embedding_cache,
+)
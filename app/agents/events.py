@@ -0,0 +1,110 @@
+import asyncio
+import uuid
+from collections import deque
+from contextlib import asynccontextmanager
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Any, AsyncIterator, Deque, Dict, List, Optional, Set
+from app.core.config import settings
+from app.models.sql_models import Ticket, TicketStatus
+
+# Selected (or RETURNING'd) to build a ticket_row
+TICKET_ROW_COLUMNS = (Ticket.id, Ticket.user_email, Ticket.issue_description, Ticket.status, Ticket.created_at)
+
+@dataclass
+class TicketEvent:
+    seq: int
+    type: str  # "created" or "status"
+    ticket: Dict[str, Any]
+
+# Queued to a subscriber that fell too far behind: it must re-sync from the REST API
+RESET = TicketEvent(seq=0, type="reset", ticket={})
+
+def ticket_row(ticket_id: int, user_email: str, issue_description: str, status: TicketStatus,
+               created_at: Optional[datetime] = None) -> Dict[str, Any]:
+    """
+    Same shape as a GET /tickets item (created_at may be unknown on bulk updates).
+    """
+    return {
+        "id": ticket_id,
+        "user_email": user_email,
+        "issue_description": issue_description,
+        "status": status.value,
+        "created_at": created_at.isoformat() if created_at else None,
+    }
+
+class TicketEventBus:
+    """
+    In-process fan-out of ticket creations and status changes to the
+    GET /tickets/events subscribers (SSE), so dashboards stop re-polling the list.
+
+    Event ids are "<epoch>-<seq>", where epoch is unique per process. The last
+    TICKET_EVENTS_BUFFER events are kept so a reconnecting client can resume
+    from its Last-Event-ID. When the gap can't be replayed (too old, or the
+    server restarted) the client is told to reset. A client whose queue
+    overflows gets the same signal.
+    """
+
+    def __init__(self, buffer_size: int, queue_size: int):
+        self.epoch = uuid.uuid4().hex[:8]
+        self.queue_size = queue_size
+        self._seq = 0
+        self._buffer: Deque[TicketEvent] = deque(maxlen=buffer_size)
+        self._subscribers: Set[asyncio.Queue] = set()
+
+    def event_id(self, event: TicketEvent) -> str:
+        return f"{self.epoch}-{event.seq}"
+
+    @property
+    def last_id(self) -> str:
+        return f"{self.epoch}-{self._seq}"
+
+    def publish(self, event_type: str, ticket: Dict[str, Any]):
+        self._seq += 1
+        event = TicketEvent(self._seq, event_type, ticket)
+        self._buffer.append(event)
+        for queue in self._subscribers:
+            try:
+                queue.put_nowait(event)
+            except asyncio.QueueFull:
+                # Too slow to keep up: drop its backlog and have it re-sync
+                while not queue.empty():
+                    queue.get_nowait()
+                queue.put_nowait(RESET)
+
+    def created(self, ticket: Dict[str, Any]):
+        self.publish("created", ticket)
+
+    def status_changed(self, ticket: Dict[str, Any]):
+        self.publish("status", ticket)
+
+    def replay(self, last_event_id: Optional[str]) -> Optional[List[TicketEvent]]:
+        """
+        Buffered events after `last_event_id`, or None if they can't all be replayed.
+        """
+        if not last_event_id:
+            return []
+        epoch, _, seq = last_event_id.partition("-")
+        if epoch != self.epoch or not seq.isdigit() or int(seq) > self._seq:
+            return None
+        after = int(seq)
+        if after == self._seq:
+            return []
+        if not self._buffer or self._buffer[0].seq > after + 1:
+            return None
+        return [e for e in self._buffer if e.seq > after]
+
+    @asynccontextmanager
+    async def subscribe(self) -> AsyncIterator[asyncio.Queue]:
+        queue: asyncio.Queue = asyncio.Queue(maxsize=self.queue_size)
+        self._subscribers.add(queue)
+        try:
+            yield queue
+        finally:
+            self._subscribers.discard(queue)
+
+    @property
+    def subscribers(self) -> int:
+        return len(self._subscribers)
+
+ticket_events = TicketEventBus(settings.TICKET_EVENTS_BUFFER, settings.TICKET_EVENTS_QUEUE_SIZE)
@@ -1,20 +1,25 @@
-from langgraph.graph import StateGraph, END
+from langgraph.graph import StateGraph, START, END
 from app.models.state import AgentState
-from app.agents.nodes import triage_node, research_node, drafter_node, quality_gate_node
+from app.agents.nodes import triage_node, research_node, rerank_node, drafter_node, quality_gate_node
+from app.agents.instrumentation import instrumented
 
 # 1. Initialize the Graph
 workflow = StateGraph(AgentState)
 
 # 2. Add Nodes
-workflow.add_node("triage", triage_node)
-workflow.add_node("research", research_node)
-workflow.add_node("drafter", drafter_node)
-workflow.add_node("quality_gate", quality_gate_node)
+workflow.add_node("triage", instrumented("triage", triage_node))
+workflow.add_node("research", instrumented("research", research_node))
+workflow.add_node("rerank", instrumented("rerank", rerank_node))
+workflow.add_node("drafter", instrumented("drafter", drafter_node))
+workflow.add_node("quality_gate", instrumented("quality_gate", quality_gate_node))
 
 # 3. Define Edges
-workflow.set_entry_point("triage")
-workflow.add_edge("triage", "research")
-workflow.add_edge("research", "drafter")
+# Triage and research don't depend on each other: run them in parallel and join
+# before drafting, so retrieval is off the critical path.
+workflow.add_edge(START, "triage")
+workflow.add_edge(START, "research")
+workflow.add_edge(["triage", "research"], "rerank")
+workflow.add_edge("rerank", "drafter")
 workflow.add_edge("drafter", "quality_gate")
 
 # 4. Conditional Logic
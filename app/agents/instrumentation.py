@@ -0,0 +1,78 @@
+import functools
+import logging
+import time
+from contextlib import asynccontextmanager
+from contextvars import ContextVar
+from dataclasses import asdict, dataclass
+from typing import Any, Awaitable, Callable, Dict, Optional
+from app.core.metrics import NODE_FAILURES, observe_node
+from app.agents.context import estimate_tokens
+
+logger = logging.getLogger(__name__)
+
+@dataclass
+class NodeMetrics:
+    wall_ms: float = 0.0
+    # Time spent waiting for an LLM slot (<NODE>_CONCURRENCY)
+    queue_wait_ms: float = 0.0
+    llm_calls: int = 0
+    prompt_tokens: int = 0
+    completion_tokens: int = 0
+    retrieval_hits: Optional[int] = None
+
+# Metrics of the node running in the current task; None outside an instrumented node
+_current: ContextVar[Optional[NodeMetrics]] = ContextVar("node_metrics", default=None)
+
+def record_llm_call(metadata: Dict[str, Any], prompt: str, completion: str):
+    """
+    Counts one LLM call. Uses Ollama's prompt_eval_count / eval_count when the
+    response carries them, otherwise estimates from the text.
+    """
+    metrics = _current.get()
+    if metrics is None:
+        return
+    metrics.llm_calls += 1
+    metrics.prompt_tokens += metadata.get("prompt_eval_count") or estimate_tokens(prompt)
+    metrics.completion_tokens += metadata.get("eval_count") or estimate_tokens(completion)
+
+def record_retrieval_hits(hits: int):
+    metrics = _current.get()
+    if metrics is not None:
+        metrics.retrieval_hits = hits
+
+@asynccontextmanager
+async def queued(slot):
+    """
+    `async with slot`, recording how long the node waited for it.
+    """
+    start = time.perf_counter()
+    async with slot:
+        metrics = _current.get()
+        if metrics is not None:
+            metrics.queue_wait_ms += (time.perf_counter() - start) * 1000
+        yield
+
+def instrumented(name: str, node: Callable[[Dict[str, Any]], Awaitable[Dict[str, Any]]]):
+    """
+    Wraps a graph node: times it, collects what it records, exports the numbers
+    to Prometheus and adds them to the state under `node_metrics[name]`.
+    """
+    @functools.wraps(node)
+    async def run(state: Dict[str, Any]) -> Dict[str, Any]:
+        metrics = NodeMetrics()
+        token = _current.set(metrics)
+        start = time.perf_counter()
+        try:
+            update = await node(state)
+        except Exception:
+            NODE_FAILURES.labels(name).inc()
+            raise
+        finally:
+            metrics.wall_ms = round((time.perf_counter() - start) * 1000, 2)
+            metrics.queue_wait_ms = round(metrics.queue_wait_ms, 2)
+            _current.reset(token)
+        values = asdict(metrics)
+        observe_node(name, values)
+        logger.info("node finished", extra={"node": name, "ticket_id": state.get("ticket_id"), **values})
+        return {**update, "node_metrics": {name: values}}
+    return run
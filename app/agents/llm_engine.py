@@ -1,28 +1,389 @@
-from typing import Type, Any
+import asyncio
+import hashlib
+import json
+import time
+from collections import OrderedDict
+from typing import Type, Any, AsyncIterator, Dict, Iterator, List, Optional, Tuple
+import aiohttp
+import requests
+from requests.adapters import HTTPAdapter
 from langchain_community.chat_models import ChatOllama
+from langchain_community.llms.ollama import OllamaEndpointNotFoundError
 from pydantic import BaseModel
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage, AIMessageChunk, BaseMessage
+from langchain_core.outputs import ChatGeneration, ChatGenerationChunk, ChatResult
 from langchain_core.output_parsers import JsonOutputParser
-from langchain_core.prompts import PromptTemplate
 from app.core.config import settings
+from app.agents.ollama_router import OllamaRouter
 
-def get_llm():
+class LLMCallCache:
     """
-    Returns the standard ChatOllama instance.
+    Single-flight layer plus a short-lived result cache for deterministic LLM calls.
+
+    The first caller for a key leads and calls the model; concurrent callers with
+    the same key wait on the leader's future instead of sending their own request.
+    Finished results (the leader's AIMessage, with its response metadata such as
+    Ollama's token counts) are reused for `ttl_seconds`.
+    """
+
+    def __init__(self, ttl_seconds: float, max_entries: int):
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self._results: "OrderedDict[str, Tuple[float, AIMessage]]" = OrderedDict()
+        self._inflight: Dict[str, asyncio.Future] = {}
+        self.hits = 0
+        self.coalesced = 0
+        self.misses = 0
+
+    @staticmethod
+    def key(params: Dict[str, Any], messages: List[BaseMessage], stop: Optional[List[str]], kwargs: Dict[str, Any]) -> str:
+        payload = {
+            "params": params,
+            "messages": [(m.type, m.content) for m in messages],
+            "stop": stop,
+            "kwargs": kwargs,
+        }
+        return hashlib.sha256(json.dumps(payload, sort_keys=True, default=str).encode()).hexdigest()
+
+    def claim(self, key: str) -> Tuple[str, Any]:
+        """
+        Returns ("hit", message), ("follower", future) or ("leader", None).
+        A leader must call `complete` or `fail` for the key.
+        """
+        cached = self._results.get(key)
+        if cached is not None:
+            expires_at, message = cached
+            if expires_at > time.monotonic():
+                self._results.move_to_end(key)
+                self.hits += 1
+                return "hit", message
+            del self._results[key]
+
+        future = self._inflight.get(key)
+        if future is not None:
+            self.coalesced += 1
+            return "follower", future
+
+        self.misses += 1
+        self._inflight[key] = asyncio.get_running_loop().create_future()
+        return "leader", None
+
+    def complete(self, key: str, message: AIMessage):
+        if self.ttl_seconds > 0:
+            self._results[key] = (time.monotonic() + self.ttl_seconds, message)
+            self._results.move_to_end(key)
+            while len(self._results) > self.max_entries:
+                self._results.popitem(last=False)
+        future = self._inflight.pop(key, None)
+        if future is not None and not future.done():
+            future.set_result(message)
+
+    def fail(self, key: str, error: BaseException):
+        future = self._inflight.pop(key, None)
+        if future is None or future.done():
+            return
+        if not isinstance(error, Exception):
+            # Leader was cancelled or its stream abandoned; don't cancel the followers with it
+            error = RuntimeError("LLM call abandoned by the leading request")
+        future.set_exception(error)
+        # Mark the exception retrieved so a leader without followers doesn't log a warning
+        future.exception()
+
+    def clear(self):
+        self._results.clear()
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "hits": self.hits,
+            "coalesced": self.coalesced,
+            "misses": self.misses,
+            "in_flight": len(self._inflight),
+            "entries": len(self._results),
+        }
+
+llm_cache = LLMCallCache(settings.LLM_RESULT_CACHE_TTL_SECONDS, settings.LLM_RESULT_CACHE_MAX_ENTRIES)
+
+def _shared_message(message: BaseMessage) -> AIMessage:
+    # Content plus response metadata (prompt_eval_count, eval_count, ...), which
+    # node instrumentation reads; a fresh copy for each caller
+    return AIMessage(content=message.content, response_metadata=dict(message.response_metadata or {}))
+
+def _chat_result(message: AIMessage) -> ChatResult:
+    return ChatResult(generations=[ChatGeneration(message=_shared_message(message))])
+
+class CoalescingChatModel(BaseChatModel):
+    """
+    Wraps a chat model so identical async calls (same model, params and prompt)
+    share one request and its result. Only safe for temperature=0 models.
+    The sync path is passed straight through.
+    """
+    inner: BaseChatModel
+    call_cache: Any
+
+    @property
+    def _llm_type(self) -> str:
+        return f"coalescing-{self.inner._llm_type}"
+
+    @property
+    def _identifying_params(self) -> Dict[str, Any]:
+        return dict(self.inner._identifying_params)
+
+    def _key(self, messages: List[BaseMessage], stop: Optional[List[str]], kwargs: Dict[str, Any]) -> str:
+        return self.call_cache.key(self._identifying_params, messages, stop, kwargs)
+
+    def _generate(self, messages: List[BaseMessage], stop: Optional[List[str]] = None, run_manager: Any = None, **kwargs) -> ChatResult:
+        return self.inner._generate(messages, stop=stop, **kwargs)
+
+    async def _agenerate(self, messages: List[BaseMessage], stop: Optional[List[str]] = None, run_manager: Any = None, **kwargs) -> ChatResult:
+        key = self._key(messages, stop, kwargs)
+        role, value = self.call_cache.claim(key)
+        if role == "hit":
+            return _chat_result(value)
+        if role == "follower":
+            return _chat_result(await asyncio.shield(value))
+
+        try:
+            message = _shared_message(await self.inner.ainvoke(messages, stop=stop, **kwargs))
+        except BaseException as e:
+            self.call_cache.fail(key, e)
+            raise
+        self.call_cache.complete(key, message)
+        return _chat_result(message)
+
+    async def _astream(self, messages: List[BaseMessage], stop: Optional[List[str]] = None, run_manager: Any = None, **kwargs) -> AsyncIterator[ChatGenerationChunk]:
+        key = self._key(messages, stop, kwargs)
+        role, value = self.call_cache.claim(key)
+        if role != "leader":
+            # Shared results arrive whole, as a single chunk
+            message = value if role == "hit" else await asyncio.shield(value)
+            yield ChatGenerationChunk(message=AIMessageChunk(
+                content=message.content, response_metadata=dict(message.response_metadata)
+            ))
+            return
+
+        # Chunks add up to the whole message, merging response metadata from the final one
+        full: Optional[AIMessageChunk] = None
+        try:
+            async for chunk in self.inner.astream(messages, stop=stop, **kwargs):
+                full = chunk if full is None else full + chunk
+                yield ChatGenerationChunk(message=chunk)
+        except BaseException as e:
+            self.call_cache.fail(key, e)
+            raise
+        self.call_cache.complete(key, _shared_message(full) if full is not None else AIMessage(content=""))
+
+class OllamaTransport:
+    """
+    Shared, pooled HTTP sessions toward Ollama: one aiohttp session for the async
+    path and one requests session for the sync path, so calls reuse keep-alive
+    connections instead of opening a session per request.
+
+    aiohttp sessions belong to an event loop, so the async session is recreated
+    if it is used from a different loop (e.g. between test runs).
+    """
+
+    def __init__(self, max_connections: int, connect_timeout: float, request_timeout: float, keepalive_seconds: float):
+        self.max_connections = max_connections
+        self.timeout = aiohttp.ClientTimeout(total=request_timeout, connect=connect_timeout)
+        self.sync_timeout = (connect_timeout, request_timeout)
+        self.keepalive_seconds = keepalive_seconds
+        self._session: Optional[aiohttp.ClientSession] = None
+        self._session_loop: Optional[asyncio.AbstractEventLoop] = None
+        self._sync_session: Optional[requests.Session] = None
+
+    def session(self) -> aiohttp.ClientSession:
+        loop = asyncio.get_running_loop()
+        if self._session is None or self._session.closed or self._session_loop is not loop:
+            connector = aiohttp.TCPConnector(limit=self.max_connections, keepalive_timeout=self.keepalive_seconds)
+            self._session = aiohttp.ClientSession(connector=connector, timeout=self.timeout)
+            self._session_loop = loop
+        return self._session
+
+    def sync_session(self) -> requests.Session:
+        if self._sync_session is None:
+            adapter = HTTPAdapter(pool_connections=1, pool_maxsize=self.max_connections)
+            self._sync_session = requests.Session()
+            self._sync_session.mount("http://", adapter)
+            self._sync_session.mount("https://", adapter)
+        return self._sync_session
+
+    async def close(self):
+        if self._session is not None and not self._session.closed and self._session_loop is asyncio.get_running_loop():
+            await self._session.close()
+        self._session = None
+        self._session_loop = None
+        if self._sync_session is not None:
+            self._sync_session.close()
+            self._sync_session = None
+
+ollama_transport = OllamaTransport(
+    settings.OLLAMA_MAX_CONNECTIONS,
+    settings.OLLAMA_CONNECT_TIMEOUT,
+    settings.OLLAMA_REQUEST_TIMEOUT,
+    settings.OLLAMA_KEEPALIVE_SECONDS,
+)
+
+def backend_urls() -> List[str]:
+    urls = [u.strip() for u in settings.OLLAMA_BACKENDS.split(",") if u.strip()]
+    return urls or [settings.OLLAMA_BASE_URL]
+
+ollama_router = OllamaRouter(
+    backend_urls(),
+    ollama_transport.session,
+    max_concurrency=settings.OLLAMA_BACKEND_MAX_CONCURRENCY,
+    failure_threshold=settings.OLLAMA_CIRCUIT_FAILURES,
+    cooldown=settings.OLLAMA_CIRCUIT_COOLDOWN_SECONDS,
+    max_retries=settings.OLLAMA_MAX_RETRIES,
+    probe_interval=settings.OLLAMA_HEALTH_INTERVAL_SECONDS,
+)
+
+def _raise_for_status(status: int, detail: str):
+    if status == 404:
+        raise OllamaEndpointNotFoundError("Ollama call failed with status code 404.")
+    raise ValueError(f"Ollama call failed with status code {status}. Details: {detail}")
+
+class PooledChatOllama(ChatOllama):
+    """
+    ChatOllama that sends its requests through the shared `ollama_transport`
+    instead of building a new HTTP session for every call. Async calls are
+    routed across the configured backends by `ollama_router`; `base_url` only
+    supplies the API path.
+    """
+
+    def _path(self, api_url: str) -> str:
+        return api_url[len(self.base_url):] if api_url.startswith(self.base_url) else api_url
+
+    def _request_payload(self, payload: Any, stop: Optional[List[str]], **kwargs) -> dict:
+        # Same parameter merging as ChatOllama._create_stream
+        if self.stop is not None and stop is not None:
+            raise ValueError("`stop` found in both the input and default params.")
+        elif self.stop is not None:
+            stop = self.stop
+
+        params = self._default_params
+        for key in self._default_params:
+            if key in kwargs:
+                params[key] = kwargs[key]
+        if "options" in kwargs:
+            params["options"] = kwargs["options"]
+        else:
+            params["options"] = {
+                **params["options"],
+                "stop": stop,
+                **{k: v for k, v in kwargs.items() if k not in self._default_params},
+            }
+
+        if payload.get("messages"):
+            return {"messages": payload.get("messages", []), **params}
+        return {"prompt": payload.get("prompt"), "images": payload.get("images", []), **params}
+
+    def _headers(self) -> dict:
+        return {"Content-Type": "application/json", **(self.headers if isinstance(self.headers, dict) else {})}
+
+    def _create_stream(self, api_url: str, payload: Any, stop: Optional[List[str]] = None, **kwargs) -> Iterator[str]:
+        response = ollama_transport.sync_session().post(
+            url=ollama_router.pick().url + self._path(api_url),
+            headers=self._headers(),
+            auth=self.auth,
+            json=self._request_payload(payload, stop, **kwargs),
+            stream=True,
+            timeout=self.timeout or ollama_transport.sync_timeout,
+        )
+        response.encoding = "utf-8"
+        if response.status_code != 200:
+            _raise_for_status(response.status_code, response.text)
+        return response.iter_lines(decode_unicode=True)
+
+    async def _acreate_stream(self, api_url: str, payload: Any, stop: Optional[List[str]] = None, **kwargs) -> AsyncIterator[str]:
+        # The session's pooled timeouts apply unless this client sets its own
+        overrides = {"timeout": aiohttp.ClientTimeout(total=self.timeout)} if self.timeout else {}
+        async for line in ollama_router.stream(
+            self._path(api_url),
+            headers=self._headers(),
+            auth=self.auth,
+            json=self._request_payload(payload, stop, **kwargs),
+            **overrides,
+        ):
+            yield line
+
+# Clients are built once per configuration and shared by every ticket
+_clients: Dict[Tuple, BaseChatModel] = {}
+_parsers: Dict[Type[BaseModel], Tuple[JsonOutputParser, str]] = {}
+
+# Nodes with their own model and generation limits (TRIAGE_*, DRAFTER_* settings)
+LLM_NODES = ("triage", "drafter")
+
+def node_options(node: str) -> Dict[str, Any]:
+    """
+    ChatOllama options for a graph node. An empty `<NODE>_MODEL` falls back to
+    OLLAMA_MODEL; triage uses JSON format mode so generation stops at the closing brace.
+    """
+    prefix = node.upper()
+    return {
+        "model": getattr(settings, f"{prefix}_MODEL") or settings.OLLAMA_MODEL,
+        "num_predict": getattr(settings, f"{prefix}_NUM_PREDICT"),
+        "num_ctx": getattr(settings, f"{prefix}_NUM_CTX"),
+        "format": "json" if node == "triage" else None,
+    }
+
+def get_llm(node: str = "drafter"):
+    """
+    Returns the shared ChatOllama client for a node, behind the single-flight cache.
     """
-    return ChatOllama(
-        base_url=settings.OLLAMA_BASE_URL,
-        model=settings.OLLAMA_MODEL,
-        temperature=0
-    )
+    options = node_options(node)
+    key = (node, settings.OLLAMA_BASE_URL, tuple(options.items()), settings.LLM_DEDUP_ENABLED)
+    llm = _clients.get(key)
+    if llm is None:
+        llm = PooledChatOllama(
+            base_url=settings.OLLAMA_BASE_URL,
+            temperature=0,
+            **options
+        )
+        if settings.LLM_DEDUP_ENABLED:
+            llm = CoalescingChatModel(inner=llm, call_cache=llm_cache)
+        _clients[key] = llm
+    return llm
 
-def get_structured_llm(pydantic_object: Type[BaseModel]) -> Any:
+def get_structured_llm(pydantic_object: Type[BaseModel], node: str = "triage") -> Any:
     """
     Returns a chain that enforces the Output format based on a Pydantic model.
     """
-    llm = get_llm()
-    parser = JsonOutputParser(pydantic_object=pydantic_object)
-    
-    # Simple formatting instructions
-    format_instructions = parser.get_format_instructions()
-    
+    llm = get_llm(node)
+    if pydantic_object not in _parsers:
+        parser = JsonOutputParser(pydantic_object=pydantic_object)
+        # Simple formatting instructions
+        _parsers[pydantic_object] = (parser, parser.get_format_instructions())
+    parser, format_instructions = _parsers[pydantic_object]
+
     return llm, parser, format_instructions
+
+class NodeSlots:
+    """
+    Per-node concurrency limits for LLM calls (`<NODE>_CONCURRENCY`), so short
+    triage calls never wait behind long drafter generations. (The drafter's
+    slots are handed out by priority, see `scheduler.drafter_scheduler`.) Semaphores belong
+    to an event loop and are recreated if a different loop asks for them.
+    """
+
+    def __init__(self):
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._semaphores: Dict[str, asyncio.Semaphore] = {}
+
+    def __call__(self, node: str) -> asyncio.Semaphore:
+        loop = asyncio.get_running_loop()
+        if loop is not self._loop:
+            self._loop = loop
+            self._semaphores = {}
+        if node not in self._semaphores:
+            self._semaphores[node] = asyncio.Semaphore(getattr(settings, f"{node.upper()}_CONCURRENCY"))
+        return self._semaphores[node]
+
+llm_slot = NodeSlots()
+
+async def close_llm_clients():
+    """
+    Drops the shared clients and closes the pooled HTTP sessions (app shutdown).
+    """
+    _clients.clear()
+    await ollama_transport.close()
@@ -1,112 +1,216 @@
-import chromadb
-from typing import Dict, Any
+import logging
+import time
+from typing import Callable, Dict, Any, List, Tuple
 from pydantic import BaseModel, Field
 from langchain_core.prompts import PromptTemplate
+from langchain_core.runnables import Runnable
+from langgraph.config import get_stream_writer
 from app.models.state import AgentState
-from app.agents.llm_engine import get_llm, get_structured_llm
+from app.agents.llm_engine import get_llm, get_structured_llm, llm_slot
+from app.agents.instrumentation import queued, record_llm_call, record_retrieval_hits
+from app.agents.scheduler import drafter_scheduler
+from app.agents.retriever import retriever, rerank_by_category
+from app.agents.triage import fast_triage
+from app.agents.context import build_context, context_budget, estimate_tokens
+from app.core.config import settings
+from app.core.executor import run_blocking
+
+logger = logging.getLogger(__name__)
 
 # --- Triage Models ---
 class TriageOutput(BaseModel):
     category: str = Field(description="The category of the issue (Access, Network, Billing, General)")
     priority: str = Field(description="The priority level (High, Medium, Low)")
 
+# Chunks handed to the drafter, picked from the wider candidate set research fetches
+DRAFTER_DOCS = 3
+
+# --- Prompts & Chains ---
+# Built once at import; chains are compiled per LLM client and reused across tickets.
+TRIAGE_PROMPT = PromptTemplate(
+    template="Classify the IT support ticket.\n{format_instructions}\n\nTicket: {query}\n",
+    input_variables=["query", "format_instructions"],
+)
+
+DRAFTER_PROMPT = PromptTemplate(
+    template="""You are an IT Support Agent.
+        
+        Context Guidelines:
+        {docs}
+        
+        User Query: {query}
+        
+        Draft a helpful, professional response based on the context above.
+        If the context doesn't help, politely ask for more details.
+        """,
+    input_variables=["docs", "query"]
+)
+
+_chains: Dict[str, Tuple[Any, Runnable]] = {}
+
+def _compiled_chain(name: str, llm: Any, build: Callable[[], Runnable]) -> Runnable:
+    """
+    Returns the cached chain for `name`, rebuilding it only if the LLM client changed.
+    """
+    cached = _chains.get(name)
+    if cached is None or cached[0] is not llm:
+        cached = (llm, build())
+        _chains[name] = cached
+    return cached[1]
+
 # --- Nodes ---
 
 async def triage_node(state: AgentState) -> Dict[str, Any]:
     """
-    Classifies the user query using Ollama.
+    Classifies the user query: keyword rules, then nearest-centroid over labelled
+    tickets, and only when both are unsure, Ollama.
     """
     query = state["user_query"]
+
+    # 0. Fast path
+    if settings.TRIAGE_FAST_PATH_ENABLED:
+        decision = await run_blocking(fast_triage.classify, query)
+        if decision:
+            logger.info("triage classified", extra={"tier": decision.tier, "category": decision.category,
+                                                    "priority": decision.priority})
+            return {"category": decision.category, "priority": decision.priority, "triage_tier": decision.tier}
     
-    # 1. Get LLM & Parser
-    llm, parser, format_instructions = get_structured_llm(TriageOutput)
+    # 1. Get LLM & Parser (shared clients)
+    llm, parser, format_instructions = get_structured_llm(TriageOutput, "triage")
     
-    # 2. Define Prompt
-    prompt = PromptTemplate(
-        template="Classify the IT support ticket.\n{format_instructions}\n\nTicket: {query}\n",
-        input_variables=["query"],
-        partial_variables={"format_instructions": format_instructions}
+    # 2. Reuse the compiled chain (parsed separately, to keep the reply's token counts)
+    chain = _compiled_chain(
+        "triage", llm,
+        lambda: TRIAGE_PROMPT.partial(format_instructions=format_instructions) | llm
     )
     
     # 3. Invoke Chain
-    chain = prompt | llm | parser
     try:
-        result = chain.invoke({"query": query})
-        print(f"--- [Triage Node] LLM Classified: {result} ---")
-        return {"category": result["category"], "priority": result["priority"]}
+        async with queued(llm_slot("triage")):
+            message = await chain.ainvoke({"query": query})
+        record_llm_call(message.response_metadata or {},
+                        TRIAGE_PROMPT.format(query=query, format_instructions=format_instructions), message.content)
+        result = parser.invoke(message)
+        logger.info("triage classified", extra={"tier": "llm", "category": result["category"],
+                                                "priority": result["priority"]})
+        return {"category": result["category"], "priority": result["priority"], "triage_tier": "llm"}
     except Exception as e:
-        print(f"Text classification failed: {e}")
+        logger.warning("triage classification failed, using fallback", extra={"error": str(e)})
         # Fallback
-        return {"category": "General", "priority": "Medium"}
+        return {"category": "General", "priority": "Medium", "triage_tier": "fallback"}
+
+def _query_knowledge_base(query: str) -> List[Dict[str, Any]]:
+    """
+    Blocking hybrid lookup on the shared collection, across all categories.
+    Must be called through `run_blocking`.
+    """
+    chunks = retriever.search(query, n_results=settings.RETRIEVAL_CANDIDATES)
+    return [{"text": c.text, "category": c.category} for c in chunks]
 
 async def research_node(state: AgentState) -> Dict[str, Any]:
     """
-    Queries local ChromaDB for relevant documents.
+    Queries local ChromaDB for candidate documents. Runs alongside triage, so it
+    can't filter by category; `rerank_node` does that once both have finished.
     """
-    category = state["category"]
     query = state["user_query"]
     
-    print(f"--- [Research Node] Searching for: {query} (Category: {category}) ---")
+    logger.info("research searching", extra={"query": query})
     
     try:
-        # Initialize Chroma Client (Persistent)
-        # Use settings for path to ensure consistency with ingestion script
-        from app.core.config import settings
-        client = chromadb.PersistentClient(path=settings.CHROMA_DB_PATH)
-        collection = client.get_or_create_collection(name="tech_docs")
-        
-        # Query
-        results = collection.query(
-            query_texts=[query],
-            n_results=3
-        )
-        
-        # Parse Results
-        documents = results['documents'][0] if results['documents'] else []
-        if not documents:
-            documents = ["No specific knowledge base article found."]
+        # Vector search is synchronous; keep it off the event loop
+        candidates = await run_blocking(_query_knowledge_base, query)
+        record_retrieval_hits(len(candidates))
+        if not candidates:
+            candidates = [{"text": "No specific knowledge base article found.", "category": None}]
             
     except Exception as e:
-        print(f"RAG lookup failed: {e}")
-        documents = ["Error connecting to knowledge base."]
+        logger.warning("knowledge base lookup failed", extra={"error": str(e)})
+        candidates = [{"text": "Error connecting to knowledge base.", "category": None}]
+
+    return {"candidate_docs": candidates}
 
+async def rerank_node(state: AgentState) -> Dict[str, Any]:
+    """
+    Joins triage and research: keeps the candidates in the triaged category.
+    """
+    documents = rerank_by_category(state["candidate_docs"], state.get("category"), DRAFTER_DOCS)
+    record_retrieval_hits(len(documents))
+    logger.info("rerank kept candidates", extra={"kept": len(documents), "candidates": len(state["candidate_docs"]),
+                                                 "category": state.get("category")})
     return {"retrieved_docs": documents}
 
+def _token_writer() -> Callable[[Any], None]:
+    try:
+        return get_stream_writer()
+    except RuntimeError:
+        # Called outside a graph run (scripts, tests): nobody to stream to
+        return lambda _: None
+
+def _drafter_context(query: str, docs: List[str]) -> str:
+    if not settings.CONTEXT_COMPRESSION_ENABLED:
+        return "\n\n".join(docs)
+    context = build_context(query, docs, context_budget(query), settings.CONTEXT_MIN_RELATIVE_SCORE)
+    logger.info("drafter context built", extra={
+        "source_tokens": context.source_tokens, "context_tokens": context.tokens, "chunks_used": context.chunks_used,
+        "chunks_dropped": context.chunks_dropped, "sentences_used": context.sentences_used,
+    })
+    return context.text
+
 async def drafter_node(state: AgentState) -> Dict[str, Any]:
     """
-    Generates a response using the LLM and retrieved docs.
+    Generates a response using the LLM and a budgeted context built from the retrieved docs.
+    Records the prompt size and prefill time (time to the first token).
+    Generations are admitted by the ticket's priority; under overload Low tickets get no draft.
     """
     query = state["user_query"]
+    priority = state.get("priority")
+    if drafter_scheduler.should_shed(priority):
+        logger.warning("drafter overloaded, sending ticket to review without a draft",
+                       extra={"ticket_id": state.get("ticket_id"), "priority": priority,
+                              "waiting": drafter_scheduler.waiting()})
+        return {"draft_response": "", "shed": True}
+
     docs = state["retrieved_docs"]
-    docs_text = "\n\n".join(docs)
-    
-    llm = get_llm()
-    
-    prompt = PromptTemplate(
-        template="""You are an IT Support Agent.
-        
-        Context Guidelines:
-        {docs}
-        
-        User Query: {query}
-        
-        Draft a helpful, professional response based on the context above.
-        If the context doesn't help, politely ask for more details.
-        """,
-        input_variables=["docs", "query"]
-    )
+    docs_text = _drafter_context(query, docs)
+    # Estimate; replaced by Ollama's prompt_eval_count when it reports one
+    prompt_tokens = estimate_tokens(DRAFTER_PROMPT.format(docs=docs_text, query=query))
+    prefill_ms = None
+    completion_tokens = None
     
-    chain = prompt | llm
+    llm = get_llm("drafter")
+    chain = _compiled_chain("drafter", llm, lambda: DRAFTER_PROMPT | llm)
     
     try:
-        response_msg = chain.invoke({"docs": docs_text, "query": query})
-        # Langchain ChatModel returns a Message object, usually .content is the string
-        draft = response_msg.content if hasattr(response_msg, 'content') else str(response_msg)
+        # Stream tokens so SSE callers see the draft as it is generated;
+        # the writer is a no-op when the graph isn't run in "custom" stream mode.
+        writer = _token_writer()
+        parts = []
+        async with queued(drafter_scheduler.slot(priority)):
+            start = time.perf_counter()
+            async for chunk in chain.astream({"docs": docs_text, "query": query}):
+                # Langchain ChatModel yields Message chunks, usually .content is the string
+                token = chunk.content if hasattr(chunk, 'content') else str(chunk)
+                if token:
+                    if prefill_ms is None:
+                        prefill_ms = (time.perf_counter() - start) * 1000
+                    parts.append(token)
+                    writer({"token": token})
+                metadata = getattr(chunk, "response_metadata", None) or {}
+                if metadata.get("prompt_eval_count"):
+                    prompt_tokens = metadata["prompt_eval_count"]
+                if metadata.get("prompt_eval_duration"):
+                    prefill_ms = metadata["prompt_eval_duration"] / 1e6
+                if metadata.get("eval_count"):
+                    completion_tokens = metadata["eval_count"]
+        draft = "".join(parts)
+        record_llm_call({"prompt_eval_count": prompt_tokens, "eval_count": completion_tokens}, "", draft)
     except Exception as e:
-        draft = f"Error generating response: {e}"
+        # Fail the run: triage and research are checkpointed, so a retry resumes here
+        logger.error("drafter generation failed", extra={"error": str(e)})
+        raise
         
-    print(f"--- [Drafter Node] Generated draft ---")
-    return {"draft_response": draft}
+    logger.info("drafter generated draft", extra={"prompt_tokens": prompt_tokens, "prefill_ms": prefill_ms})
+    return {"draft_response": draft, "prompt_tokens": prompt_tokens, "prefill_ms": prefill_ms}
 
 async def quality_gate_node(state: AgentState) -> Dict[str, Any]:
     """
@@ -115,7 +219,10 @@ async def quality_gate_node(state: AgentState) -> Dict[str, Any]:
     draft = state["draft_response"]
     
     # Simple heuristic
-    if "Error" in draft or "No specific" in draft:
+    if state.get("shed"):
+        # No draft to check: a human answers from the retrieved docs
+        confidence = 0.0
+    elif "Error" in draft or "No specific" in draft:
         confidence = 0.4
     else:
         confidence = 0.9
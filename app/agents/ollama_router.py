@@ -0,0 +1,214 @@
+import asyncio
+import logging
+import time
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Callable, Dict, List, Optional, Set
+import aiohttp
+import requests
+from app.core.executor import run_blocking
+
+logger = logging.getLogger(__name__)
+
+class NoBackendAvailable(RuntimeError):
+    pass
+
+class BackendResponseError(RuntimeError):
+    def __init__(self, status: int, detail: str):
+        super().__init__(f"Ollama call failed with status code {status}. Details: {detail}")
+        self.status = status
+
+def probe_ollama(base_url: str, timeout: float = 2.0) -> List[str]:
+    """
+    Lists the models an Ollama host serves via `/api/tags`; raises if it is unreachable.
+    """
+    resp = requests.get(f"{base_url}/api/tags", timeout=timeout)
+    resp.raise_for_status()
+    return [m['name'] for m in resp.json().get('models', [])]
+
+class OllamaBackend:
+    """
+    One Ollama host: a concurrency cap, a circuit breaker and latency counters.
+    """
+
+    def __init__(self, url: str, max_concurrency: int):
+        self.url = url.rstrip("/")
+        self.max_concurrency = max_concurrency
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+        self.in_flight = 0
+        self.waiting = 0
+        self.healthy = True
+        self.consecutive_failures = 0
+        self.open_until = 0.0
+        self.half_open_trial = False
+        self.requests = 0
+        self.failures = 0
+        self.latency_ewma: Optional[float] = None
+
+    @property
+    def outstanding(self) -> int:
+        return self.in_flight + self.waiting
+
+    def circuit_state(self, now: float) -> str:
+        if not self.open_until:
+            return "closed"
+        return "open" if now < self.open_until else "half_open"
+
+    def available(self, now: float) -> bool:
+        if not self.healthy:
+            return False
+        state = self.circuit_state(now)
+        # Half-open: a single trial request decides whether the circuit closes
+        return state == "closed" or (state == "half_open" and not self.half_open_trial)
+
+    @asynccontextmanager
+    async def slot(self):
+        self.waiting += 1
+        try:
+            await self._semaphore.acquire()
+        finally:
+            self.waiting -= 1
+        self.in_flight += 1
+        try:
+            yield
+        finally:
+            self.in_flight -= 1
+            self._semaphore.release()
+
+    def record_success(self, elapsed: float):
+        self.requests += 1
+        self.consecutive_failures = 0
+        self.open_until = 0.0
+        self.half_open_trial = False
+        self.latency_ewma = elapsed if self.latency_ewma is None else 0.8 * self.latency_ewma + 0.2 * elapsed
+
+    def record_failure(self, failure_threshold: int, cooldown: float):
+        self.requests += 1
+        self.failures += 1
+        self.consecutive_failures += 1
+        self.half_open_trial = False
+        if self.consecutive_failures >= failure_threshold:
+            self.open_until = time.monotonic() + cooldown
+
+    def stats(self, now: float) -> Dict[str, Any]:
+        return {
+            "url": self.url,
+            "healthy": self.healthy,
+            "circuit": self.circuit_state(now),
+            "in_flight": self.in_flight,
+            "queue_depth": self.waiting,
+            "max_concurrency": self.max_concurrency,
+            "requests": self.requests,
+            "failures": self.failures,
+            "latency_ms": round(self.latency_ewma * 1000, 1) if self.latency_ewma is not None else None,
+        }
+
+class OllamaRouter:
+    """
+    Spreads LLM calls over several Ollama hosts.
+
+    Each call goes to the available backend with the fewest outstanding requests
+    (in flight plus queued on its concurrency cap). A backend whose calls keep
+    failing has its circuit opened for `cooldown` seconds; a failed call is retried
+    on another backend as long as nothing has been streamed to the caller yet.
+    A background task probes `/api/tags` and takes unreachable hosts out of rotation.
+    """
+
+    def __init__(self, urls: List[str], session_factory: Callable[[], aiohttp.ClientSession],
+                 max_concurrency: int = 4, failure_threshold: int = 3, cooldown: float = 30.0,
+                 max_retries: int = 1, probe_interval: float = 10.0):
+        self.backends = [OllamaBackend(url, max_concurrency) for url in urls]
+        self.session_factory = session_factory
+        self.failure_threshold = failure_threshold
+        self.cooldown = cooldown
+        self.max_retries = max_retries
+        self.probe_interval = probe_interval
+        self._probe_task: Optional[asyncio.Task] = None
+
+    def pick(self, exclude: Optional[Set[OllamaBackend]] = None) -> OllamaBackend:
+        now = time.monotonic()
+        candidates = [b for b in self.backends if b.available(now) and b not in (exclude or ())]
+        if not candidates:
+            raise NoBackendAvailable("No Ollama backend available")
+        # Least outstanding requests; lower latency breaks ties
+        backend = min(candidates, key=lambda b: (b.outstanding, b.latency_ewma or 0.0))
+        if backend.circuit_state(now) == "half_open":
+            backend.half_open_trial = True
+        return backend
+
+    async def stream(self, path: str, **request_kwargs) -> AsyncIterator[str]:
+        """
+        POSTs to `path` on a backend and yields the response lines.
+        """
+        tried: Set[OllamaBackend] = set()
+        last_error: Optional[Exception] = None
+        while True:
+            try:
+                backend = self.pick(tried)
+            except NoBackendAvailable:
+                if last_error is not None:
+                    raise last_error
+                raise
+            tried.add(backend)
+            streamed = False
+            try:
+                async with backend.slot():
+                    start = time.perf_counter()
+                    async with self.session_factory().post(f"{backend.url}{path}", **request_kwargs) as response:
+                        if response.status != 200:
+                            raise BackendResponseError(response.status, await response.text())
+                        async for line in response.content:
+                            streamed = True
+                            yield line.decode("utf-8")
+                    backend.record_success(time.perf_counter() - start)
+                return
+            except Exception as e:
+                backend.record_failure(self.failure_threshold, self.cooldown)
+                # Once tokens reached the caller the call can't be replayed elsewhere
+                if streamed or len(tried) > self.max_retries:
+                    raise
+                last_error = e
+                logger.warning("backend failed, retrying on another backend", extra={"backend": backend.url, "error": str(e)})
+            except BaseException:
+                # Caller cancelled or stopped reading: not the backend's fault
+                backend.half_open_trial = False
+                raise
+
+    async def probe(self):
+        """
+        Checks every backend once; a reachable host with an open circuit gets a trial request.
+        """
+        for backend in self.backends:
+            try:
+                await run_blocking(probe_ollama, backend.url)
+            except Exception as e:
+                if backend.healthy:
+                    logger.warning("backend failed health check", extra={"backend": backend.url, "error": str(e)})
+                backend.healthy = False
+                continue
+            if not backend.healthy:
+                logger.info("backend is back", extra={"backend": backend.url})
+            backend.healthy = True
+            if backend.circuit_state(time.monotonic()) == "open":
+                backend.open_until = time.monotonic()
+
+    async def _probe_loop(self):
+        while True:
+            await asyncio.sleep(self.probe_interval)
+            await self.probe()
+
+    async def start(self):
+        if self._probe_task is None and self.probe_interval > 0:
+            self._probe_task = asyncio.create_task(self._probe_loop())
+
+    async def stop(self):
+        if self._probe_task is not None:
+            self._probe_task.cancel()
+            try:
+                await self._probe_task
+            except asyncio.CancelledError:
+                pass
+            self._probe_task = None
+
+    def stats(self) -> List[Dict[str, Any]]:
+        now = time.monotonic()
+        return [b.stats(now) for b in self.backends]
@@ -0,0 +1,177 @@
+import logging
+import os
+import threading
+import uuid
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional
+import chromadb
+from langchain_core.embeddings import Embeddings
+from app.core.config import settings
+from app.agents.embeddings import embedder
+from app.agents.bm25 import BM25Index, reciprocal_rank_fusion
+
+logger = logging.getLogger(__name__)
+
+COLLECTION_NAME = "tech_docs"
+VERSION_MARKER = "kb_version"
+BM25_DIR = "bm25"
+# Chunks tagged with this category apply to every ticket
+SHARED_CATEGORY = "General"
+
+def marker_path(db_path: str) -> str:
+    return os.path.join(db_path, VERSION_MARKER)
+
+def bm25_path(db_path: str) -> str:
+    return os.path.join(db_path, BM25_DIR)
+
+def bump_version(db_path: str) -> str:
+    """
+    Writes a new version marker next to the Chroma files.
+    Called by the seeding script so running API processes reload the collection.
+    """
+    os.makedirs(db_path, exist_ok=True)
+    version = uuid.uuid4().hex
+    tmp_path = marker_path(db_path) + ".tmp"
+    with open(tmp_path, "w") as f:
+        f.write(version)
+    os.replace(tmp_path, marker_path(db_path))
+    return version
+
+def category_filter(category: Optional[str]) -> Optional[List[str]]:
+    """
+    Categories whose chunks may answer a ticket of `category`, or None for no filter.
+    """
+    if not category or category == SHARED_CATEGORY or not settings.CATEGORY_FILTER_ENABLED:
+        return None
+    return [category, SHARED_CATEGORY]
+
+@dataclass
+class RetrievedChunk:
+    text: str
+    category: Optional[str] = None
+
+def rerank_by_category(chunks: List[Dict[str, Any]], category: Optional[str], n_results: int) -> List[str]:
+    """
+    Post-retrieval category filter over ranked `{"text", "category"}` candidates:
+    the best `n_results` in the ticket's category (or shared), keeping retrieval
+    order. Too few matches falls back to the global ranking.
+    """
+    categories = category_filter(category)
+    if categories:
+        matching = [c["text"] for c in chunks if c.get("category") in categories]
+        if len(matching) >= min(n_results, settings.RETRIEVAL_MIN_CATEGORY_HITS):
+            return matching[:n_results]
+        logger.info("too few category candidates, using global ranking", extra={"category": category, "hits": len(matching)})
+    return [c["text"] for c in chunks[:n_results]]
+
+def _first(batch: Optional[List[List[Any]]]) -> List[Any]:
+    # Chroma returns one result list per query embedding (None when not included)
+    return batch[0] if batch else []
+
+class KnowledgeRetriever:
+    """
+    Process-wide handle on the Chroma client and the `tech_docs` collection.
+
+    The client is built once (at startup via `warm`) and shared by every request.
+    Before each query the version marker is stat'ed; if the knowledge base was
+    re-seeded since the handle was opened, the client and BM25 index are reloaded.
+    """
+
+    def __init__(self, db_path: str, collection_name: str = COLLECTION_NAME, embedder: Optional[Embeddings] = None):
+        self.db_path = db_path
+        self.collection_name = collection_name
+        # Must match the model used at ingestion; Chroma's default embedder is used otherwise
+        self.embedder = embedder
+        self._lock = threading.Lock()
+        self._client = None
+        self._collection = None
+        self._bm25: Optional[BM25Index] = None
+        self._version: Optional[int] = None
+
+    def current_version(self) -> Optional[int]:
+        try:
+            return os.stat(marker_path(self.db_path)).st_mtime_ns
+        except FileNotFoundError:
+            return None
+
+    def _open(self, version: Optional[int]):
+        if self._client is not None:
+            # Drop Chroma's per-path system cache so segments are re-read from disk
+            self._client.clear_system_cache()
+        self._client = chromadb.PersistentClient(path=self.db_path)
+        self._collection = self._client.get_or_create_collection(name=self.collection_name)
+        self._bm25 = BM25Index.load(bm25_path(self.db_path)) if settings.HYBRID_RETRIEVAL_ENABLED else None
+        self._version = version
+        logger.info("collection opened", extra={"collection": self.collection_name, "chunks": self._collection.count()})
+
+    def collection(self):
+        """
+        Returns the shared collection, reloading it if the knowledge base changed.
+        """
+        version = self.current_version()
+        if self._collection is not None and version == self._version:
+            return self._collection
+        with self._lock:
+            if self._collection is None or version != self._version:
+                self._open(version)
+            return self._collection
+
+    def warm(self):
+        """
+        Opens the client and touches the index so the first ticket doesn't pay for it.
+        """
+        collection = self.collection()
+        if collection.count() > 0:
+            collection.peek(limit=1)
+
+    def query(self, text: str, n_results: int = 3) -> List[str]:
+        """
+        Blocking hybrid search returning chunk texts; see `search`.
+        """
+        return [chunk.text for chunk in self.search(text, n_results)]
+
+    def search(self, text: str, n_results: int = 3) -> List[RetrievedChunk]:
+        """
+        Blocking hybrid search over all categories: dense hits and BM25 hits fused
+        with reciprocal-rank fusion (dense only when no BM25 index exists). Call
+        through `run_blocking`. Each chunk carries its category for `rerank_by_category`.
+        """
+        collection = self.collection()
+        bm25 = self._bm25
+        candidates = max(n_results, settings.RETRIEVAL_CANDIDATES) if bm25 is not None else n_results
+
+        if self.embedder is not None:
+            results = collection.query(query_embeddings=[self.embedder.embed_query(text)], n_results=candidates)
+        else:
+            results = collection.query(query_texts=[text], n_results=candidates)
+        dense_ids = results['ids'][0] if results['ids'] else []
+        metadatas = _first(results.get('metadatas')) or [None] * len(dense_ids)
+        hits: Dict[str, RetrievedChunk] = {
+            chunk_id: RetrievedChunk(doc, (meta or {}).get("category"))
+            for chunk_id, doc, meta in zip(dense_ids, _first(results['documents']), metadatas)
+        }
+        if bm25 is None:
+            return [hits[i] for i in dense_ids[:n_results]]
+
+        sparse_ids = [chunk_id for chunk_id, _ in bm25.search(text, candidates)]
+        fused = reciprocal_rank_fusion([dense_ids, sparse_ids], k=settings.RRF_K)[:n_results]
+
+        # Keyword-only hits weren't returned by the dense query; fetch them by id
+        missing = [i for i in fused if i not in hits]
+        if missing:
+            extra = collection.get(ids=missing, include=["documents", "metadatas"])
+            metadatas = extra.get('metadatas') or [None] * len(extra['ids'])
+            for chunk_id, doc, meta in zip(extra['ids'], extra['documents'], metadatas):
+                hits[chunk_id] = RetrievedChunk(doc, (meta or {}).get("category"))
+        return [hits[i] for i in fused if i in hits]
+
+    def close(self):
+        with self._lock:
+            if self._client is not None:
+                self._client.clear_system_cache()
+            self._client = None
+            self._collection = None
+            self._bm25 = None
+            self._version = None
+
+retriever = KnowledgeRetriever(settings.CHROMA_DB_PATH, embedder=embedder)
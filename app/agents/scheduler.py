@@ -0,0 +1,160 @@
+import asyncio
+import logging
+import time
+from collections import deque
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Deque, Dict, List, Optional, Tuple
+from app.core.config import settings
+from app.core.metrics import DRAFTER_QUEUE_WAIT, DRAFTER_SHED
+from app.agents.triage import PRIORITIES
+
+logger = logging.getLogger(__name__)
+
+# Tickets without a usable triage priority are scheduled as Medium
+DEFAULT_PRIORITY = "Medium"
+SHEDDABLE_PRIORITIES = ("Low",)
+
+def priority_class(priority: Optional[str]) -> str:
+    return priority if priority in PRIORITIES else DEFAULT_PRIORITY
+
+class _ClassStats:
+    def __init__(self):
+        self.admitted = 0
+        self.shed = 0
+        self.total_wait = 0.0
+        self.max_wait = 0.0
+
+    def as_dict(self, waiting: int) -> Dict[str, Any]:
+        return {
+            "waiting": waiting,
+            "admitted": self.admitted,
+            "shed": self.shed,
+            "avg_wait_ms": round(self.total_wait / self.admitted * 1000, 2) if self.admitted else 0.0,
+            "max_wait_ms": round(self.max_wait * 1000, 2),
+        }
+
+# (enqueued at, waiter)
+_Waiter = Tuple[float, asyncio.Future]
+
+class PriorityScheduler:
+    """
+    Admission control for drafter generations, the expensive part of a ticket.
+
+    At most DRAFTER_CONCURRENCY drafts run at once. Waiting tickets are admitted
+    strictly by triaged priority (High, then Medium, then Low; FIFO within a
+    class), so an outage ticket never queues behind password questions. Aging
+    bounds the wait of the lower classes: a ticket that has waited
+    DRAFTER_MAX_WAIT_SECONDS is admitted before any priority, oldest first. When
+    DRAFTER_SHED_QUEUE_DEPTH tickets are already waiting, new Low tickets are
+    shed: they skip drafting and go to human review with their retrieved docs.
+    Tickets are claimed from the database in id order, so this is the queue where
+    priority applies; the worker pool runs more graphs than there are drafter
+    slots (WORKER_CONCURRENCY) so that the backlog builds up here.
+
+    Waiters belong to an event loop; the queues are reset if another loop uses it.
+    """
+
+    def __init__(self):
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._running = 0
+        self._queues: Dict[str, Deque[_Waiter]] = {p: deque() for p in PRIORITIES}
+        self._stats: Dict[str, _ClassStats] = {p: _ClassStats() for p in PRIORITIES}
+
+    @property
+    def capacity(self) -> int:
+        return settings.DRAFTER_CONCURRENCY
+
+    @property
+    def running(self) -> int:
+        return self._running
+
+    def waiting(self) -> int:
+        return sum(len(q) for q in self._queues.values())
+
+    def _bind_loop(self):
+        loop = asyncio.get_running_loop()
+        if loop is not self._loop:
+            self._loop = loop
+            self._running = 0
+            self._queues = {p: deque() for p in PRIORITIES}
+
+    def should_shed(self, priority: Optional[str]) -> bool:
+        """
+        True when a ticket of this priority should skip drafting because the drafter is overloaded.
+        Counts the ticket as shed.
+        """
+        priority = priority_class(priority)
+        if not settings.LOAD_SHEDDING_ENABLED or priority not in SHEDDABLE_PRIORITIES:
+            return False
+        if self._loop is not asyncio.get_running_loop() or self.waiting() < settings.DRAFTER_SHED_QUEUE_DEPTH:
+            return False
+        self._stats[priority].shed += 1
+        DRAFTER_SHED.labels(priority).inc()
+        return True
+
+    @asynccontextmanager
+    async def slot(self, priority: Optional[str]) -> AsyncIterator[None]:
+        """
+        Holds one drafter slot for the duration of the block.
+        """
+        self._bind_loop()
+        priority = priority_class(priority)
+        start = time.perf_counter()
+        if self._running < self.capacity and not self.waiting():
+            self._running += 1
+        else:
+            waiter = self._loop.create_future()
+            entry = (start, waiter)
+            self._queues[priority].append(entry)
+            try:
+                # Resolved by `_release`, which hands its slot straight to us
+                await waiter
+            except asyncio.CancelledError:
+                if waiter.done() and not waiter.cancelled():
+                    self._release()
+                else:
+                    self._queues[priority].remove(entry)
+                raise
+
+        wait = time.perf_counter() - start
+        stats = self._stats[priority]
+        stats.admitted += 1
+        stats.total_wait += wait
+        stats.max_wait = max(stats.max_wait, wait)
+        DRAFTER_QUEUE_WAIT.labels(priority).observe(wait)
+        try:
+            yield
+        finally:
+            self._release()
+
+    def _release(self):
+        if self._running <= self.capacity:
+            for queue in self._admission_order():
+                while queue:
+                    _, waiter = queue.popleft()
+                    if not waiter.done():
+                        waiter.set_result(None)
+                        return
+        # Nobody to hand over to (or capacity was lowered): free the slot
+        self._running -= 1
+
+    def _admission_order(self) -> List[Deque[_Waiter]]:
+        """
+        Queues in the order their heads get the next slot: the class whose head has
+        waited longest past DRAFTER_MAX_WAIT_SECONDS first, then by priority.
+        """
+        queues = [self._queues[p] for p in PRIORITIES]
+        max_wait = settings.DRAFTER_MAX_WAIT_SECONDS
+        if max_wait > 0:
+            # Queues are FIFO, so each head is its class's longest waiter
+            deadline = time.perf_counter() - max_wait
+            overdue = [q for q in queues if q and q[0][0] <= deadline]
+            if overdue:
+                oldest = min(overdue, key=lambda q: q[0][0])
+                return [oldest] + [q for q in queues if q is not oldest]
+        return queues
+
+    def stats(self) -> Dict[str, Dict[str, Any]]:
+        return {p: self._stats[p].as_dict(len(self._queues[p])) for p in PRIORITIES}
+
+drafter_scheduler = PriorityScheduler()
@@ -0,0 +1,129 @@
+import logging
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, List, Optional
+import numpy as np
+from app.core.config import settings
+from app.agents.retriever import retriever
+
+logger = logging.getLogger(__name__)
+
+@dataclass
+class CachedResolution:
+    """
+    Outcome of a resolved ticket that can be replayed for a near-duplicate.
+    """
+    source_ticket_id: int
+    category: str
+    priority: str
+    rag_docs: List[str]
+    response: str
+    confidence_score: float
+    # Tier that triaged the source ticket (rules, centroid, llm), replayed on hits
+    triage_tier: Optional[str] = None
+    created_at: float = field(default_factory=time.monotonic)
+
+class SemanticCache:
+    """
+    In-process cache of recently resolved tickets, looked up by cosine similarity
+    of the ticket description embedding.
+
+    Entries expire after `ttl_seconds`, the oldest are dropped beyond `max_entries`,
+    and the whole cache is cleared when `version_fn` (the knowledge-base version
+    marker) changes, because answers were grounded on the old documents.
+    """
+
+    def __init__(self, threshold: float, ttl_seconds: float, max_entries: int,
+                 version_fn: Optional[Callable[[], Any]] = None):
+        self.threshold = threshold
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self.version_fn = version_fn
+        self.hits = 0
+        self.misses = 0
+        self._entries: "OrderedDict[int, CachedResolution]" = OrderedDict()
+        self._vectors: "OrderedDict[int, np.ndarray]" = OrderedDict()
+        self._matrix: Optional[np.ndarray] = None
+        self._keys: List[int] = []
+        self._version = version_fn() if version_fn else None
+
+    def _check_version(self):
+        if self.version_fn is None:
+            return
+        version = self.version_fn()
+        if version != self._version:
+            if self._entries:
+                logger.info("knowledge base changed, clearing semantic cache")
+            self.clear()
+            self._version = version
+
+    def _expire(self):
+        cutoff = time.monotonic() - self.ttl_seconds
+        expired = [k for k, e in self._entries.items() if e.created_at < cutoff]
+        for k in expired:
+            self._drop(k)
+
+    def _drop(self, key: int):
+        self._entries.pop(key, None)
+        self._vectors.pop(key, None)
+        self._matrix = None
+
+    def clear(self):
+        self._entries.clear()
+        self._vectors.clear()
+        self._matrix = None
+
+    def lookup(self, vector: List[float]) -> Optional[CachedResolution]:
+        """
+        Returns the most similar cached resolution above the threshold, if any.
+        """
+        self._check_version()
+        self._expire()
+        if not self._entries:
+            self.misses += 1
+            return None
+
+        if self._matrix is None:
+            self._keys = list(self._vectors)
+            self._matrix = np.stack([self._vectors[k] for k in self._keys])
+
+        query = _unit(vector)
+        if query.shape[0] != self._matrix.shape[1]:
+            # Embedding model changed since the entries were stored
+            self.clear()
+            self.misses += 1
+            return None
+
+        scores = self._matrix @ query
+        best = int(np.argmax(scores))
+        if scores[best] < self.threshold:
+            self.misses += 1
+            return None
+
+        self.hits += 1
+        return self._entries[self._keys[best]]
+
+    def store(self, vector: List[float], resolution: CachedResolution):
+        self._check_version()
+        key = resolution.source_ticket_id
+        self._drop(key)
+        self._entries[key] = resolution
+        self._vectors[key] = _unit(vector)
+        while len(self._entries) > self.max_entries:
+            self._drop(next(iter(self._entries)))
+
+    def stats(self) -> Dict[str, int]:
+        return {"hits": self.hits, "misses": self.misses, "entries": len(self._entries)}
+
+def _unit(vector: List[float]) -> np.ndarray:
+    arr = np.asarray(vector, dtype=np.float32)
+    norm = np.linalg.norm(arr)
+    return arr / norm if norm else arr
+
+semantic_cache = SemanticCache(
+    threshold=settings.SEMANTIC_CACHE_THRESHOLD,
+    ttl_seconds=settings.SEMANTIC_CACHE_TTL_SECONDS,
+    max_entries=settings.SEMANTIC_CACHE_MAX_ENTRIES,
+    version_fn=retriever.current_version,
+)
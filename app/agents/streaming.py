@@ -0,0 +1,40 @@
+import json
+from typing import Any, AsyncIterator, Dict, Optional, Tuple
+from app.agents.graph import graph
+from app.models.state import AgentState
+
+# Which node update produces which client-facing event
+NODE_EVENTS = {
+    "triage": ("triage", ("category", "priority", "triage_tier")),
+    "rerank": ("docs", ("retrieved_docs",)),
+    "quality_gate": ("verdict", ("confidence_score", "needs_human_review")),
+}
+
+async def stream_graph_events(initial_state: AgentState, config: Dict[str, Any]) -> AsyncIterator[Tuple[str, Dict[str, Any]]]:
+    """
+    Runs the graph and yields (event, payload) pairs as it progresses:
+    `triage`, `docs`, one `token` per drafter chunk, `verdict`, and finally
+    `state` carrying the merged final state (for persistence, not for clients).
+    """
+    state: Dict[str, Any] = dict(initial_state)
+    async for mode, chunk in graph.astream(initial_state, config=config, stream_mode=["updates", "custom", "values"]):
+        if mode == "custom":
+            if "token" in chunk:
+                yield "token", {"text": chunk["token"]}
+            continue
+        if mode == "values":
+            # Full state after each step, with reducers (node_metrics) applied
+            state = chunk
+            continue
+
+        for node, update in chunk.items():
+            if not update:
+                continue
+            if node in NODE_EVENTS:
+                event, keys = NODE_EVENTS[node]
+                yield event, {k: update.get(k) for k in keys}
+    yield "state", state
+
+def format_sse(event: str, payload: Dict[str, Any], event_id: Optional[str] = None) -> str:
+    id_line = f"id: {event_id}\n" if event_id else ""
+    return f"{id_line}event: {event}\ndata: {json.dumps(payload)}\n\n"
@@ -0,0 +1,191 @@
+import json
+import logging
+import os
+import re
+import threading
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Pattern, Tuple
+import numpy as np
+from langchain_core.embeddings import Embeddings
+from app.core.config import settings
+from app.agents.embeddings import embedder
+
+logger = logging.getLogger(__name__)
+
+CATEGORIES = ("Access", "Network", "Billing", "General")
+PRIORITIES = ("High", "Medium", "Low")
+
+# --- Tier 1: keyword / regex rules ---
+# Compiled once; each category matches on any of its patterns.
+CATEGORY_RULES: Dict[str, Pattern] = {
+    "Access": re.compile(
+        r"\b(password|passcode|log ?in|sign ?in|locked out|account (is )?locked|mfa|2fa|"
+        r"two[- ]factor|permission|access (to|denied)|sso|credentials?)\b", re.I),
+    "Network": re.compile(
+        r"\b(vpn|wi-?fi|wireless|internet|dns|network|router|firewall|ethernet|proxy|"
+        r"latency|packet loss|ip address|connection (drops|timed? ?out))\b", re.I),
+    "Billing": re.compile(
+        r"\b(invoice|billing|billed|charged?|refund|payment|subscription|licen[cs]e (fee|cost)|"
+        r"credit card|receipt|pricing)\b", re.I),
+}
+PRIORITY_RULES: List[Tuple[str, Pattern]] = [
+    ("High", re.compile(
+        r"\b(urgent|asap|outage|down|critical|all users|whole (office|team)|"
+        r"everyone|production|cannot work|can't work|security breach|suspended)\b", re.I)),
+    ("Low", re.compile(
+        r"\b(how (do|can) i|question|request|when you have time|no rush|nice to have|"
+        r"would like|copy of)\b", re.I)),
+]
+
+@dataclass
+class TriageDecision:
+    category: str
+    priority: str
+    tier: str  # "rules", "centroid" or "llm"
+    confidence: float
+
+def rule_priority(text: str) -> Optional[str]:
+    for level, pattern in PRIORITY_RULES:
+        if pattern.search(text):
+            return level
+    return None
+
+def rule_triage(text: str) -> Optional[TriageDecision]:
+    """
+    Tier 1: confident only when exactly one category's rules match.
+    Priority comes from the priority rules, defaulting to Medium.
+    """
+    hits = {category: len(pattern.findall(text)) for category, pattern in CATEGORY_RULES.items()}
+    matched = [c for c, n in hits.items() if n >= settings.TRIAGE_RULE_MIN_HITS]
+    if len(matched) != 1:
+        return None
+    priority = rule_priority(text) or "Medium"
+    return TriageDecision(category=matched[0], priority=priority, tier="rules", confidence=1.0)
+
+# --- Tier 2: nearest centroid over labelled ticket embeddings ---
+
+class CentroidClassifier:
+    """
+    Nearest-centroid classifier over embeddings of labelled historical tickets.
+
+    One unit-normalised centroid per category and per priority; a ticket is
+    classified when its best cosine similarity clears `min_similarity` and beats
+    the runner-up by `margin`, for both the category and the priority.
+    """
+
+    def __init__(self, embeddings: Embeddings, min_similarity: float, margin: float):
+        self.embeddings = embeddings
+        self.min_similarity = min_similarity
+        self.margin = margin
+        self._category_labels: List[str] = []
+        self._category_centroids: Optional[np.ndarray] = None
+        self._priority_labels: List[str] = []
+        self._priority_centroids: Optional[np.ndarray] = None
+
+    @property
+    def fitted(self) -> bool:
+        return self._category_centroids is not None
+
+    def fit(self, examples: List[Dict[str, str]]):
+        if not examples:
+            return
+        vectors = _unit_rows(np.asarray(
+            self.embeddings.embed_documents([e["text"] for e in examples]), dtype=np.float32
+        ))
+        self._category_labels, self._category_centroids = _centroids(vectors, [e["category"] for e in examples])
+        self._priority_labels, self._priority_centroids = _centroids(vectors, [e["priority"] for e in examples])
+
+    def _best(self, vector: np.ndarray, labels: List[str], centroids: np.ndarray) -> Tuple[Optional[str], float]:
+        scores = centroids @ vector
+        order = np.argsort(scores)[::-1]
+        best = float(scores[order[0]])
+        runner_up = float(scores[order[1]]) if len(order) > 1 else -1.0
+        if best < self.min_similarity or best - runner_up < self.margin:
+            return None, best
+        return labels[order[0]], best
+
+    def _embed(self, text: str) -> np.ndarray:
+        return _unit_rows(np.asarray([self.embeddings.embed_query(text)], dtype=np.float32))[0]
+
+    def classify_priority(self, text: str) -> Optional[str]:
+        if not self.fitted:
+            return None
+        priority, _ = self._best(self._embed(text), self._priority_labels, self._priority_centroids)
+        return priority
+
+    def classify(self, text: str) -> Optional[TriageDecision]:
+        if not self.fitted:
+            return None
+        vector = self._embed(text)
+        category, category_score = self._best(vector, self._category_labels, self._category_centroids)
+        priority, priority_score = self._best(vector, self._priority_labels, self._priority_centroids)
+        if category is None or priority is None:
+            return None
+        return TriageDecision(category=category, priority=priority, tier="centroid",
+                              confidence=min(category_score, priority_score))
+
+def _unit_rows(matrix: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return matrix / norms
+
+def _centroids(vectors: np.ndarray, labels: List[str]) -> Tuple[List[str], np.ndarray]:
+    names = sorted(set(labels))
+    label_array = np.asarray(labels)
+    centroids = np.stack([vectors[label_array == name].mean(axis=0) for name in names])
+    return names, _unit_rows(centroids)
+
+def load_labelled_tickets(path: str) -> List[Dict[str, str]]:
+    if not os.path.exists(path):
+        return []
+    with open(path) as f:
+        examples = [json.loads(line) for line in f if line.strip()]
+    return [e for e in examples if e.get("category") in CATEGORIES and e.get("priority") in PRIORITIES]
+
+class FastTriage:
+    """
+    Rules first, then nearest centroid. Returns None when both tiers are unsure,
+    in which case the caller falls back to the LLM.
+    """
+
+    def __init__(self, classifier: CentroidClassifier, labels_path: str):
+        self.classifier = classifier
+        self.labels_path = labels_path
+        self._fit_lock = threading.Lock()
+        self._fitted = False
+
+    def _ensure_fitted(self):
+        if self._fitted or self.classifier.fitted:
+            return
+        with self._fit_lock:
+            if not self._fitted:
+                # Retried on the next ticket if embedding fails (e.g. Ollama down)
+                self.classifier.fit(load_labelled_tickets(self.labels_path))
+                self._fitted = True
+
+    def classify(self, text: str) -> Optional[TriageDecision]:
+        """
+        Blocking (tier 2 embeds the text). Call through `run_blocking` from async code.
+        """
+        decision = rule_triage(text)
+        try:
+            if decision:
+                # No priority keyword: let the centroids refine the Medium default
+                if rule_priority(text) is None:
+                    self._ensure_fitted()
+                    decision.priority = self.classifier.classify_priority(text) or decision.priority
+                return decision
+            self._ensure_fitted()
+            return self.classifier.classify(text)
+        except Exception as e:
+            logger.warning("centroid triage tier unavailable", extra={"error": str(e)})
+            return decision
+
+fast_triage = FastTriage(
+    CentroidClassifier(
+        embedder,
+        min_similarity=settings.TRIAGE_CENTROID_MIN_SIMILARITY,
+        margin=settings.TRIAGE_CENTROID_MARGIN,
+    ),
+    labels_path=settings.TRIAGE_LABELS_PATH,
+)
@@ -0,0 +1,404 @@
+import asyncio
+import logging
+from datetime import datetime, timedelta
+from typing import Any, Dict, Iterable, Optional, List, Set, Tuple
+from sqlalchemy import and_, or_, select, update, func
+from langgraph.types import StateSnapshot
+from app.agents.graph import graph
+from app.agents.checkpoints import checkpoints, ticket_config
+from app.agents.events import TICKET_ROW_COLUMNS, ticket_events, ticket_row
+from app.models.state import AgentState
+from app.agents.embeddings import embedder
+from app.agents.semantic_cache import semantic_cache, CachedResolution
+from app.core.config import settings
+from app.core.executor import run_blocking
+from app.core.database import AsyncSessionLocal
+from app.models.sql_models import Ticket, AgentLog, TicketStatus
+
+logger = logging.getLogger(__name__)
+
+# Tickets this process is running (worker, stream and batch runs): the lease loop
+# keeps renewing their claim, and the stale sweep never requeues them
+running_tickets: Set[int] = set()
+
+class TicketWorkerPool:
+    """
+    Pool of async workers that claim OPEN tickets from Postgres and run them
+    through the agent graph.
+
+    Claiming uses `SELECT ... FOR UPDATE SKIP LOCKED`, so several API processes
+    can run their own pool against the same database without double-processing.
+    A ticket whose run raises is marked FAILED and the worker moves on; tickets
+    cut short by `stop()` go back to OPEN. Runs lost with their process (restart,
+    crash) are found by their expired claim lease and requeued as well; the
+    leases of runs still going in this process are renewed instead.
+    """
+
+    def __init__(self, concurrency: int, poll_interval: float, max_queue_depth: int,
+                 lease_seconds: Optional[float] = None):
+        self.concurrency = concurrency
+        self.poll_interval = poll_interval
+        self.max_queue_depth = max_queue_depth
+        self.lease_seconds = lease_seconds if lease_seconds is not None else settings.WORKER_LEASE_SECONDS
+        self.in_flight = 0
+        self._wakeup = asyncio.Event()
+        self._tasks: List[asyncio.Task] = []
+        # Claimed tickets whose run hasn't finished
+        self._active: Set[int] = set()
+
+    @property
+    def running(self) -> bool:
+        return bool(self._tasks)
+
+    async def start(self):
+        if self._tasks:
+            return
+        self._wakeup = asyncio.Event()
+        self._tasks = [
+            asyncio.create_task(self._worker_loop(i), name=f"ticket-worker-{i}")
+            for i in range(self.concurrency)
+        ]
+        self._tasks.append(asyncio.create_task(self._lease_loop(), name="ticket-lease-reaper"))
+        logger.info("worker pool started", extra={"workers": self.concurrency})
+        # At most concurrency - DRAFTER_CONCURRENCY tickets can wait for a drafter slot
+        if settings.LOAD_SHEDDING_ENABLED and self.concurrency <= settings.DRAFTER_CONCURRENCY + settings.DRAFTER_SHED_QUEUE_DEPTH:
+            logger.warning("worker pool too small for the drafter queue to reach its shed depth", extra={
+                "workers": self.concurrency, "drafter_slots": settings.DRAFTER_CONCURRENCY,
+                "shed_queue_depth": settings.DRAFTER_SHED_QUEUE_DEPTH})
+
+    async def stop(self):
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        if self._active:
+            # Only OPEN tickets are claimed: hand interrupted runs back to the queue
+            # (they resume from their checkpoint on the next start)
+            try:
+                await requeue(list(self._active))
+            except Exception as e:
+                logger.error("could not requeue interrupted tickets", extra={"ticket_ids": sorted(self._active), "error": str(e)})
+            self._active.clear()
+        logger.info("worker pool stopped")
+
+    def notify(self):
+        """
+        Wakes idle workers after a new ticket was enqueued.
+        """
+        self._wakeup.set()
+
+    async def queue_depth(self, db) -> int:
+        """
+        Number of tickets waiting to be claimed.
+        """
+        result = await db.execute(
+            select(func.count()).select_from(Ticket).where(Ticket.status == TicketStatus.OPEN)
+        )
+        return result.scalar_one()
+
+    async def has_capacity(self, db, incoming: int = 1) -> bool:
+        """
+        Backpressure check used at intake: False if `incoming` more tickets would overfill the backlog.
+        """
+        return await self.queue_depth(db) + incoming <= self.max_queue_depth
+
+    async def _worker_loop(self, worker_id: int):
+        while True:
+            try:
+                claimed = await self._claim_next()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning("ticket claim failed", extra={"worker": worker_id, "error": str(e)})
+                claimed = None
+
+            if claimed is None:
+                # Nothing to do; sleep until notified or the poll interval elapses.
+                self._wakeup.clear()
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), timeout=self.poll_interval)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+
+            ticket_id = claimed[0]
+            self.in_flight += 1
+            self._active.add(ticket_id)
+            running_tickets.add(ticket_id)
+            try:
+                await process_ticket(*claimed)
+            except asyncio.CancelledError:
+                # Stays in _active so stop() requeues it
+                raise
+            except Exception as e:
+                # process_ticket handles graph errors; this is persistence or checkpoint trouble
+                logger.error("ticket processing crashed", extra={"worker": worker_id, "ticket_id": ticket_id, "error": str(e)})
+                try:
+                    await mark_failed(ticket_id)
+                except Exception as e:
+                    logger.warning("could not mark ticket failed", extra={"ticket_id": ticket_id, "error": str(e)})
+                self._active.discard(ticket_id)
+            else:
+                self._active.discard(ticket_id)
+            finally:
+                running_tickets.discard(ticket_id)
+                self.in_flight -= 1
+
+    async def _lease_loop(self):
+        """
+        Requeues orphaned PROCESSING tickets at startup, then periodically, after
+        renewing the leases of the tickets this process is running.
+        """
+        while True:
+            try:
+                held = list(running_tickets)
+                await renew_leases(held)
+                if await requeue_stale(self.lease_seconds, exclude=held):
+                    self.notify()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning("stale ticket sweep failed", extra={"error": str(e)})
+            await asyncio.sleep(min(self.lease_seconds / 2, 60.0))
+
+    async def _claim_next(self) -> Optional[Tuple[int, str, str]]:
+        """
+        Atomically moves the oldest OPEN ticket to PROCESSING and returns it.
+        """
+        async with AsyncSessionLocal() as db:
+            stmt = (
+                select(Ticket.id, Ticket.user_email, Ticket.issue_description)
+                .where(Ticket.status == TicketStatus.OPEN)
+                .order_by(Ticket.id)
+                .limit(1)
+                .with_for_update(skip_locked=True)
+            )
+            while True:
+                row = (await db.execute(stmt)).first()
+                if row is None:
+                    await db.rollback()
+                    return None
+
+                # The status guard keeps the claim atomic where SKIP LOCKED isn't
+                # supported (SQLite): losing the race updates nothing, so try the next one
+                claimed = (await db.execute(
+                    update(Ticket)
+                    .where(Ticket.id == row.id, Ticket.status == TicketStatus.OPEN)
+                    .values(status=TicketStatus.PROCESSING, claimed_at=datetime.utcnow())
+                    .returning(*TICKET_ROW_COLUMNS)
+                )).first()
+                await db.commit()
+                if claimed is not None:
+                    ticket_events.status_changed(ticket_row(*claimed))
+                    return row.id, row.user_email, row.issue_description
+
+
+def agent_log_values(ticket_id: int, final_state: dict, from_cache: bool = False) -> Dict[str, Any]:
+    """
+    AgentLog column values for a finished graph run.
+    """
+    return {
+        "ticket_id": ticket_id,
+        "category": final_state["category"],
+        "priority": final_state["priority"],
+        "triage_tier": final_state.get("triage_tier") or None,
+        "rag_docs": final_state["retrieved_docs"],  # automatically serialized to JSONB
+        "response": final_state["draft_response"] or None,  # None: shed, no draft
+        "confidence_score": final_state["confidence_score"],
+        "prompt_tokens": final_state.get("prompt_tokens") or None,
+        "prefill_ms": final_state.get("prefill_ms"),
+        "node_metrics": final_state.get("node_metrics") or None,
+        "from_cache": from_cache,
+    }
+
+async def set_status(db, ticket_id: int, status: TicketStatus):
+    """
+    Updates a ticket's status and returns its row for the change feed; the caller commits and publishes.
+    """
+    return (await db.execute(
+        update(Ticket).where(Ticket.id == ticket_id).values(status=status).returning(*TICKET_ROW_COLUMNS)
+    )).first()
+
+async def persist_result(ticket_id: int, final_state: dict, from_cache: bool = False) -> TicketStatus:
+    """
+    Writes the graph outcome: ticket status plus one AgentLog row.
+    """
+    status = TicketStatus.AWAITING_REVIEW if final_state["needs_human_review"] else TicketStatus.RESOLVED
+
+    async with AsyncSessionLocal() as db:
+        row = await set_status(db, ticket_id, status)
+        db.add(AgentLog(**agent_log_values(ticket_id, final_state, from_cache)))
+        await db.commit()
+    if row is not None:
+        ticket_events.status_changed(ticket_row(*row))
+    return status
+
+async def mark_failed(ticket_id: int):
+    async with AsyncSessionLocal() as db:
+        row = await set_status(db, ticket_id, TicketStatus.FAILED)
+        await db.commit()
+    if row is not None:
+        ticket_events.status_changed(ticket_row(*row))
+
+async def _requeue_where(condition) -> List[int]:
+    async with AsyncSessionLocal() as db:
+        rows = (await db.execute(
+            update(Ticket)
+            .where(condition, Ticket.status == TicketStatus.PROCESSING)
+            .values(status=TicketStatus.OPEN, claimed_at=None)
+            .returning(*TICKET_ROW_COLUMNS)
+        )).all()
+        await db.commit()
+    for row in rows:
+        ticket_events.status_changed(ticket_row(*row))
+    if rows:
+        logger.info("tickets requeued", extra={"ticket_ids": [row.id for row in rows]})
+    return [row.id for row in rows]
+
+async def requeue(ticket_ids: List[int]) -> List[int]:
+    """
+    Moves PROCESSING tickets back to OPEN so a worker claims them again.
+    """
+    return await _requeue_where(Ticket.id.in_(ticket_ids))
+
+async def renew_leases(ticket_ids: Iterable[int]):
+    """
+    Restarts the claim lease of PROCESSING tickets this process is running.
+    """
+    ticket_ids = list(ticket_ids)
+    if not ticket_ids:
+        return
+    async with AsyncSessionLocal() as db:
+        await db.execute(
+            update(Ticket)
+            .where(Ticket.id.in_(ticket_ids), Ticket.status == TicketStatus.PROCESSING)
+            .values(claimed_at=datetime.utcnow())
+        )
+        await db.commit()
+
+async def requeue_stale(lease_seconds: float, exclude: Iterable[int] = ()) -> List[int]:
+    """
+    Requeues PROCESSING tickets whose claim is older than the lease: their run
+    died with its process. The worker resumes them from their last checkpoint.
+    `exclude` are tickets still running here, whatever their lease says.
+    """
+    cutoff = datetime.utcnow() - timedelta(seconds=lease_seconds)
+    # Tickets claimed before claimed_at existed fall back to their creation time
+    condition = or_(
+        Ticket.claimed_at < cutoff,
+        and_(Ticket.claimed_at.is_(None), Ticket.created_at < cutoff),
+    )
+    exclude = list(exclude)
+    if exclude:
+        condition = and_(condition, Ticket.id.not_in(exclude))
+    return await _requeue_where(condition)
+
+async def _embed_for_cache(text: str) -> Optional[List[float]]:
+    """
+    Embeds a ticket description for the semantic cache; None when the cache is off or embedding fails.
+    """
+    if not settings.SEMANTIC_CACHE_ENABLED:
+        return None
+    try:
+        return await run_blocking(embedder.embed_query, text)
+    except Exception as e:
+        logger.warning("semantic cache embedding failed", extra={"error": str(e)})
+        return None
+
+def initial_state_for(ticket_id: int, issue_description: str) -> AgentState:
+    return {
+        "ticket_id": ticket_id,
+        "user_query": issue_description,
+        "category": "Unclassified",
+        "priority": "Unknown",
+        "triage_tier": "",
+        "candidate_docs": [],
+        "retrieved_docs": [],
+        "draft_response": "",
+        "shed": False,
+        "prompt_tokens": 0,
+        "prefill_ms": None,
+        "confidence_score": 0.0,
+        "needs_human_review": False,
+        "node_metrics": {}
+    }
+
+async def run_ticket_graph(ticket_id: int, issue_description: str, config: Dict[str, Any],
+                           saved: Optional[StateSnapshot] = None) -> dict:
+    """
+    Runs the graph for a ticket, or resumes it from its last checkpoint:
+    only the nodes that hadn't completed are run again.
+    """
+    if saved is None:
+        return await graph.ainvoke(initial_state_for(ticket_id, issue_description), config=config)
+    if not saved.next:
+        logger.info("ticket already ran to completion, reusing its checkpoint", extra={"ticket_id": ticket_id})
+        return saved.values
+    logger.info("ticket resuming from checkpoint", extra={"ticket_id": ticket_id, "next": list(saved.next)})
+    return await graph.ainvoke(None, config=config)
+
+async def process_ticket(ticket_id: int, user_email: str, issue_description: str):
+    """
+    Runs the agent graph for a claimed ticket and persists the result.
+    A retried ticket resumes from its last checkpoint.
+    """
+    initial_state = initial_state_for(ticket_id, issue_description)
+    config = ticket_config(ticket_id, user_email)
+    saved = await checkpoints.saved_run(config)
+
+    # 1. Semantic cache: replay a recent resolution for a near-duplicate ticket (fresh runs only)
+    vector = await _embed_for_cache(issue_description) if saved is None else None
+    cached = semantic_cache.lookup(vector) if vector is not None else None
+    from_cache = cached is not None
+
+    try:
+        if cached:
+            logger.info("ticket served from cache", extra={"ticket_id": ticket_id, "source_ticket_id": cached.source_ticket_id})
+            final_state = {
+                **initial_state,
+                "category": cached.category,
+                "priority": cached.priority,
+                "triage_tier": cached.triage_tier or "",
+                "retrieved_docs": cached.rag_docs,
+                "draft_response": cached.response,
+                "confidence_score": cached.confidence_score,
+                "needs_human_review": False
+            }
+        else:
+            final_state = await run_ticket_graph(ticket_id, issue_description, config, saved)
+    except Exception as e:
+        logger.error("ticket failed", extra={"ticket_id": ticket_id, "error": str(e)})
+        await mark_failed(ticket_id)
+        return
+
+    status = await persist_result(ticket_id, final_state, from_cache=from_cache)
+    await discard_checkpoints(ticket_id)
+
+    # 2. Auto-resolved answers become cache entries for future duplicates
+    if vector is not None and not from_cache and status == TicketStatus.RESOLVED:
+        semantic_cache.store(vector, CachedResolution(
+            source_ticket_id=ticket_id,
+            category=final_state["category"],
+            priority=final_state["priority"],
+            triage_tier=final_state.get("triage_tier") or None,
+            rag_docs=final_state["retrieved_docs"],
+            response=final_state["draft_response"],
+            confidence_score=final_state["confidence_score"]
+        ))
+
+    logger.info("ticket processed", extra={"ticket_id": ticket_id, "status": status.value})
+
+async def discard_checkpoints(ticket_id: int):
+    # The result is persisted; a failure here only leaves stale checkpoint rows
+    try:
+        await checkpoints.discard(ticket_id)
+    except Exception as e:
+        logger.warning("could not drop checkpoints", extra={"ticket_id": ticket_id, "error": str(e)})
+
+
+worker_pool = TicketWorkerPool(
+    concurrency=settings.WORKER_CONCURRENCY,
+    poll_interval=settings.WORKER_POLL_INTERVAL,
+    max_queue_depth=settings.MAX_QUEUE_DEPTH,
+    lease_seconds=settings.WORKER_LEASE_SECONDS,
+)
@@ -1,14 +1,30 @@
-from fastapi import APIRouter, HTTPException, Depends, BackgroundTasks
-from pydantic import BaseModel
-from typing import Optional, List
-from sqlalchemy import select
-from sqlalchemy.orm import selectinload
+import asyncio
+import logging
+import time
+from datetime import datetime, timedelta
+from fastapi import APIRouter, HTTPException, Depends, BackgroundTasks, Header, Query, Response
+from fastapi.responses import StreamingResponse
+from pydantic import BaseModel, Field
+from typing import Any, Optional, List, Dict, Tuple
+from sqlalchemy import select, func
+from sqlalchemy.orm import aliased
 from sqlalchemy.ext.asyncio import AsyncSession
-from app.agents.graph import graph
-from app.models.state import AgentState
+from app.agents.worker import worker_pool, initial_state_for, persist_result, mark_failed, discard_checkpoints, running_tickets
+from app.agents.checkpoints import checkpoints, ticket_config
+from app.agents.events import RESET, ticket_events, ticket_row
+from app.agents.streaming import stream_graph_events, format_sse
+from app.agents.batch import batch_jobs, insert_tickets, run_batch, submit_batch_job
+from app.agents.embeddings import embedder
+from app.agents.llm_engine import llm_cache, ollama_router
+from app.agents.scheduler import drafter_scheduler
+from app.agents.semantic_cache import semantic_cache, CachedResolution
+from app.core.config import settings
+from app.core.executor import run_blocking
 from app.core.database import get_db
 from app.models.sql_models import Ticket, AgentLog, TicketStatus
 
+logger = logging.getLogger(__name__)
+
 router = APIRouter()
 
 # --- Pydantic Models for API ---
@@ -25,6 +41,8 @@ class TicketResponse(BaseModel):
     status: str
     issue_description: Optional[str] = None
     rag_docs: Optional[List[str]] = None
+    from_cache: bool = False
+    node_metrics: Optional[Dict[str, Dict[str, Any]]] = None
 
 class TicketListResponse(BaseModel):
     id: int
@@ -33,53 +51,290 @@ class TicketListResponse(BaseModel):
     status: str
     created_at: str
 
+class TicketPage(BaseModel):
+    items: List[TicketListResponse]
+    next_after_id: Optional[int] = None
+
+class TicketBatchRequest(BaseModel):
+    tickets: List[TicketRequest] = Field(min_length=1, max_length=settings.BATCH_MAX_SIZE)
+    # True: run the batch within the request and return per-ticket results.
+    # False: return a job id immediately and poll GET /tickets/batch/{job_id}.
+    wait: bool = False
+
+class BatchTicketResult(BaseModel):
+    ticket_id: int
+    status: str
+    category: Optional[str] = None
+    priority: Optional[str] = None
+    final_response: Optional[str] = None
+    error: Optional[str] = None
+
+class TicketBatchResponse(BaseModel):
+    job_id: Optional[str] = None
+    ticket_ids: List[int]
+    done: bool
+    results: Optional[List[BatchTicketResult]] = None
+    error: Optional[str] = None
+
+class HourlyCount(BaseModel):
+    hour: str
+    count: int
+
+class TicketStatsResponse(BaseModel):
+    total: int
+    by_status: Dict[str, int]
+    by_category: Dict[str, int]
+    by_hour: List[HourlyCount]
+    generated_at: str
+
 class ApprovalRequest(BaseModel):
     final_response: str
 
+class QueueStatusResponse(BaseModel):
+    queue_depth: int
+    in_flight: int
+    concurrency: int
+    max_queue_depth: int
+    workers_running: bool
+    llm_cache: Dict[str, int]
+    llm_backends: List[Dict[str, Any]]
+    # Drafts generating now, and per priority: waiting, admitted, shed and queue wait
+    drafter_running: int
+    drafter_queue: Dict[str, Dict[str, Any]]
+
+# --- Helpers ---
+
+def _latest_log_id(ticket_id):
+    """
+    Scalar subquery selecting the id of a ticket's most recent AgentLog.
+    """
+    log = aliased(AgentLog)
+    return (
+        select(log.id)
+        .where(log.ticket_id == ticket_id)
+        .order_by(log.created_at.desc(), log.id.desc())
+        .limit(1)
+        .correlate_except(log)
+        .scalar_subquery()
+    )
+
+async def _cache_approved_response(ticket: Ticket, final_response: str, db: AsyncSession):
+    latest_log = (await db.execute(
+        select(AgentLog).where(AgentLog.id == _latest_log_id(ticket.id))
+    )).scalars().first()
+    try:
+        vector = await run_blocking(embedder.embed_query, ticket.issue_description)
+    except Exception as e:
+        logger.warning("could not embed approved ticket", extra={"ticket_id": ticket.id, "error": str(e)})
+        return
+    semantic_cache.store(vector, CachedResolution(
+        source_ticket_id=ticket.id,
+        category=latest_log.category if latest_log else "General",
+        priority=(latest_log.priority if latest_log else None) or "Unknown",
+        triage_tier=latest_log.triage_tier if latest_log else None,
+        rag_docs=latest_log.rag_docs if latest_log else [],
+        response=final_response,
+        confidence_score=1.0
+    ))
+
+# Short-lived cache for /tickets/stats so dashboard polling doesn't hit the DB every rerun
+_stats_cache: Dict[int, Tuple[float, TicketStatsResponse]] = {}
+_stats_lock = asyncio.Lock()
+
+def _hour_bucket(db: AsyncSession):
+    """
+    created_at truncated to the hour: date_trunc on Postgres, an ISO string elsewhere (SQLite).
+    """
+    if db.get_bind().dialect.name == "postgresql":
+        return func.date_trunc("hour", Ticket.created_at)
+    return func.strftime("%Y-%m-%dT%H:00:00", Ticket.created_at)
+
+async def _compute_stats(hours: int, db: AsyncSession) -> TicketStatsResponse:
+    status_rows = (await db.execute(
+        select(Ticket.status, func.count()).group_by(Ticket.status)
+    )).all()
+    category_rows = (await db.execute(
+        select(AgentLog.category, func.count(func.distinct(AgentLog.ticket_id)))
+        .group_by(AgentLog.category)
+    )).all()
+    since = datetime.utcnow() - timedelta(hours=hours)
+    bucket = _hour_bucket(db)
+    hour_rows = (await db.execute(
+        select(bucket.label("hour"), func.count())
+        .where(Ticket.created_at >= since)
+        .group_by(bucket)
+        .order_by(bucket)
+    )).all()
+
+    by_status = {status.value: count for status, count in status_rows}
+    return TicketStatsResponse(
+        total=sum(by_status.values()),
+        by_status=by_status,
+        by_category={(category or "Unclassified"): count for category, count in category_rows},
+        by_hour=[
+            HourlyCount(hour=hour if isinstance(hour, str) else hour.isoformat(), count=count)
+            for hour, count in hour_rows
+        ],
+        generated_at=datetime.utcnow().isoformat()
+    )
+
+def _ticket_row(ticket: Ticket) -> Dict[str, Any]:
+    return ticket_row(ticket.id, ticket.user_email, ticket.issue_description, ticket.status, ticket.created_at)
+
 # --- Routes ---
 
-@router.get("/tickets", response_model=List[TicketListResponse])
-async def list_tickets(db: AsyncSession = Depends(get_db)):
-    """
-    List all tickets.
-    """
-    result = await db.execute(select(Ticket).order_by(Ticket.id.desc()))
-    tickets = result.scalars().all()
-    return [
-        TicketListResponse(
-            id=t.id, 
-            user_email=t.user_email, 
-            issue_description=t.issue_description,
-            status=t.status.value, 
-            created_at=t.created_at.isoformat()
-        ) for t in tickets
-    ]
+@router.get("/tickets", response_model=TicketPage)
+async def list_tickets(
+    after_id: Optional[int] = Query(None, description="Return tickets with id lower than this cursor"),
+    limit: int = Query(50, ge=1, le=200),
+    status: Optional[TicketStatus] = None,
+    user_email: Optional[str] = None,
+    created_after: Optional[datetime] = None,
+    created_before: Optional[datetime] = None,
+    db: AsyncSession = Depends(get_db)
+):
+    """
+    List tickets newest first, keyset-paginated on id.
+    Pass the returned `next_after_id` as `after_id` to fetch the next page.
+    """
+    # Project only the listed columns; no ORM entities are built
+    stmt = select(
+        Ticket.id, Ticket.user_email, Ticket.issue_description, Ticket.status, Ticket.created_at
+    )
+    if after_id is not None:
+        stmt = stmt.where(Ticket.id < after_id)
+    if status is not None:
+        stmt = stmt.where(Ticket.status == status)
+    if user_email is not None:
+        stmt = stmt.where(Ticket.user_email == user_email)
+    if created_after is not None:
+        stmt = stmt.where(Ticket.created_at >= created_after)
+    if created_before is not None:
+        stmt = stmt.where(Ticket.created_at < created_before)
+    stmt = stmt.order_by(Ticket.id.desc()).limit(limit + 1)
+
+    rows = (await db.execute(stmt)).all()
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+    return TicketPage(
+        items=[
+            TicketListResponse(
+                id=row.id,
+                user_email=row.user_email,
+                issue_description=row.issue_description,
+                status=row.status.value,
+                created_at=row.created_at.isoformat()
+            ) for row in rows
+        ],
+        next_after_id=rows[-1].id if has_more else None
+    )
+
+@router.get("/tickets/stats", response_model=TicketStatsResponse)
+async def ticket_stats(
+    hours: int = Query(24, ge=1, le=24 * 30, description="Window for the hourly breakdown"),
+    db: AsyncSession = Depends(get_db)
+):
+    """
+    Aggregated queue statistics computed with GROUP BY, cached for STATS_CACHE_TTL_SECONDS.
+    """
+    cached = _stats_cache.get(hours)
+    if cached and cached[0] > time.monotonic():
+        return cached[1]
+    async with _stats_lock:
+        # Another request may have refreshed it while we waited
+        cached = _stats_cache.get(hours)
+        if cached and cached[0] > time.monotonic():
+            return cached[1]
+        stats = await _compute_stats(hours, db)
+        _stats_cache[hours] = (time.monotonic() + settings.STATS_CACHE_TTL_SECONDS, stats)
+        return stats
+
+@router.get("/tickets/events")
+async def ticket_event_feed(
+    after: Optional[str] = Query(None, description="Resume after this event id (same as the Last-Event-ID header)"),
+    last_event_id: Optional[str] = Header(None)
+):
+    """
+    Live change feed as Server-Sent Events: `created` for new tickets and `status`
+    for status changes, each carrying the ticket as listed by GET /tickets.
+    `ready` is sent once subscribed. `reset` means events were missed and the
+    client should re-fetch GET /tickets. Comment lines keep idle connections open.
+    """
+    resume_from = last_event_id or after
+
+    async def event_source():
+        async with ticket_events.subscribe() as queue:
+            # Nothing can be published between subscribing and replaying (no await)
+            backlog = ticket_events.replay(resume_from)
+            yield format_sse("ready", {"subscribers": ticket_events.subscribers})
+            if backlog is None:
+                yield format_sse("reset", {})
+                backlog = []
+            for event in backlog:
+                yield format_sse(event.type, event.ticket, ticket_events.event_id(event))
+            while True:
+                try:
+                    event = await asyncio.wait_for(queue.get(), settings.TICKET_EVENTS_HEARTBEAT_SECONDS)
+                except asyncio.TimeoutError:
+                    yield ": keepalive\n\n"
+                    continue
+                if event is RESET:
+                    yield format_sse("reset", {})
+                else:
+                    yield format_sse(event.type, event.ticket, ticket_events.event_id(event))
+
+    return StreamingResponse(
+        event_source(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+@router.get("/queue/status", response_model=QueueStatusResponse)
+async def queue_status(db: AsyncSession = Depends(get_db)):
+    """
+    Current backlog and worker utilisation.
+    """
+    return QueueStatusResponse(
+        queue_depth=await worker_pool.queue_depth(db),
+        in_flight=worker_pool.in_flight,
+        concurrency=worker_pool.concurrency,
+        max_queue_depth=worker_pool.max_queue_depth,
+        workers_running=worker_pool.running,
+        llm_cache=llm_cache.stats(),
+        llm_backends=ollama_router.stats(),
+        drafter_running=drafter_scheduler.running,
+        drafter_queue=drafter_scheduler.stats()
+    )
 
 @router.get("/tickets/{ticket_id}", response_model=TicketResponse)
 async def get_ticket(ticket_id: int, db: AsyncSession = Depends(get_db)):
     """
     Get specific ticket details including RAG context from the latest log.
     """
-    # Fetch ticket and eagerly load logs
-    stmt = select(Ticket).options(selectinload(Ticket.logs)).where(Ticket.id == ticket_id)
-    result = await db.execute(stmt)
-    ticket = result.scalars().first()
+    # Ticket plus only its newest log, in one query served by ix_agent_logs_ticket_id_created_at
+    stmt = (
+        select(Ticket, AgentLog)
+        .outerjoin(AgentLog, AgentLog.id == _latest_log_id(Ticket.id))
+        .where(Ticket.id == ticket_id)
+    )
+    row = (await db.execute(stmt)).first()
     
-    if not ticket:
+    if not row:
         raise HTTPException(status_code=404, detail="Ticket not found")
 
-    # Get latest log info if exists
-    latest_log = ticket.logs[-1] if ticket.logs else None
+    ticket, latest_log = row
     
     return TicketResponse(
         ticket_id=ticket.id,
         user_email=ticket.user_email,
         issue_description=ticket.issue_description,
         category=latest_log.category if latest_log else None,
-        priority="Unknown", # Priority isn't stored in Ticket directly in current schema, could be improved
+        priority=latest_log.priority if latest_log else None,
         final_response=latest_log.response if latest_log else None,
         status=ticket.status.value,
-        rag_docs=latest_log.rag_docs if latest_log else []
+        rag_docs=latest_log.rag_docs if latest_log else [],
+        from_cache=bool(latest_log and latest_log.from_cache),
+        node_metrics=latest_log.node_metrics if latest_log else None
     )
 
 @router.post("/tickets/{ticket_id}/approve")
@@ -96,84 +351,192 @@ async def approve_ticket(ticket_id: int, approval: ApprovalRequest, db: AsyncSes
     
     # Update status
     ticket.status = TicketStatus.RESOLVED
+
+    # Human-approved answers are the best candidates for replaying on duplicates
+    if settings.SEMANTIC_CACHE_ENABLED:
+        await _cache_approved_response(ticket, approval.final_response, db)
     
     # Theoretically send email here...
-    print(f"--- Sending Email to {ticket.user_email} ---")
-    print(f"Body: {approval.final_response}")
+    logger.info("sending email", extra={"ticket_id": ticket.id, "to": ticket.user_email})
+    logger.debug("email body", extra={"ticket_id": ticket.id, "body": approval.final_response})
     
     await db.commit()
+    ticket_events.status_changed(_ticket_row(ticket))
     return {"status": "resolved", "message": "Ticket approved and email sent."}
 
-@router.post("/tickets", response_model=TicketResponse)
+@router.post("/tickets/{ticket_id}/retry", response_model=TicketResponse, status_code=202)
+async def retry_ticket(ticket_id: int, db: AsyncSession = Depends(get_db)):
+    """
+    Re-queues a FAILED ticket. The worker resumes its graph run from the last
+    completed node (when checkpointing is enabled) instead of starting over.
+    """
+    ticket = await db.get(Ticket, ticket_id)
+    if not ticket:
+        raise HTTPException(status_code=404, detail="Ticket not found")
+    if ticket.status != TicketStatus.FAILED:
+        raise HTTPException(status_code=409, detail=f"Only failed tickets can be retried (status: {ticket.status.value})")
+
+    saved = await checkpoints.saved_run(ticket_config(ticket.id, ticket.user_email))
+    ticket.status = TicketStatus.OPEN
+    await db.commit()
+    ticket_events.status_changed(_ticket_row(ticket))
+    worker_pool.notify()
+    logger.info("ticket re-queued", extra={"ticket_id": ticket_id, "resume_at": list(saved.next) if saved else []})
+
+    return TicketResponse(
+        ticket_id=ticket.id,
+        user_email=ticket.user_email,
+        issue_description=ticket.issue_description,
+        status=TicketStatus.OPEN.value
+    )
+
+@router.post("/tickets", response_model=TicketResponse, status_code=202)
 async def create_ticket(
     ticket_in: TicketRequest,
     db: AsyncSession = Depends(get_db)
 ):
     """
-    Creates a ticket in DB, runs the Agent Graph, and updates the DB with results.
+    Persists the ticket as OPEN and hands it to the worker pool.
+    The graph runs in the background; poll GET /tickets/{id} for the result.
     """
-    # 1. Create Ticket in DB
+    # 1. Backpressure: refuse new work when the queue is saturated
+    if not await worker_pool.has_capacity(db):
+        raise HTTPException(
+            status_code=503,
+            detail="Ticket queue is full, retry later.",
+            headers={"Retry-After": "30"}
+        )
+
+    # 2. Create Ticket in DB
     new_ticket = Ticket(
         user_email=ticket_in.user_email,
         issue_description=ticket_in.issue_description,
-        status=TicketStatus.PROCESSING
+        status=TicketStatus.OPEN
     )
     db.add(new_ticket)
     await db.commit()
-    await db.refresh(new_ticket)
-    
-    ticket_id = new_ticket.id
-    
-    try:
-        # 2. Initialize Graph State
-        initial_state: AgentState = {
-            "ticket_id": ticket_id,
-            "user_query": ticket_in.issue_description,
-            "category": "Unclassified",
-            "priority": "Unknown",
-            "retrieved_docs": [],
-            "draft_response": "",
-            "confidence_score": 0.0,
-            "needs_human_review": False
-        }
-
-        # 3. Invoke Graph
-        config = {"metadata": {"ticket_id": ticket_id, "user_email": ticket_in.user_email}}
-        final_state = await graph.ainvoke(initial_state, config=config)
-
-        # 4. Update Ticket Status
-        status = TicketStatus.AWAITING_REVIEW if final_state["needs_human_review"] else TicketStatus.RESOLVED
-        
-        new_ticket.status = status
-        db.add(new_ticket)
-        
-        # 5. Log Agent Execution
-        log_entry = AgentLog(
-            ticket_id=ticket_id,
-            category=final_state["category"],
-            rag_docs=final_state["retrieved_docs"], # automatically serialized to JSONB
-            response=final_state["draft_response"],
-            confidence_score=final_state["confidence_score"]
+    ticket_events.created(_ticket_row(new_ticket))
+
+    # 3. Wake idle workers
+    worker_pool.notify()
+
+    return TicketResponse(
+        ticket_id=new_ticket.id,
+        user_email=new_ticket.user_email,
+        issue_description=new_ticket.issue_description,
+        status=TicketStatus.OPEN.value
+    )
+
+@router.post("/tickets/stream")
+async def create_ticket_stream(
+    ticket_in: TicketRequest,
+    db: AsyncSession = Depends(get_db)
+):
+    """
+    Creates a ticket and runs the graph inline, streaming progress as Server-Sent Events:
+    `ticket`, `triage`, `docs`, `token` (drafter output), `verdict`, then `done` once persisted.
+    Rejected with 503, like POST /tickets, when the ticket queue is saturated.
+    """
+    if not await worker_pool.has_capacity(db):
+        raise HTTPException(
+            status_code=503,
+            detail="Ticket queue is full, retry later.",
+            headers={"Retry-After": "30"}
         )
-        db.add(log_entry)
-        
-        await db.commit()
-
-        # 6. Response
-        return TicketResponse(
-            ticket_id=ticket_id,
-            user_email=ticket_in.user_email,
-            category=final_state["category"],
-            priority=final_state["priority"],
-            final_response=final_state["draft_response"],
-            status=status.value
+
+    new_ticket = Ticket(
+        user_email=ticket_in.user_email,
+        issue_description=ticket_in.issue_description,
+        status=TicketStatus.PROCESSING,
+        claimed_at=datetime.utcnow()
+    )
+    db.add(new_ticket)
+    await db.commit()
+    ticket_events.created(_ticket_row(new_ticket))
+    ticket_id = new_ticket.id
+
+    async def event_source():
+        initial_state = initial_state_for(ticket_id, ticket_in.issue_description)
+        config = ticket_config(ticket_id, ticket_in.user_email)
+        settled = False
+        running_tickets.add(ticket_id)
+        try:
+            yield format_sse("ticket", {"ticket_id": ticket_id})
+            final_state = None
+            async for event, payload in stream_graph_events(initial_state, config):
+                if event == "state":
+                    final_state = payload
+                else:
+                    yield format_sse(event, payload)
+            status = await persist_result(ticket_id, final_state)
+            settled = True
+            await discard_checkpoints(ticket_id)
+        except Exception as e:
+            await mark_failed(ticket_id)
+            settled = True
+            yield format_sse("error", {"ticket_id": ticket_id, "detail": f"Processing failed: {str(e)}"})
+            return
+        finally:
+            running_tickets.discard(ticket_id)
+            if not settled:
+                # The client went away (cancellation or aclose): mark it FAILED so /retry
+                # can resume it, shielded from the cancellation that got us here
+                logger.warning("ticket stream abandoned", extra={"ticket_id": ticket_id})
+                await asyncio.shield(mark_failed(ticket_id))
+        yield format_sse("done", {"ticket_id": ticket_id, "status": status.value})
+
+    return StreamingResponse(
+        event_source(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+@router.post("/tickets/batch", response_model=TicketBatchResponse)
+async def create_ticket_batch(
+    batch_in: TicketBatchRequest,
+    response: Response,
+    db: AsyncSession = Depends(get_db)
+):
+    """
+    Inserts many tickets at once and runs them through the graph concurrently
+    (BATCH_CONCURRENCY at a time). One failing ticket doesn't affect the rest.
+    Rejected with 503 when the batch would overfill the ticket backlog.
+    """
+    if not await worker_pool.has_capacity(db, incoming=len(batch_in.tickets)):
+        raise HTTPException(
+            status_code=503,
+            detail="Ticket queue is full, retry later.",
+            headers={"Retry-After": "30"}
         )
 
-    except Exception as e:
-        # Error Fallback
-        await db.rollback() 
-        # If graph fails, mark ticket as Failed
-        new_ticket.status = TicketStatus.FAILED
-        db.add(new_ticket)
-        await db.commit()
-        raise HTTPException(status_code=500, detail=f"Processing failed: {str(e)}")
+    ticket_ids = await insert_tickets(
+        db, [(t.user_email, t.issue_description) for t in batch_in.tickets]
+    )
+    items = [
+        (ticket_id, t.user_email, t.issue_description)
+        for ticket_id, t in zip(ticket_ids, batch_in.tickets)
+    ]
+
+    if batch_in.wait:
+        results = await run_batch(items)
+        return TicketBatchResponse(ticket_ids=ticket_ids, done=True, results=results)
+
+    job = submit_batch_job(items)
+    response.status_code = 202
+    return TicketBatchResponse(job_id=job.job_id, ticket_ids=ticket_ids, done=False)
+
+@router.get("/tickets/batch/{job_id}", response_model=TicketBatchResponse)
+async def get_ticket_batch(job_id: str):
+    """
+    Progress and per-ticket results of a background batch job.
+    """
+    job = batch_jobs.get(job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Batch job not found")
+    return TicketBatchResponse(
+        job_id=job.job_id,
+        ticket_ids=job.ticket_ids,
+        done=job.done,
+        results=job.results,
+        error=job.error
+    )
@@ -8,7 +8,137 @@ class Settings(BaseSettings):
     OLLAMA_BASE_URL: str = "http://localhost:11434"
     OLLAMA_MODEL: str = "llama3"
     OLLAMA_EMBEDDING_MODEL: str = "nomic-embed-text"
+
+    # Pooled HTTP connections toward Ollama, shared by all LLM calls
+    OLLAMA_MAX_CONNECTIONS: int = 32
+    OLLAMA_CONNECT_TIMEOUT: float = 5.0
+    OLLAMA_REQUEST_TIMEOUT: float = 300.0
+    OLLAMA_KEEPALIVE_SECONDS: float = 60.0
+
+    # Per-node models and generation limits; an empty model means OLLAMA_MODEL.
+    # Triage is a short JSON classification, so a small model is enough.
+    TRIAGE_MODEL: str = ""
+    TRIAGE_NUM_PREDICT: int = 64
+    TRIAGE_NUM_CTX: int = 2048
+    DRAFTER_MODEL: str = ""
+    DRAFTER_NUM_PREDICT: int = 512
+    DRAFTER_NUM_CTX: int = 4096
+    # Drafter context: retrieved chunks are deduplicated, filtered and trimmed to
+    # at most this many tokens (also capped by DRAFTER_NUM_CTX).
+    CONTEXT_COMPRESSION_ENABLED: bool = True
+    DRAFTER_CONTEXT_TOKENS: int = 1024
+    # Chunks scoring below this fraction of the best chunk's lexical score are dropped.
+    CONTEXT_MIN_RELATIVE_SCORE: float = 0.2
+    # LLM calls in flight per node. Keep DRAFTER_CONCURRENCY below the total backend
+    # capacity so triage always finds a free slot.
+    TRIAGE_CONCURRENCY: int = 8
+    DRAFTER_CONCURRENCY: int = 3
+    # Drafts are admitted by triaged priority (High first). With this many tickets
+    # already waiting for a drafter slot, new Low tickets skip drafting and go to
+    # human review with their retrieved docs.
+    LOAD_SHEDDING_ENABLED: bool = True
+    DRAFTER_SHED_QUEUE_DEPTH: int = 8
+    # A draft waiting longer than this is admitted next whatever its priority, so
+    # a steady stream of High tickets can't starve queued Low ones (0 disables).
+    DRAFTER_MAX_WAIT_SECONDS: float = 30.0
+
+    # Several Ollama hosts, comma-separated (e.g. "http://gpu1:11434,http://gpu2:11434").
+    # Empty means OLLAMA_BASE_URL only.
+    OLLAMA_BACKENDS: str = ""
+    # Requests sent to one backend at a time; the rest queue for it.
+    OLLAMA_BACKEND_MAX_CONCURRENCY: int = 4
+    # Consecutive failures that open a backend's circuit, and how long it stays open.
+    OLLAMA_CIRCUIT_FAILURES: int = 3
+    OLLAMA_CIRCUIT_COOLDOWN_SECONDS: float = 30.0
+    # Other backends tried when a call fails before any output was streamed.
+    OLLAMA_MAX_RETRIES: int = 1
+    OLLAMA_HEALTH_INTERVAL_SECONDS: float = 10.0
+
     CHROMA_DB_PATH: str = "./data/chroma_db"
+
+    # Retrieval: dense + BM25 fused with reciprocal-rank fusion
+    HYBRID_RETRIEVAL_ENABLED: bool = True
+    # Hits taken from each retriever before fusion.
+    RETRIEVAL_CANDIDATES: int = 10
+    RRF_K: int = 60
+    # After the triage/research join, keep only candidates in the triaged category
+    # (plus shared "General" ones); fall back to the global ranking below this many.
+    CATEGORY_FILTER_ENABLED: bool = True
+    RETRIEVAL_MIN_CATEGORY_HITS: int = 2
+
+    # Ticket worker pool
+    # Number of tickets processed through the graph at the same time. Keep it well
+    # above DRAFTER_CONCURRENCY: the backlog must reach the drafter gate, where it
+    # waits in priority order, rather than wait FIFO in the database. Low tickets
+    # are only shed if WORKER_CONCURRENCY > DRAFTER_CONCURRENCY + DRAFTER_SHED_QUEUE_DEPTH.
+    WORKER_CONCURRENCY: int = 16
+    # Fallback poll interval (seconds) when no new ticket notification arrives.
+    WORKER_POLL_INTERVAL: float = 2.0
+    # A PROCESSING ticket claimed longer ago than this is presumed orphaned by a
+    # restart or crash and goes back to OPEN (resuming from its checkpoint). Keep
+    # it well above the longest graph run, i.e. a few OLLAMA_REQUEST_TIMEOUTs.
+    WORKER_LEASE_SECONDS: float = 900.0
+    # POST /tickets is rejected with 503 once this many tickets are waiting.
+    MAX_QUEUE_DEPTH: int = 500
+    # Threads available for blocking work (vector search, file I/O) offloaded from the event loop.
+    BLOCKING_POOL_SIZE: int = 8
+
+    # Embedding cache (float32 vectors in SQLite, LRU in front)
+    EMBEDDING_CACHE_PATH: str = "./data/embedding_cache.sqlite3"
+    EMBEDDING_CACHE_MAX_ENTRIES: int = 200_000
+    EMBEDDING_CACHE_MEMORY_ENTRIES: int = 4096
+
+    # Semantic response cache (opt-in): replay resolved tickets for near-duplicates
+    SEMANTIC_CACHE_ENABLED: bool = False
+    # Minimum cosine similarity between ticket descriptions to count as a hit.
+    SEMANTIC_CACHE_THRESHOLD: float = 0.95
+    SEMANTIC_CACHE_TTL_SECONDS: float = 3600.0
+    SEMANTIC_CACHE_MAX_ENTRIES: int = 1000
+
+    # Tiered triage: regex rules, then nearest-centroid, then the LLM
+    TRIAGE_FAST_PATH_ENABLED: bool = True
+    # Keyword hits a category needs before the rule tier decides.
+    TRIAGE_RULE_MIN_HITS: int = 1
+    TRIAGE_LABELS_PATH: str = "./data/triage_labels.jsonl"
+    # Centroid tier decides only above this cosine similarity and margin over the runner-up.
+    TRIAGE_CENTROID_MIN_SIMILARITY: float = 0.75
+    TRIAGE_CENTROID_MARGIN: float = 0.05
+
+    # Batch submission (POST /tickets/batch)
+    BATCH_MAX_SIZE: int = 500
+    # Tickets of one batch running through the graph at the same time.
+    BATCH_CONCURRENCY: int = 8
+    # Finished batch jobs kept in memory for polling.
+    BATCH_JOB_HISTORY: int = 100
+
+    # LLM single-flight: identical concurrent prompts share one Ollama call, and
+    # results are reused briefly (safe because the models run at temperature=0).
+    LLM_DEDUP_ENABLED: bool = True
+    LLM_RESULT_CACHE_TTL_SECONDS: float = 30.0
+    LLM_RESULT_CACHE_MAX_ENTRIES: int = 512
+
+    # Graph checkpoints: "postgres", "sqlite", "none", or "auto" (postgres when
+    # DATABASE_URL points at Postgres, otherwise sqlite at CHECKPOINT_SQLITE_PATH).
+    CHECKPOINT_BACKEND: str = "auto"
+    CHECKPOINT_SQLITE_PATH: str = "./data/checkpoints.sqlite3"
+
+    # Structured logs on stderr: "json" (one object per line) or "text" (key=value)
+    LOG_FORMAT: str = "json"
+    LOG_LEVEL: str = "INFO"
+
+    # Ticket change feed (GET /tickets/events): events kept for Last-Event-ID resume,
+    # per-subscriber backlog before it is told to re-sync, and keep-alive interval.
+    TICKET_EVENTS_BUFFER: int = 1000
+    TICKET_EVENTS_QUEUE_SIZE: int = 256
+    TICKET_EVENTS_HEARTBEAT_SECONDS: float = 15.0
+
+    # How long GET /tickets/stats results are reused.
+    STATS_CACHE_TTL_SECONDS: float = 5.0
+
+    # Knowledge-base ingestion (scripts/seed_knowledge.py)
+    INGEST_BATCH_SIZE: int = 32
+    INGEST_EMBED_CONCURRENCY: int = 4
+    INGEST_WORKERS: int = os.cpu_count() or 2
     
     class Config:
         env_file = ".env"
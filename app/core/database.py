@@ -1,7 +1,11 @@
+import logging
+from sqlalchemy import inspect
 from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession, async_sessionmaker
 from app.core.config import settings
 from app.models.sql_models import Base
 
+logger = logging.getLogger(__name__)
+
 # Create Async Engine
 engine = create_async_engine(settings.DATABASE_URL, echo=False)
 
@@ -13,13 +17,39 @@ AsyncSessionLocal = async_sessionmaker(
     autoflush=False
 )
 
+def upgrade_schema(conn):
+    """
+    Adds the columns and indexes that existing tables are missing (create_all
+    never alters a table that already exists). New columns are nullable or have
+    a server default, so adding them in place is safe; re-running is a no-op.
+    """
+    inspector = inspect(conn)
+    for table in Base.metadata.sorted_tables:
+        if not inspector.has_table(table.name):
+            continue
+        existing = {column["name"] for column in inspector.get_columns(table.name)}
+        for column in table.columns:
+            if column.name in existing:
+                continue
+            ddl = f"ALTER TABLE {table.name} ADD COLUMN {column.name} {column.type.compile(dialect=conn.dialect)}"
+            if column.server_default is not None:
+                ddl += f" DEFAULT {column.server_default.arg.compile(dialect=conn.dialect)}"
+            logger.info("adding column", extra={"table": table.name, "column": column.name})
+            conn.exec_driver_sql(ddl)
+        for index in table.indexes:
+            index.create(conn, checkfirst=True)
+
+def create_schema(conn):
+    Base.metadata.create_all(conn)
+    upgrade_schema(conn)
+
 async def init_db():
     """
-    Initializes the database tables. 
+    Creates missing tables and upgrades existing ones in place.
     In production, use Alembic for migrations.
     """
     async with engine.begin() as conn:
-        await conn.run_sync(Base.metadata.create_all)
+        await conn.run_sync(create_schema)
 
 async def get_db():
     """
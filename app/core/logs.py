@@ -0,0 +1,53 @@
+import json
+import logging
+import sys
+from app.core.config import settings
+
+# Attributes every LogRecord has; anything else was passed via `extra=`
+_RECORD_ATTRS = set(vars(logging.LogRecord("", 0, "", 0, "", None, None))) | {"message", "asctime", "taskName"}
+
+def _extra_fields(record: logging.LogRecord) -> dict:
+    return {k: v for k, v in vars(record).items() if k not in _RECORD_ATTRS}
+
+class JsonFormatter(logging.Formatter):
+    """
+    One JSON object per line: timestamp, level, logger, message and the `extra` fields.
+    """
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "ts": self.formatTime(record),
+            "level": record.levelname,
+            "logger": record.name,
+            "msg": record.getMessage(),
+            **_extra_fields(record),
+        }
+        if record.exc_info:
+            entry["exc"] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str)
+
+class KeyValueFormatter(logging.Formatter):
+    """
+    Human-readable variant for local runs: the message followed by key=value fields.
+    """
+
+    def __init__(self):
+        super().__init__("%(asctime)s %(levelname)s [%(name)s] %(message)s")
+
+    def format(self, record: logging.LogRecord) -> str:
+        line = super().format(record)
+        fields = " ".join(f"{k}={v}" for k, v in _extra_fields(record).items())
+        return f"{line} {fields}" if fields else line
+
+def configure_logging():
+    """
+    Routes the root logger to stderr with the LOG_FORMAT formatter. Idempotent.
+    """
+    root = logging.getLogger()
+    handler = next((h for h in root.handlers if getattr(h, "_app_handler", False)), None)
+    if handler is None:
+        handler = logging.StreamHandler(sys.stderr)
+        handler._app_handler = True
+        root.addHandler(handler)
+    handler.setFormatter(JsonFormatter() if settings.LOG_FORMAT == "json" else KeyValueFormatter())
+    root.setLevel(settings.LOG_LEVEL)
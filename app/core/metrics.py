@@ -0,0 +1,38 @@
+from typing import Any, Dict, Tuple
+from prometheus_client import CONTENT_TYPE_LATEST, Counter, Histogram, generate_latest
+
+# Exposed on /metrics; one series per graph node
+SECONDS_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+TOKEN_BUCKETS = (16, 32, 64, 128, 256, 512, 1024, 2048, 4096, 8192)
+HIT_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50)
+
+NODE_DURATION = Histogram(
+    "agent_node_duration_seconds", "Wall time of a graph node", ["node"], buckets=SECONDS_BUCKETS)
+NODE_QUEUE_WAIT = Histogram(
+    "agent_node_queue_wait_seconds", "Time a node waited for an LLM slot", ["node"], buckets=SECONDS_BUCKETS)
+NODE_PROMPT_TOKENS = Histogram(
+    "agent_node_prompt_tokens", "Prompt tokens sent to the LLM by a node", ["node"], buckets=TOKEN_BUCKETS)
+NODE_COMPLETION_TOKENS = Histogram(
+    "agent_node_completion_tokens", "Tokens generated by the LLM for a node", ["node"], buckets=TOKEN_BUCKETS)
+RETRIEVAL_HITS = Histogram(
+    "agent_retrieval_hits", "Knowledge base chunks returned (research) or kept (rerank)", ["node"], buckets=HIT_BUCKETS)
+DRAFTER_QUEUE_WAIT = Histogram(
+    "agent_drafter_queue_wait_seconds", "Time a ticket waited for a drafter slot", ["priority"], buckets=SECONDS_BUCKETS)
+DRAFTER_SHED = Counter("agent_drafter_shed_total", "Tickets sent to review without a draft under overload", ["priority"])
+NODE_FAILURES = Counter("agent_node_failures_total", "Graph node runs that raised", ["node"])
+
+def observe_node(node: str, metrics: Dict[str, Any]):
+    """
+    Records one node run (the dict stored under `node_metrics` in the AgentLog).
+    LLM and retrieval series are only observed for nodes that made such calls.
+    """
+    NODE_DURATION.labels(node).observe(metrics["wall_ms"] / 1000)
+    if metrics.get("llm_calls"):
+        NODE_QUEUE_WAIT.labels(node).observe(metrics["queue_wait_ms"] / 1000)
+        NODE_PROMPT_TOKENS.labels(node).observe(metrics["prompt_tokens"])
+        NODE_COMPLETION_TOKENS.labels(node).observe(metrics["completion_tokens"])
+    if metrics.get("retrieval_hits") is not None:
+        RETRIEVAL_HITS.labels(node).observe(metrics["retrieval_hits"])
+
+def render_metrics() -> Tuple[bytes, str]:
+    return generate_latest(), CONTENT_TYPE_LATEST
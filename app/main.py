@@ -1,7 +1,41 @@
-from fastapi import FastAPI
+import logging
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, Response
 from app.api.routes import router as tickets_router
+from app.agents.worker import worker_pool
+from app.agents.retriever import retriever
+from app.agents.embeddings import embedding_cache
+from app.agents.llm_engine import close_llm_clients, ollama_router
+from app.agents.checkpoints import checkpoints
+from app.core.executor import run_blocking
+from app.core.logs import configure_logging
+from app.core.metrics import render_metrics
 
-app = FastAPI(title="Auto-IT-Support Agent System")
+configure_logging()
+logger = logging.getLogger(__name__)
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Open the shared Chroma handle once so tickets don't pay for client construction
+    try:
+        await run_blocking(retriever.warm)
+    except Exception as e:
+        logger.warning("knowledge base warm-up failed", extra={"error": str(e)})
+    # Durable graph checkpoints, so failed tickets can resume where they stopped
+    await checkpoints.open()
+    # Health-probe the Ollama backends in the background
+    await ollama_router.start()
+    # Start the background workers that drain the ticket queue
+    await worker_pool.start()
+    yield
+    await worker_pool.stop()
+    await ollama_router.stop()
+    await checkpoints.close()
+    retriever.close()
+    embedding_cache.close()
+    await close_llm_clients()
+
+app = FastAPI(title="Auto-IT-Support Agent System", lifespan=lifespan)
 
 app.include_router(tickets_router, prefix="/api/v1", tags=["Tickets"])
 
@@ -9,6 +43,14 @@ app.include_router(tickets_router, prefix="/api/v1", tags=["Tickets"])
 def health_check():
     return {"status": "running", "system": "Auto-IT-Support"}
 
+@app.get("/metrics", include_in_schema=False)
+def metrics():
+    """
+    Prometheus scrape endpoint: per-node latency, LLM slot wait, token and retrieval histograms.
+    """
+    body, content_type = render_metrics()
+    return Response(content=body, media_type=content_type)
+
 if __name__ == "__main__":
     import uvicorn
     uvicorn.run("app.main:app", host="0.0.0.0", port=8000, reload=True)
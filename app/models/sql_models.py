@@ -1,10 +1,13 @@
 from datetime import datetime
 import enum
 from typing import Optional, List
-from sqlalchemy import Integer, String, Enum, DateTime, ForeignKey
+from sqlalchemy import Integer, String, Enum, DateTime, ForeignKey, Boolean, Index, JSON, false
 from sqlalchemy.orm import DeclarativeBase, Mapped, mapped_column, relationship
 from sqlalchemy.dialects.postgresql import JSONB
 
+# JSONB on Postgres; plain JSON elsewhere (SQLite for local runs and load tests)
+JSONDocument = JSON().with_variant(JSONB(), "postgresql")
+
 class Base(DeclarativeBase):
     pass
 
@@ -23,9 +26,22 @@ class Ticket(Base):
     issue_description: Mapped[str] = mapped_column(String)
     status: Mapped[TicketStatus] = mapped_column(Enum(TicketStatus), default=TicketStatus.OPEN)
     created_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow)
+    # When a run took the ticket (worker claim, or an inline stream/batch run). A
+    # PROCESSING ticket older than WORKER_LEASE_SECONDS lost its process and is requeued.
+    claimed_at: Mapped[Optional[datetime]] = mapped_column(DateTime, nullable=True)
 
     # Relationship to logs
-    logs: Mapped[List["AgentLog"]] = relationship("AgentLog", back_populates="ticket", cascade="all, delete-orphan")
+    logs: Mapped[List["AgentLog"]] = relationship(
+        "AgentLog", back_populates="ticket", cascade="all, delete-orphan",
+        order_by="AgentLog.created_at"
+    )
+
+    __table_args__ = (
+        # Keyset pagination filtered by status, and the worker's OPEN-ticket claim
+        Index("ix_tickets_status_id", "status", "id"),
+        # created_at range filters
+        Index("ix_tickets_created_at", "created_at"),
+    )
 
 class AgentLog(Base):
     __tablename__ = "agent_logs"
@@ -33,9 +49,22 @@ class AgentLog(Base):
     id: Mapped[int] = mapped_column(Integer, primary_key=True)
     ticket_id: Mapped[int] = mapped_column(ForeignKey("tickets.id"))
     category: Mapped[Optional[str]] = mapped_column(String, nullable=True)
-    rag_docs: Mapped[Optional[list]] = mapped_column(JSONB, nullable=True)  # Using JSONB for docs list
+    priority: Mapped[Optional[str]] = mapped_column(String, nullable=True)
+    # Which triage tier classified the ticket: rules, centroid or llm
+    triage_tier: Mapped[Optional[str]] = mapped_column(String, nullable=True)
+    rag_docs: Mapped[Optional[list]] = mapped_column(JSONDocument, nullable=True)  # Using JSONB for docs list
     response: Mapped[Optional[str]] = mapped_column(String, nullable=True)
     confidence_score: Mapped[float] = mapped_column(nullable=True)
+    # Drafter prompt size and prefill latency, to track the cost of the context
+    prompt_tokens: Mapped[Optional[int]] = mapped_column(Integer, nullable=True)
+    prefill_ms: Mapped[Optional[float]] = mapped_column(nullable=True)
+    # Per-node wall time, LLM slot wait, token and retrieval hit counts of the run
+    node_metrics: Mapped[Optional[dict]] = mapped_column(JSONDocument, nullable=True)
+    # True when the result was replayed from the semantic cache instead of running the graph
+    from_cache: Mapped[bool] = mapped_column(Boolean, default=False, server_default=false())
     created_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow)
 
     ticket: Mapped["Ticket"] = relationship("Ticket", back_populates="logs")
+
+# Latest-log lookups (ticket detail) walk this index backwards from the newest row
+Index("ix_agent_logs_ticket_id_created_at", AgentLog.ticket_id, AgentLog.created_at.desc(), AgentLog.id.desc())
@@ -1,4 +1,4 @@
-from typing import TypedDict, List, Annotated
+from typing import Any, Dict, TypedDict, List, Annotated, Optional
 import operator
 
 class AgentState(TypedDict):
@@ -9,7 +9,17 @@ class AgentState(TypedDict):
     user_query: str
     category: str
     priority: str
+    triage_tier: str
+    # Research hits across all categories ({"text", "category"}), filtered after the join
+    candidate_docs: List[Dict[str, Any]]
     retrieved_docs: List[str]
     draft_response: str
+    # True when the drafter was skipped under overload (no draft, human review)
+    shed: bool
+    # Drafter prompt size and time to its first token
+    prompt_tokens: int
+    prefill_ms: Optional[float]
     confidence_score: float
     needs_human_review: bool
+    # Per-node timings and token/hit counts, keyed by node (merged across parallel branches)
+    node_metrics: Annotated[Dict[str, Dict[str, Any]], operator.or_]
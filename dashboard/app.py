@@ -1,25 +1,36 @@
 import streamlit as st
-import requests
 import pandas as pd
 
 import os
+from feed import TIMEOUT, TicketFeed, make_session
 # Config
 st.set_page_config(layout="wide", page_title="Auto-IT Cockpit", page_icon="🤖")
 
 API_URL = os.getenv("API_URL", "http://localhost:8000/api/v1")
 
-def fetch_tickets():
+@st.cache_resource
+def get_session():
+    # Shared by every rerun and browser session: connections are reused, not re-opened
+    return make_session()
+
+@st.cache_resource
+def get_feed():
+    # One change-feed subscription per dashboard process, however many operators are online
+    return TicketFeed(API_URL, get_session()).start()
+
+def fetch_stats():
+    # Aggregated server-side (GROUP BY) instead of counting the ticket list here
     try:
-        resp = requests.get(f"{API_URL}/tickets")
+        resp = get_session().get(f"{API_URL}/tickets/stats", timeout=TIMEOUT)
         if resp.status_code == 200:
             return resp.json()
     except:
-        return []
-    return []
+        return None
+    return None
 
 def fetch_ticket_details(tid):
     try:
-        resp = requests.get(f"{API_URL}/tickets/{tid}")
+        resp = get_session().get(f"{API_URL}/tickets/{tid}", timeout=TIMEOUT)
         if resp.status_code == 200:
             return resp.json()
     except:
@@ -28,51 +39,69 @@ def fetch_ticket_details(tid):
 
 def approve_ticket(tid, final_content):
     try:
-        resp = requests.post(f"{API_URL}/tickets/{tid}/approve", json={"final_response": final_content})
+        resp = get_session().post(f"{API_URL}/tickets/{tid}/approve", json={"final_response": final_content}, timeout=TIMEOUT)
         return resp.status_code == 200
     except:
         return False
 
+def retry_ticket(tid):
+    try:
+        resp = get_session().post(f"{API_URL}/tickets/{tid}/retry", timeout=TIMEOUT)
+        return resp.status_code == 202
+    except:
+        return False
+
 # --- Sidebar ---
 st.sidebar.title("System Status")
-tickets = fetch_tickets()
-if tickets:
+stats = fetch_stats()
+if stats is not None:
     st.sidebar.success("Backend Online")
 else:
     st.sidebar.error("Backend Offline")
 
-df = pd.DataFrame(tickets)
-if not df.empty:
-    status_counts = df['status'].value_counts()
+if stats and stats['total']:
     st.sidebar.divider()
     st.sidebar.write("### Queue Stats")
-    for status, count in status_counts.items():
+    for status, count in stats['by_status'].items():
         st.sidebar.write(f"**{status}**: {count}")
+    if stats['by_category']:
+        st.sidebar.write("### By Category")
+        for category, count in stats['by_category'].items():
+            st.sidebar.write(f"**{category}**: {count}")
+    if stats['by_hour']:
+        st.sidebar.write("### Last 24h")
+        st.sidebar.bar_chart(pd.DataFrame(stats['by_hour']).set_index('hour'))
 else:
     st.sidebar.write("No tickets found.")
 
+feed = get_feed()
+
 # --- Main Page ---
 st.title("🛡️ Auto-IT Mission Control")
 
 # 1. Ticket Queue
 st.markdown("### 📋 Ticket Queue")
-if not df.empty:
-    # Filter view
-    filter_status = st.selectbox("Filter by Status", ["All", "Awaiting_Review", "Resolved", "Processing", "Open"], index=1)
-    
-    if filter_status != "All":
-        filtered_df = df[df['status'] == filter_status]
+filter_status = st.selectbox("Filter by Status", ["All", "Awaiting_Review", "Resolved", "Processing", "Open", "Failed"], index=1)
+
+@st.fragment(run_every="2s")
+def ticket_queue(filter_status):
+    # Redrawn from the local cache, which the change feed keeps current; no API call here
+    if not feed.connected:
+        st.caption("Live updates reconnecting...")
+    tickets = feed.tickets(status=None if filter_status == "All" else filter_status)
+    if tickets:
+        st.dataframe(pd.DataFrame(tickets), use_container_width=True)
     else:
-        filtered_df = df
-        
-    st.dataframe(filtered_df, use_container_width=True)
-    
-    # Selection
-    selected_id = st.number_input("Enter Ticket ID to Review", min_value=1, step=1)
-    
-    if selected_id:
-        if st.button("Load Details"):
-            st.session_state['current_ticket'] = fetch_ticket_details(selected_id)
+        st.write("No tickets found.")
+
+ticket_queue(filter_status)
+
+# Selection
+selected_id = st.number_input("Enter Ticket ID to Review", min_value=1, step=1)
+
+if selected_id:
+    if st.button("Load Details"):
+        st.session_state['current_ticket'] = fetch_ticket_details(selected_id)
 
 # 2. Detailed Workspace
 if 'current_ticket' in st.session_state and st.session_state['current_ticket']:
@@ -100,6 +129,14 @@ if 'current_ticket' in st.session_state and st.session_state['current_ticket']:
             st.warning("No RAG documents retrieved.")
 
     with col2:
+        if ticket['status'] == "Failed":
+            st.error("Processing failed for this ticket.")
+            if st.button("🔁 Retry (resumes from the failed step)"):
+                if retry_ticket(ticket['ticket_id']):
+                    st.success("Ticket re-queued.")
+                else:
+                    st.error("Failed to re-queue ticket.")
+
         st.success("### 🤖 AI Suggested Response")
         
         # Human in the loop interaction
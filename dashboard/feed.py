@@ -0,0 +1,165 @@
+import json
+import logging
+import threading
+from typing import Dict, Iterable, Iterator, List, Optional, Set, Tuple
+import requests
+from requests.adapters import HTTPAdapter
+
+logger = logging.getLogger(__name__)
+
+# (connect, read) seconds for REST calls
+TIMEOUT = (3.05, 10)
+# The feed's read timeout must outlast the server's keep-alive interval
+FEED_TIMEOUT = (3.05, 60)
+STATUSES = ("Open", "Processing", "Awaiting_Review", "Resolved", "Failed")
+
+def make_session(pool_size: int = 10) -> requests.Session:
+    """
+    One keep-alive connection pool shared by every call the dashboard makes.
+    """
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size)
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    return session
+
+def parse_sse(lines: Iterable[str]) -> Iterator[Tuple[Optional[str], str, dict]]:
+    """
+    Yields (id, event, data) for each Server-Sent Event; comments are skipped.
+    """
+    event_id, event, data = None, "message", []
+    for line in lines:
+        if not line:
+            if data:
+                yield event_id, event, json.loads("\n".join(data))
+            event_id, event, data = None, "message", []
+        elif line.startswith(":"):
+            continue
+        else:
+            field, _, value = line.partition(":")
+            value = value[1:] if value.startswith(" ") else value
+            if field == "id":
+                event_id = value
+            elif field == "event":
+                event = value
+            elif field == "data":
+                data.append(value)
+
+class TicketFeed:
+    """
+    Local ticket cache kept current from the API's change feed (GET /tickets/events),
+    so dashboard reruns read memory instead of re-fetching the ticket list.
+
+    A background thread holds the SSE connection. On first connect, and whenever
+    the server sends `reset`, the newest `page_size` tickets of each status are
+    re-fetched; after that only the streamed events are applied, and each status
+    keeps only its newest `page_size` tickets. Reconnects resume from the last event id.
+    """
+
+    def __init__(self, api_url: str, session: requests.Session, page_size: int = 200, retry_delay: float = 2.0):
+        self.api_url = api_url
+        self.session = session
+        self.page_size = page_size
+        self.retry_delay = retry_delay
+        self.last_event_id: Optional[str] = None
+        self.connected = False
+        self._tickets: Dict[int, dict] = {}
+        # Ticket ids per status, to trim each one to page_size
+        self._by_status: Dict[str, Set[int]] = {}
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self) -> "TicketFeed":
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="ticket-feed", daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+
+    def resync(self):
+        """
+        Replaces the cache with the newest page of every status.
+        """
+        tickets = {}
+        for status in STATUSES:
+            resp = self.session.get(f"{self.api_url}/tickets", params={"status": status, "limit": self.page_size},
+                                    timeout=TIMEOUT)
+            resp.raise_for_status()
+            for item in resp.json()["items"]:
+                tickets[item["id"]] = item
+        by_status: Dict[str, Set[int]] = {}
+        for item in tickets.values():
+            by_status.setdefault(item["status"], set()).add(item["id"])
+        with self._lock:
+            self._tickets = tickets
+            self._by_status = by_status
+
+    def apply(self, event: str, ticket: dict):
+        """
+        Applies one `created` or `status` event to the cache.
+        """
+        if event not in ("created", "status"):
+            return
+        with self._lock:
+            current = self._tickets.get(ticket["id"], {})
+            # Bulk status updates don't carry created_at; keep the one we have
+            updated = {**current, **{k: v for k, v in ticket.items() if v is not None}}
+            self._tickets[ticket["id"]] = updated
+            if current.get("status") != updated["status"]:
+                self._by_status.get(current.get("status"), set()).discard(ticket["id"])
+                bucket = self._by_status.setdefault(updated["status"], set())
+                bucket.add(ticket["id"])
+                # Same window as a re-sync: the newest page_size of each status
+                while len(bucket) > self.page_size:
+                    oldest = min(bucket)
+                    bucket.discard(oldest)
+                    del self._tickets[oldest]
+
+    def tickets(self, status: Optional[str] = None) -> List[dict]:
+        """
+        Cached tickets, newest first, optionally of one status.
+        """
+        with self._lock:
+            items = list(self._tickets.values())
+        if status:
+            items = [t for t in items if t["status"] == status]
+        return sorted(items, key=lambda t: t["id"], reverse=True)
+
+    def consume(self, events: Iterable[Tuple[Optional[str], str, dict]], needs_resync: bool) -> bool:
+        """
+        Applies a stream of parsed events; returns whether a re-sync is still owed.
+        """
+        for event_id, event, data in events:
+            if self._stop.is_set():
+                break
+            if event == "ready":
+                self.connected = True
+                if needs_resync:
+                    self.resync()
+                    needs_resync = False
+            elif event == "reset":
+                self.resync()
+                needs_resync = False
+            else:
+                self.apply(event, data)
+            if event_id:
+                self.last_event_id = event_id
+        return needs_resync
+
+    def _run(self):
+        needs_resync = True
+        while not self._stop.is_set():
+            headers = {"Last-Event-ID": self.last_event_id} if self.last_event_id else {}
+            try:
+                with self.session.get(f"{self.api_url}/tickets/events", headers=headers,
+                                      stream=True, timeout=FEED_TIMEOUT) as resp:
+                    resp.raise_for_status()
+                    lines = resp.iter_lines(decode_unicode=True)
+                    needs_resync = self.consume(parse_sse(lines), needs_resync)
+            except (requests.RequestException, ValueError) as e:
+                logger.warning("ticket feed disconnected", extra={"error": str(e)})
+            self.connected = False
+            self._stop.wait(self.retry_delay)
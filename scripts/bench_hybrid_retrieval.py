@@ -0,0 +1,125 @@
+import argparse
+import hashlib
+import random
+import statistics
+import tempfile
+import time
+from typing import List
+import chromadb
+from langchain_core.embeddings import Embeddings
+from app.core.config import settings
+from app.agents.bm25 import BM25Index, tokenize
+from app.agents.retriever import KnowledgeRetriever, bm25_path, bump_version, COLLECTION_NAME
+
+TOPICS = [
+    ("VPN", "connect to the corporate vpn before opening internal tools"),
+    ("Outlook", "mail client crashes or fails to sync the mailbox"),
+    ("Printer", "network printer queue is stuck and jobs never print"),
+    ("Password", "reset your password through the self service portal"),
+    ("Laptop", "laptop does not boot or shows a blue screen"),
+    ("Wi-Fi", "wireless connection drops in meeting rooms"),
+]
+
+class TopicEmbeddings(Embeddings):
+    """
+    Fixture stand-in for a dense model: hashes ordinary words into a small vector
+    and ignores identifier-like tokens (codes, hostnames), which is where real
+    dense models are weakest. Use --ollama to benchmark the real embedder.
+    """
+    DIM = 64
+
+    def _embed(self, text: str) -> List[float]:
+        vector = [0.0] * self.DIM
+        for token in tokenize(text):
+            if any(ch.isdigit() for ch in token) or "." in token:
+                continue
+            vector[int(hashlib.md5(token.encode()).hexdigest(), 16) % self.DIM] += 1.0
+        return vector
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        return [self._embed(t) for t in texts]
+
+    def embed_query(self, text: str) -> List[float]:
+        return self._embed(text)
+
+def build_fixture(n_docs: int, seed: int):
+    """
+    Synthetic KB: every chunk has a topic plus a unique error code, host and KB number.
+    Queries mention only the identifier, so exactly one chunk is relevant.
+    """
+    rng = random.Random(seed)
+    chunks, queries = [], []
+    for i in range(n_docs):
+        topic, blurb = TOPICS[i % len(TOPICS)]
+        code = f"0x{rng.getrandbits(32):08x}"
+        host = f"{topic.lower().replace('-', '')}{i}.corp.example.com"
+        kb = f"KB{100000 + i}"
+        text = (f"{kb}: {topic} troubleshooting. If you see error {code}, {blurb}. "
+                f"The service endpoint is {host}. Contact the service desk if the issue persists.")
+        chunk_id = f"doc-{i}"
+        chunks.append((chunk_id, text))
+        template = rng.choice(["Getting error {code} again", "cannot reach {host}", "what does {kb} say"])
+        queries.append((template.format(code=code, host=host, kb=kb), chunk_id))
+    return chunks, queries
+
+def evaluate(name, search, queries, texts_by_id, k):
+    latencies, hits = [], 0
+    for query, relevant_id in queries:
+        start = time.perf_counter()
+        results = search(query, k)
+        latencies.append(time.perf_counter() - start)
+        hits += texts_by_id[relevant_id] in results
+    latencies_ms = sorted(l * 1000 for l in latencies)
+    p95 = latencies_ms[max(0, int(len(latencies_ms) * 0.95) - 1)]
+    print(f"{name:<8} recall@{k}={hits / len(queries):6.1%}  p50={statistics.median(latencies_ms):7.2f}ms  p95={p95:7.2f}ms")
+
+def main():
+    parser = argparse.ArgumentParser(description="Dense vs BM25 vs hybrid (RRF) retrieval on a fixture corpus.")
+    parser.add_argument("--docs", type=int, default=2000)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("-k", type=int, default=3)
+    parser.add_argument("--seed", type=int, default=13)
+    parser.add_argument("--ollama", action="store_true", help="Use the real (cached) Ollama embedder")
+    args = parser.parse_args()
+
+    if args.ollama:
+        from app.agents.embeddings import embedder as dense_embedder
+    else:
+        dense_embedder = TopicEmbeddings()
+
+    chunks, queries = build_fixture(args.docs, args.seed)
+    queries = queries[:args.queries]
+    texts_by_id = dict(chunks)
+
+    with tempfile.TemporaryDirectory() as db_path:
+        collection = chromadb.PersistentClient(path=db_path).get_or_create_collection(COLLECTION_NAME)
+        ids, texts = [c[0] for c in chunks], [c[1] for c in chunks]
+        for start in range(0, len(ids), 1000):
+            collection.upsert(
+                ids=ids[start:start + 1000],
+                documents=texts[start:start + 1000],
+                embeddings=dense_embedder.embed_documents(texts[start:start + 1000]),
+            )
+        build_start = time.perf_counter()
+        index = BM25Index.build(chunks)
+        index.save(bm25_path(db_path))
+        print(f"Fixture: {len(chunks)} chunks, {len(queries)} queries "
+              f"(BM25 build {time.perf_counter() - build_start:.2f}s, vocab {len(index.vocab)})")
+        bump_version(db_path)
+
+        settings.HYBRID_RETRIEVAL_ENABLED = False
+        dense = KnowledgeRetriever(db_path, embedder=dense_embedder)
+        dense.warm()
+        settings.HYBRID_RETRIEVAL_ENABLED = True
+        hybrid = KnowledgeRetriever(db_path, embedder=dense_embedder)
+        hybrid.warm()
+        mapped = BM25Index.load(bm25_path(db_path))
+
+        evaluate("dense", dense.query, queries, texts_by_id, args.k)
+        evaluate("bm25", lambda q, k: [texts_by_id[i] for i, _ in mapped.search(q, k)], queries, texts_by_id, args.k)
+        evaluate("hybrid", hybrid.query, queries, texts_by_id, args.k)
+        dense.close()
+        hybrid.close()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,87 @@
+import argparse
+import asyncio
+import statistics
+import time
+from langchain_community.chat_models import ChatOllama
+from langchain_core.output_parsers import JsonOutputParser
+from langchain_core.prompts import PromptTemplate
+from app.core.config import settings
+from app.agents import llm_engine, nodes
+from app.agents.ollama_router import OllamaRouter
+from scripts.fake_ollama import FakeOllamaServer
+
+TRIAGE_REPLY = '{"category": "Network", "priority": "High"}'
+
+async def per_call_ticket(i: int):
+    """
+    The previous hot path: new client, parser, prompts and chains for every node call.
+    """
+    llm = ChatOllama(base_url=settings.OLLAMA_BASE_URL, model=settings.OLLAMA_MODEL, temperature=0)
+    parser = JsonOutputParser(pydantic_object=nodes.TriageOutput)
+    prompt = PromptTemplate(
+        template="Classify the IT support ticket.\n{format_instructions}\n\nTicket: {query}\n",
+        input_variables=["query"],
+        partial_variables={"format_instructions": parser.get_format_instructions()},
+    )
+    await (prompt | llm | parser).ainvoke({"query": f"VPN down #{i}"})
+
+    llm = ChatOllama(base_url=settings.OLLAMA_BASE_URL, model=settings.OLLAMA_MODEL, temperature=0)
+    prompt = PromptTemplate(template="Context: {docs}\nUser Query: {query}\n", input_variables=["docs", "query"])
+    async for _ in (prompt | llm).astream({"docs": "VPN guide", "query": f"VPN down #{i}"}):
+        pass
+
+async def pooled_ticket(i: int):
+    """
+    The current hot path: shared clients and compiled chains.
+    """
+    llm, parser, format_instructions = llm_engine.get_structured_llm(nodes.TriageOutput)
+    chain = nodes._compiled_chain(
+        "triage", llm, lambda: nodes.TRIAGE_PROMPT.partial(format_instructions=format_instructions) | llm
+    )
+    parser.invoke(await chain.ainvoke({"query": f"VPN down #{i}"}))
+
+    llm = llm_engine.get_llm()
+    chain = nodes._compiled_chain("drafter", llm, lambda: nodes.DRAFTER_PROMPT | llm)
+    async for _ in chain.astream({"docs": "VPN guide", "query": f"VPN down #{i}"}):
+        pass
+
+async def measure(name, ticket, tickets: int, concurrency: int, server: FakeOllamaServer):
+    server.connections.clear()
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies = []
+
+    async def one(i):
+        async with semaphore:
+            start = time.perf_counter()
+            await ticket(i)
+            latencies.append(time.perf_counter() - start)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(one(i) for i in range(tickets)))
+    elapsed = time.perf_counter() - start
+    latencies_ms = sorted(l * 1000 for l in latencies)
+    p95 = latencies_ms[max(0, int(len(latencies_ms) * 0.95) - 1)]
+    print(f"{name:<9} per-ticket p50={statistics.median(latencies_ms):6.2f}ms  p95={p95:6.2f}ms  "
+          f"throughput={tickets / elapsed:7.1f} tickets/s  connections opened={len(server.connections)}")
+
+async def main(args):
+    # Distinct prompts per ticket, so this measures client overhead rather than dedup
+    settings.LLM_DEDUP_ENABLED = False
+    async with FakeOllamaServer(reply=TRIAGE_REPLY, delay=0) as server:
+        settings.OLLAMA_BASE_URL = server.base_url
+        llm_engine.ollama_router = OllamaRouter([server.base_url], llm_engine.ollama_transport.session,
+                                                max_concurrency=args.concurrency)
+        # Warm both paths once (imports, first connection)
+        await per_call_ticket(-1)
+        await pooled_ticket(-1)
+        print(f"{args.tickets} tickets (triage + drafter call each), concurrency {args.concurrency}, "
+              f"stub server with zero generation time")
+        await measure("per-call", per_call_ticket, args.tickets, args.concurrency, server)
+        await measure("pooled", pooled_ticket, args.tickets, args.concurrency, server)
+        await llm_engine.close_llm_clients()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Per-ticket LLM client overhead, excluding generation time.")
+    parser.add_argument("--tickets", type=int, default=500)
+    parser.add_argument("--concurrency", type=int, default=8)
+    asyncio.run(main(parser.parse_args()))
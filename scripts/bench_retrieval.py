@@ -0,0 +1,61 @@
+import argparse
+import statistics
+import time
+from app.core.config import settings
+from app.agents.retriever import KnowledgeRetriever
+
+QUERIES = [
+    "VPN not connecting",
+    "reset password",
+    "password requirement",
+    "cannot access shared drive",
+    "invoice for software license",
+]
+
+def summarize(label, samples):
+    samples_ms = sorted(s * 1000 for s in samples)
+    p95 = samples_ms[int(len(samples_ms) * 0.95) - 1] if len(samples_ms) >= 20 else samples_ms[-1]
+    print(f"{label:<6} mean={statistics.mean(samples_ms):8.2f}ms  p50={statistics.median(samples_ms):8.2f}ms  p95={p95:8.2f}ms")
+
+def bench_cold(db_path, iterations):
+    """
+    Old research_node behaviour: new client + collection handle for every query.
+    """
+    samples = []
+    for i in range(iterations):
+        start = time.perf_counter()
+        r = KnowledgeRetriever(db_path)
+        r.query(QUERIES[i % len(QUERIES)])
+        samples.append(time.perf_counter() - start)
+        r.close()
+    return samples
+
+def bench_warm(db_path, iterations):
+    """
+    Shared, warmed handle as used by the API.
+    """
+    r = KnowledgeRetriever(db_path)
+    r.warm()
+    samples = []
+    for i in range(iterations):
+        start = time.perf_counter()
+        r.query(QUERIES[i % len(QUERIES)])
+        samples.append(time.perf_counter() - start)
+    r.close()
+    return samples
+
+def main():
+    parser = argparse.ArgumentParser(description="Cold vs warm Chroma query latency.")
+    parser.add_argument("--db-path", default=settings.CHROMA_DB_PATH)
+    parser.add_argument("--iterations", type=int, default=50)
+    args = parser.parse_args()
+
+    print(f"Benchmarking retrieval against {args.db_path} ({args.iterations} queries each)")
+    cold = bench_cold(args.db_path, args.iterations)
+    warm = bench_warm(args.db_path, args.iterations)
+    summarize("cold", cold)
+    summarize("warm", warm)
+    print(f"speedup (mean): {statistics.mean(cold) / statistics.mean(warm):.1f}x")
+
+if __name__ == "__main__":
+    main()
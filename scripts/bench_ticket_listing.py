@@ -0,0 +1,91 @@
+import argparse
+import asyncio
+import random
+import statistics
+import time
+from datetime import datetime, timedelta
+from sqlalchemy import insert, delete, select, func, text
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker, AsyncSession
+from app.core.config import settings
+from app.core.database import create_schema
+from app.models.sql_models import Ticket, TicketStatus
+from app.api.routes import list_tickets
+
+BENCH_DOMAIN = "@bench.local"
+# Only finished tickets: OPEN or PROCESSING rows would be claimed (or requeued) by
+# any worker pool pointed at the same database
+STATUSES = [TicketStatus.AWAITING_REVIEW, TicketStatus.RESOLVED, TicketStatus.FAILED]
+
+async def top_up(engine, sessions, target: int) -> int:
+    """
+    Inserts synthetic tickets until the table holds `target` benchmark rows.
+    """
+    async with sessions() as db:
+        current = (await db.execute(
+            select(func.count()).select_from(Ticket).where(Ticket.user_email.like(f"%{BENCH_DOMAIN}"))
+        )).scalar_one()
+        now = datetime.utcnow()
+        while current < target:
+            batch = min(5000, target - current)
+            await db.execute(insert(Ticket), [
+                {
+                    "user_email": f"user{random.randint(1, 500)}{BENCH_DOMAIN}",
+                    "issue_description": f"Synthetic ticket {current + i}: VPN drops every few minutes.",
+                    "status": random.choice(STATUSES),
+                    "created_at": now - timedelta(minutes=current + i),
+                } for i in range(batch)
+            ])
+            current += batch
+        await db.commit()
+    async with engine.connect() as conn:
+        if engine.dialect.name == "postgresql":
+            await conn.execute(text("ANALYZE tickets"))
+    return current
+
+async def time_call(sessions, iterations: int, **params) -> float:
+    samples = []
+    defaults = dict(after_id=None, limit=50, status=None, user_email=None, created_after=None, created_before=None)
+    for _ in range(iterations):
+        async with sessions() as db:
+            start = time.perf_counter()
+            await list_tickets(db=db, **{**defaults, **params})
+            samples.append(time.perf_counter() - start)
+    return statistics.median(samples) * 1000
+
+async def main(database_url, sizes, iterations, keep):
+    engine = create_async_engine(database_url, echo=False)
+    sessions = async_sessionmaker(bind=engine, class_=AsyncSession, expire_on_commit=False)
+    async with engine.begin() as conn:
+        await conn.run_sync(create_schema)
+    print(f"{'rows':>9} {'first page':>11} {'deep page':>10} {'by status':>10} {'by date':>9}   (median ms)")
+    for size in sizes:
+        await top_up(engine, sessions, size)
+        async with sessions() as db:
+            max_id = (await db.execute(select(func.max(Ticket.id)))).scalar_one()
+        results = [
+            await time_call(sessions, iterations),
+            await time_call(sessions, iterations, after_id=max_id - size // 2),
+            await time_call(sessions, iterations, status=TicketStatus.AWAITING_REVIEW),
+            await time_call(sessions, iterations, created_after=datetime.utcnow() - timedelta(days=1)),
+        ]
+        print(f"{size:>9} " + " ".join(f"{r:>10.2f}" for r in results))
+
+    if not keep:
+        async with sessions() as db:
+            await db.execute(delete(Ticket).where(Ticket.user_email.like(f"%{BENCH_DOMAIN}")))
+            await db.commit()
+    await engine.dispose()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="GET /tickets latency as the table grows.")
+    parser.add_argument("--database-url", required=True,
+                        help="Dedicated benchmark database, e.g. sqlite+aiosqlite:///data/bench.sqlite3 "
+                             "(never the app's DATABASE_URL)")
+    parser.add_argument("--sizes", default="1000,10000,100000")
+    parser.add_argument("--iterations", type=int, default=20)
+    parser.add_argument("--keep", action="store_true", help="Leave the synthetic rows in place")
+    args = parser.parse_args()
+    if make_url(args.database_url) == make_url(settings.DATABASE_URL):
+        parser.error("--database-url must not be the app's DATABASE_URL")
+    asyncio.run(main(args.database_url, [int(s) for s in args.sizes.split(",")], args.iterations, args.keep))
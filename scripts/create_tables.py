@@ -1,13 +1,12 @@
-
 import asyncio
-from app.core.database import engine
-from app.models.sql_models import Base
+from app.core.database import engine, create_schema
 
 async def init_tables():
     async with engine.begin() as conn:
-        print("Creating tables...")
-        await conn.run_sync(Base.metadata.create_all)
-        print("Tables created.")
+        # Also adds columns and indexes introduced since the tables were created
+        print("Creating or upgrading tables...")
+        await conn.run_sync(create_schema)
+        print("Tables ready.")
     await engine.dispose()
 
 if __name__ == "__main__":
@@ -0,0 +1,78 @@
+import argparse
+import asyncio
+import random
+from collections import defaultdict
+from app.core.config import settings
+from app.agents.embeddings import embedder
+from app.agents.triage import CentroidClassifier, FastTriage, load_labelled_tickets
+
+async def llm_triage(text: str):
+    from app.agents.nodes import triage_node
+    # Bypass the fast path so this measures the LLM alone
+    settings.TRIAGE_FAST_PATH_ENABLED = False
+    result = await triage_node({"user_query": text})
+    return result["category"], result["priority"]
+
+def main():
+    parser = argparse.ArgumentParser(description="Offline evaluation of the tiered triage engine.")
+    parser.add_argument("--labels", default=settings.TRIAGE_LABELS_PATH, help="JSONL of {text, category, priority}")
+    parser.add_argument("--test-labels", help="Separate evaluation set; otherwise a holdout split of --labels is used")
+    parser.add_argument("--holdout", type=float, default=0.3)
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--min-similarity", type=float, default=settings.TRIAGE_CENTROID_MIN_SIMILARITY)
+    parser.add_argument("--margin", type=float, default=settings.TRIAGE_CENTROID_MARGIN)
+    parser.add_argument("--with-llm", action="store_true", help="Also score the LLM on tickets the fast tiers skip")
+    args = parser.parse_args()
+
+    examples = load_labelled_tickets(args.labels)
+    if args.test_labels:
+        train, test = examples, load_labelled_tickets(args.test_labels)
+    else:
+        random.Random(args.seed).shuffle(examples)
+        cut = int(len(examples) * (1 - args.holdout))
+        train, test = examples[:cut], examples[cut:]
+    if not test:
+        print("No evaluation examples.")
+        return
+
+    classifier = CentroidClassifier(embedder, min_similarity=args.min_similarity, margin=args.margin)
+    classifier.fit(train)
+    # Already fitted on the training split, so the labels file isn't re-read
+    engine = FastTriage(classifier, labels_path=args.labels)
+
+    counts = defaultdict(int)
+    correct = defaultdict(lambda: [0, 0])  # tier -> [category correct, both correct]
+    for example in test:
+        decision = engine.classify(example["text"])
+        if decision:
+            tier, category, priority = decision.tier, decision.category, decision.priority
+        elif args.with_llm:
+            tier = "llm"
+            category, priority = asyncio.run(llm_triage(example["text"]))
+        else:
+            counts["llm"] += 1
+            continue
+        counts[tier] += 1
+        correct[tier][0] += category == example["category"]
+        correct[tier][1] += category == example["category"] and priority == example["priority"]
+
+    total = len(test)
+    print(f"Train: {len(train)}  Test: {total}  (min_similarity={args.min_similarity}, margin={args.margin})")
+    print(f"{'tier':<10}{'tickets':>8}{'share':>8}{'cat acc':>9}{'cat+prio':>10}")
+    for tier in ("rules", "centroid", "llm"):
+        n = counts[tier]
+        if tier == "llm" and not args.with_llm:
+            print(f"{tier:<10}{n:>8}{n / total:>8.0%}{'-':>9}{'-':>10}")
+            continue
+        cat_acc = correct[tier][0] / n if n else 0.0
+        both_acc = correct[tier][1] / n if n else 0.0
+        print(f"{tier:<10}{n:>8}{n / total:>8.0%}{cat_acc:>9.0%}{both_acc:>10.0%}")
+
+    fast = counts["rules"] + counts["centroid"]
+    fast_correct = correct["rules"][0] + correct["centroid"][0]
+    print(f"\nLLM calls avoided: {fast}/{total} ({fast / total:.0%})")
+    if fast:
+        print(f"Fast-path category accuracy: {fast_correct / fast:.0%}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,115 @@
+import argparse
+import asyncio
+import hashlib
+import json
+import math
+import re
+from typing import List, Optional, Set, Tuple
+from aiohttp import web
+
+EMBEDDING_DIM = 64
+
+def fake_embedding(text: str) -> List[float]:
+    """
+    Hashed bag of words, L2-normalised: texts sharing words end up close.
+    """
+    vector = [0.0] * EMBEDDING_DIM
+    for word in re.findall(r"[a-z0-9]+", text.lower()):
+        vector[int(hashlib.md5(word.encode()).hexdigest(), 16) % EMBEDDING_DIM] += 1.0
+    norm = math.sqrt(sum(v * v for v in vector)) or 1.0
+    return [v / norm for v in vector]
+
+class FakeOllamaServer:
+    """
+    Minimal local Ollama HTTP API for tests and benchmarks. `/api/chat` waits
+    `delay` seconds and streams `reply` word by word as NDJSON, `token_delay`
+    seconds apart (`json_reply` instead, if set, for `format: json` requests); `/api/embeddings` returns a deterministic bag-of-words vector.
+    Request bodies are kept in `requests`, client sockets seen in `connections`;
+    set `status` to make it answer with an error instead.
+    """
+
+    def __init__(self, reply: str = "ok", delay: float = 0.1, host: str = "127.0.0.1", port: int = 0,
+                 token_delay: float = 0.0, json_reply: Optional[str] = None):
+        self.reply = reply
+        self.json_reply = json_reply
+        self.delay = delay
+        self.token_delay = token_delay
+        self.host = host
+        self.port = port
+        self.status = 200
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self.requests: List[dict] = []
+        self.connections: Set[Tuple] = set()
+        self.base_url = ""
+        self._runner: Optional[web.AppRunner] = None
+
+    async def _chat(self, request: web.Request) -> web.StreamResponse:
+        body = await request.json()
+        self.requests.append(body)
+        self.connections.add(request.transport.get_extra_info("peername"))
+        if self.status != 200:
+            return web.json_response({"error": "fake failure"}, status=self.status)
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        try:
+            await asyncio.sleep(self.delay)
+        finally:
+            self.in_flight -= 1
+        response = web.StreamResponse(headers={"Content-Type": "application/x-ndjson"})
+        await response.prepare(request)
+        reply = self.json_reply if self.json_reply is not None and body.get("format") == "json" else self.reply
+        words = reply.split(" ")
+        for i, word in enumerate(words):
+            if i and self.token_delay:
+                await asyncio.sleep(self.token_delay)
+            token = word if i == len(words) - 1 else word + " "
+            line = {"message": {"role": "assistant", "content": token}, "done": False}
+            await response.write((json.dumps(line) + "\n").encode())
+        done = {"message": {"role": "assistant", "content": ""}, "done": True, "eval_count": len(words)}
+        await response.write((json.dumps(done) + "\n").encode())
+        await response.write_eof()
+        return response
+
+    async def _embeddings(self, request: web.Request) -> web.Response:
+        body = await request.json()
+        if self.status != 200:
+            return web.json_response({"error": "fake failure"}, status=self.status)
+        return web.json_response({"embedding": fake_embedding(body.get("prompt", ""))})
+
+    async def _tags(self, request: web.Request) -> web.Response:
+        if self.status != 200:
+            return web.json_response({"error": "fake failure"}, status=self.status)
+        return web.json_response({"models": [{"name": "fake:latest"}]})
+
+    async def __aenter__(self) -> "FakeOllamaServer":
+        app = web.Application()
+        app.router.add_post("/api/chat", self._chat)
+        app.router.add_post("/api/embeddings", self._embeddings)
+        app.router.add_get("/api/tags", self._tags)
+        self._runner = web.AppRunner(app)
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, self.host, self.port)
+        await site.start()
+        port = site._server.sockets[0].getsockname()[1]
+        self.base_url = f"http://{self.host}:{port}"
+        return self
+
+    async def __aexit__(self, *exc):
+        await self._runner.cleanup()
+
+async def serve(args):
+    async with FakeOllamaServer(reply=args.reply, delay=args.delay, host=args.host, port=args.port,
+                                token_delay=args.token_delay) as server:
+        print(f"Fake Ollama listening on {server.base_url}")
+        await asyncio.Event().wait()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Stub Ollama server (/api/chat, /api/embeddings, /api/tags) for local testing.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=11434)
+    parser.add_argument("--delay", type=float, default=0.1, help="Seconds before the first token")
+    parser.add_argument("--token-delay", type=float, default=0.0, help="Seconds between streamed tokens")
+    parser.add_argument("--reply", default='{"category": "Network", "priority": "High"}')
+    args = parser.parse_args()
+    asyncio.run(serve(args))
@@ -7,6 +7,8 @@ import chromadb
 from sqlalchemy.ext.asyncio import create_async_engine
 from sqlalchemy import text
 from app.core.config import settings
+from app.agents.llm_engine import backend_urls
+from app.agents.ollama_router import probe_ollama
 
 # ANSI colors
 GREEN = "\033[92m"
@@ -30,19 +32,15 @@ async def check_postgres():
         return False
 
 def check_ollama():
-    try:
-        url = f"{settings.OLLAMA_BASE_URL}/api/tags"
-        resp = requests.get(url, timeout=2)
-        if resp.status_code == 200:
-            models = [m['name'] for m in resp.json().get('models', [])]
-            print_status("Ollama", True, f"Online (Models: {', '.join(models[:3])}...)")
-            return True
-        else:
-            print_status("Ollama", False, f"Status Code: {resp.status_code}")
-            return False
-    except Exception as e:
-        print_status("Ollama", False, f"Unreachable: {str(e)}")
-        return False
+    ok = True
+    for url in backend_urls():
+        try:
+            models = probe_ollama(url)
+            print_status(f"Ollama {url}", True, f"Online (Models: {', '.join(models[:3])}...)")
+        except Exception as e:
+            print_status(f"Ollama {url}", False, f"Unreachable: {str(e)}")
+            ok = False
+    return ok
 
 def check_chroma():
     try:
@@ -0,0 +1,259 @@
+"""
+Self-contained load test: boots the API (SQLite by default, or --database-url),
+a fake Ollama server and a fixture knowledge base, then drives concurrent ticket
+submissions and reports latency percentiles, throughput and event-loop lag as JSON.
+
+    python -m scripts.load_test --tickets 200 --concurrency 20 --output results.json
+    python -m scripts.load_test --baseline results.json   # non-zero exit on regression
+"""
+import argparse
+import asyncio
+import contextlib
+import json
+import math
+import os
+import socket
+import sys
+import tempfile
+import threading
+import time
+from collections import Counter
+from typing import Any, Dict, List
+import aiohttp
+from scripts.fake_ollama import FakeOllamaServer
+
+FIXTURE_KB = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures", "knowledge_base")
+TICKET_TEXTS = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "data", "triage_labels.jsonl")
+DONE_STATUSES = {"Resolved", "Awaiting_Review", "Failed"}
+TRIAGE_REPLY = '{"category": "Network", "priority": "High"}'
+DRAFT_SENTENCE = "Please restart the VPN client and sign in again with your SSO account."
+# How often the app's event loop is sampled for lag
+LAG_INTERVAL = 0.01
+
+def percentiles(samples: List[float]) -> Dict[str, float]:
+    """
+    Nearest-rank p50/p95/p99 plus mean and max; empty input gives zeros.
+    """
+    if not samples:
+        return {"p50": 0.0, "p95": 0.0, "p99": 0.0, "mean": 0.0, "max": 0.0}
+    ordered = sorted(samples)
+    rank = lambda q: ordered[max(0, math.ceil(q * len(ordered)) - 1)]
+    return {
+        "p50": round(rank(0.50), 2),
+        "p95": round(rank(0.95), 2),
+        "p99": round(rank(0.99), 2),
+        "mean": round(sum(ordered) / len(ordered), 2),
+        "max": round(ordered[-1], 2),
+    }
+
+def regressions(result: Dict[str, Any], baseline: Dict[str, Any], tolerance: float) -> List[str]:
+    """
+    Metrics that got worse than `baseline` by more than `tolerance` (a fraction).
+    """
+    found = []
+    if result["throughput_tickets_per_s"] < baseline["throughput_tickets_per_s"] * (1 - tolerance):
+        found.append(f"throughput {result['throughput_tickets_per_s']} < {baseline['throughput_tickets_per_s']} tickets/s")
+    for q in ("p50", "p95", "p99"):
+        now, before = result["latency_ms"][q], baseline["latency_ms"][q]
+        if now > before * (1 + tolerance):
+            found.append(f"latency {q} {now} > {before} ms")
+    return found
+
+def ticket_texts(count: int) -> List[str]:
+    """
+    Ticket descriptions cycled from the labelled triage examples, made unique so
+    neither the LLM result cache nor the semantic cache short-circuits them.
+    """
+    with open(TICKET_TEXTS) as f:
+        texts = [json.loads(line)["text"] for line in f if line.strip()]
+    return [f"{texts[i % len(texts)]} (ref {i})" for i in range(count)]
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+def configure_environment(args, workdir: str, ollama_url: str):
+    """
+    Points the app's settings at the fakes. Must run before anything under `app` is imported.
+    """
+    os.environ.update({
+        "DATABASE_URL": args.database_url or f"sqlite+aiosqlite:///{os.path.join(workdir, 'tickets.sqlite3')}",
+        "OLLAMA_BASE_URL": ollama_url,
+        "OLLAMA_BACKENDS": "",
+        "CHROMA_DB_PATH": os.path.join(workdir, "chroma_db"),
+        "EMBEDDING_CACHE_PATH": os.path.join(workdir, "embedding_cache.sqlite3"),
+        "CHECKPOINT_SQLITE_PATH": os.path.join(workdir, "checkpoints.sqlite3"),
+        "WORKER_CONCURRENCY": str(args.workers),
+        "MAX_QUEUE_DEPTH": str(max(args.tickets, 500)),
+        "SEMANTIC_CACHE_ENABLED": "false",
+        "LOG_LEVEL": args.log_level,
+    })
+
+class AppServer:
+    """
+    Runs the FastAPI app under uvicorn on its own thread and event loop, and
+    samples that loop's scheduling lag while `measuring` is set.
+    """
+
+    def __init__(self, port: int):
+        self.port = port
+        self.base_url = f"http://127.0.0.1:{port}/api/v1"
+        self.lag_ms: List[float] = []
+        self.measuring = False
+        self._server = None
+        self._ready = threading.Event()
+        self._thread = threading.Thread(target=lambda: asyncio.run(self._serve()), name="load-test-app", daemon=True)
+
+    async def _sample_lag(self):
+        while True:
+            start = time.perf_counter()
+            await asyncio.sleep(LAG_INTERVAL)
+            if self.measuring:
+                self.lag_ms.append(max(0.0, time.perf_counter() - start - LAG_INTERVAL) * 1000)
+
+    async def _serve(self):
+        import uvicorn
+        from app.core.database import init_db
+        from app.main import app
+
+        await init_db()
+        self._server = uvicorn.Server(uvicorn.Config(app, host="127.0.0.1", port=self.port, log_level="warning"))
+        sampler = asyncio.create_task(self._sample_lag())
+        serving = asyncio.create_task(self._server.serve())
+        while not self._server.started and not serving.done():
+            await asyncio.sleep(0.01)
+        self._ready.set()
+        await serving
+        sampler.cancel()
+
+    def start(self, timeout: float = 60.0):
+        self._thread.start()
+        if not self._ready.wait(timeout) or not self._server.started:
+            raise RuntimeError("API server did not start")
+
+    def stop(self):
+        self._server.should_exit = True
+        self._thread.join(timeout=30)
+
+async def run_ticket(session: aiohttp.ClientSession, base_url: str, text: str, poll_interval: float) -> Dict[str, Any]:
+    start = time.perf_counter()
+    async with session.post(f"{base_url}/tickets", json={"user_email": "load@example.com", "issue_description": text}) as resp:
+        resp.raise_for_status()
+        ticket_id = (await resp.json())["ticket_id"]
+    submitted = time.perf_counter()
+    while True:
+        await asyncio.sleep(poll_interval)
+        async with session.get(f"{base_url}/tickets/{ticket_id}") as resp:
+            status = (await resp.json())["status"]
+        if status in DONE_STATUSES:
+            break
+    return {
+        "ticket_id": ticket_id,
+        "status": status,
+        "submit_ms": (submitted - start) * 1000,
+        "latency_ms": (time.perf_counter() - start) * 1000,
+        "done_at": time.perf_counter(),
+    }
+
+async def drive(server: AppServer, texts: List[str], concurrency: int, poll_interval: float) -> Dict[str, Any]:
+    """
+    Closed loop: `concurrency` clients, each submitting a ticket and waiting
+    until the worker pool has finished it before sending the next.
+    """
+    pending = iter(texts)
+    results: List[Dict[str, Any]] = []
+
+    async def client(session):
+        for text in pending:
+            results.append(await run_ticket(session, server.base_url, text, poll_interval))
+
+    connector = aiohttp.TCPConnector(limit=concurrency * 2)
+    async with aiohttp.ClientSession(connector=connector, timeout=aiohttp.ClientTimeout(total=600)) as session:
+        server.lag_ms.clear()
+        server.measuring = True
+        start = time.perf_counter()
+        await asyncio.gather(*(client(session) for _ in range(concurrency)))
+        elapsed = time.perf_counter() - start
+        server.measuring = False
+        async with session.get(f"{server.base_url}/queue/status") as resp:
+            drafter_queue = (await resp.json())["drafter_queue"]
+
+    completed = [r for r in results if r["status"] != "Failed"]
+    return {
+        "tickets": len(results),
+        "statuses": dict(Counter(r["status"] for r in results)),
+        "duration_s": round(elapsed, 3),
+        "throughput_tickets_per_s": round(len(completed) / elapsed, 2) if elapsed else 0.0,
+        "latency_ms": percentiles([r["latency_ms"] for r in completed]),
+        "submit_latency_ms": percentiles([r["submit_ms"] for r in results]),
+        "event_loop_lag_ms": percentiles(server.lag_ms),
+        # Per priority since startup: admitted, shed, avg/max wait for a drafter slot
+        "drafter_queue": drafter_queue,
+    }
+
+async def main(args) -> int:
+    draft = " ".join([DRAFT_SENTENCE] * max(1, args.draft_tokens // len(DRAFT_SENTENCE.split(" "))))
+    async with FakeOllamaServer(reply=draft, json_reply=TRIAGE_REPLY, delay=args.llm_latency,
+                                token_delay=1 / args.token_rate if args.token_rate else 0.0) as ollama:
+        with tempfile.TemporaryDirectory(prefix="load-test-") as workdir:
+            configure_environment(args, workdir, ollama.base_url)
+            from scripts.seed_knowledge import seed_knowledge_base
+            # Seeding logs go to stderr so stdout stays a single JSON document
+            # (in a thread: it embeds through the fake server running on this loop)
+            with contextlib.redirect_stdout(sys.stderr):
+                await asyncio.to_thread(seed_knowledge_base, source_dir=FIXTURE_KB, workers=1, full=True)
+
+            texts = ticket_texts(args.warmup + args.tickets)
+            server = AppServer(free_port())
+            await asyncio.to_thread(server.start)
+            try:
+                # A few tickets first so imports, connections and caches are warm
+                if args.warmup:
+                    await drive(server, texts[:args.warmup], min(args.concurrency, args.warmup), args.poll_interval)
+                ollama.requests.clear()
+                result = await drive(server, texts[args.warmup:], args.concurrency, args.poll_interval)
+            finally:
+                await asyncio.to_thread(server.stop)
+
+    result["llm_requests"] = len(ollama.requests)
+    result["config"] = {
+        "database": "postgres" if args.database_url else "sqlite",
+        "concurrency": args.concurrency,
+        "workers": args.workers,
+        "llm_latency_s": args.llm_latency,
+        "token_rate": args.token_rate,
+        "draft_tokens": len(draft.split(" ")),
+        "poll_interval_s": args.poll_interval,
+    }
+    output = json.dumps(result, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(output + "\n")
+    print(output)
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            found = regressions(result, json.load(f), args.tolerance)
+        for line in found:
+            print(f"REGRESSION: {line}", file=sys.stderr)
+        return 1 if found else 0
+    return 0
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Load test the ticket pipeline against a fake Ollama server.")
+    parser.add_argument("--tickets", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=20, help="Concurrent clients (closed loop)")
+    parser.add_argument("--workers", type=int, default=16, help="WORKER_CONCURRENCY for the app")
+    parser.add_argument("--warmup", type=int, default=5)
+    parser.add_argument("--database-url", default=None,
+                        help="e.g. postgresql+asyncpg://...; defaults to a throwaway SQLite file")
+    parser.add_argument("--llm-latency", type=float, default=0.05, help="Seconds before the first token")
+    parser.add_argument("--token-rate", type=float, default=200.0, help="Streamed tokens per second (0: unthrottled)")
+    parser.add_argument("--draft-tokens", type=int, default=60)
+    parser.add_argument("--poll-interval", type=float, default=0.05)
+    parser.add_argument("--log-level", default="WARNING")
+    parser.add_argument("--output", help="Also write the JSON result here")
+    parser.add_argument("--baseline", help="Earlier result to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.1, help="Allowed regression vs the baseline (fraction)")
+    sys.exit(asyncio.run(main(parser.parse_args())))
@@ -1,47 +1,130 @@
 import os
 import glob
-from langchain_community.document_loaders import PyPDFLoader, TextLoader, DirectoryLoader
+import json
+import hashlib
+import argparse
+import fnmatch
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Dict, List, Tuple
+import chromadb
+from langchain_community.document_loaders import PyPDFLoader, TextLoader
 from langchain_text_splitters import RecursiveCharacterTextSplitter
-from langchain_community.embeddings import OllamaEmbeddings
-from langchain_chroma import Chroma
 from app.core.config import settings
+from app.agents.retriever import bump_version, bm25_path, COLLECTION_NAME, SHARED_CATEGORY
+from app.agents.triage import CATEGORIES
+from app.agents.bm25 import BM25Index
+from app.agents.embeddings import embedder, embedding_cache
 
-def load_documents(directory_path: str):
+MANIFEST_NAME = "ingest_manifest.json"
+# Optional {glob pattern: category} file in the source dir, e.g. {"vpn_*.pdf": "Network"}
+CATEGORY_MAP_NAME = "categories.json"
+
+# A chunk ready for upsert: (id, text, metadata)
+Chunk = Tuple[str, str, dict]
+
+def discover_files(directory_path: str) -> List[str]:
     """
-    Scans the directory for PDF and TXT files and loads them.
+    Scans the directory for PDF and TXT files.
     Using explicit globbing to handle different file types better than DirectoryLoader sometimes.
     """
-    documents = []
-    
-    # Load TXT
-    txt_files = glob.glob(os.path.join(directory_path, "**/*.txt"), recursive=True)
-    for file_path in txt_files:
-        try:
-            loader = TextLoader(file_path)
-            documents.extend(loader.load())
-            print(f"Loaded: {file_path}")
-        except Exception as e:
-            print(f"Failed to load {file_path}: {e}")
-
-    # Load PDF
-    pdf_files = glob.glob(os.path.join(directory_path, "**/*.pdf"), recursive=True)
-    for file_path in pdf_files:
-        try:
-            loader = PyPDFLoader(file_path)
-            documents.extend(loader.load())
-            print(f"Loaded: {file_path}")
-        except Exception as e:
-            print(f"Failed to load {file_path}: {e}")
-            
-    return documents
-
-def seed_knowledge_base():
+    files = []
+    for pattern in ("**/*.txt", "**/*.pdf"):
+        files.extend(glob.glob(os.path.join(directory_path, pattern), recursive=True))
+    return sorted(files)
+
+def file_hash(file_path: str) -> str:
+    digest = hashlib.sha256()
+    with open(file_path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+def load_category_map(source_dir: str) -> Dict[str, str]:
+    path = os.path.join(source_dir, CATEGORY_MAP_NAME)
+    if not os.path.exists(path):
+        return {}
+    with open(path) as f:
+        return json.load(f)
+
+def infer_category(file_path: str, source_dir: str, category_map: Dict[str, str]) -> str:
     """
-    Main function to ingest documents into ChromaDB.
+    Category for a source file: the first matching pattern in the mapping file,
+    else a top-level folder named after a category (e.g. source_docs/network/...),
+    else the shared category.
     """
-    source_dir = "data/source_docs"
-    
-    # 1. Setup Data Directory
+    relative = os.path.relpath(file_path, source_dir).replace(os.sep, "/")
+    for pattern, category in category_map.items():
+        if fnmatch.fnmatch(relative, pattern):
+            return category
+    if "/" in relative:
+        folder = relative.split("/", 1)[0].lower()
+        for category in CATEGORIES:
+            if category.lower() == folder:
+                return category
+    return SHARED_CATEGORY
+
+def chunk_id_prefix(file_path: str, source_dir: str, content_hash: str) -> str:
+    """
+    Stable per-file prefix for chunk ids. The relative path is part of it, so two
+    files with identical content don't overwrite each other's chunks.
+    """
+    relative = os.path.relpath(file_path, source_dir).replace(os.sep, "/")
+    return hashlib.sha256(f"{relative}\0{content_hash}".encode()).hexdigest()[:16]
+
+def load_and_split(file_path: str, id_prefix: str, category: str = SHARED_CATEGORY) -> List[Chunk]:
+    """
+    Loads and splits one file. Runs in a worker process, so it only returns plain data.
+    Chunk ids are "<id_prefix>-<n>" (see chunk_id_prefix), which keeps them stable across runs.
+    """
+    loader = PyPDFLoader(file_path) if file_path.lower().endswith(".pdf") else TextLoader(file_path)
+    docs = loader.load()
+
+    # selected chunk_size=1000 to keep enough context for the LLM to understand the policy.
+    # overlap=200 ensures continuity between chunks if sentences are cut off.
+    text_splitter = RecursiveCharacterTextSplitter(
+        chunk_size=1000,
+        chunk_overlap=200
+    )
+    splits = text_splitter.split_documents(docs)
+    return [
+        (f"{id_prefix}-{i}", split.page_content, {**split.metadata, "source": file_path, "category": category})
+        for i, split in enumerate(splits)
+    ]
+
+def load_manifest(db_path: str) -> Dict[str, dict]:
+    path = os.path.join(db_path, MANIFEST_NAME)
+    if not os.path.exists(path):
+        return {}
+    with open(path) as f:
+        return json.load(f)
+
+def save_manifest(db_path: str, manifest: Dict[str, dict]):
+    os.makedirs(db_path, exist_ok=True)
+    path = os.path.join(db_path, MANIFEST_NAME)
+    with open(path + ".tmp", "w") as f:
+        json.dump(manifest, f, indent=2, sort_keys=True)
+    os.replace(path + ".tmp", path)
+
+def embed_in_batches(texts: List[str], batch_size: int, concurrency: int) -> List[List[float]]:
+    """
+    Sends embedding requests to Ollama in batches, several in flight at once.
+    """
+    batches = [texts[i:i + batch_size] for i in range(0, len(texts), batch_size)]
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        results = list(pool.map(embedder.embed_documents, batches))
+    return [vector for batch in results for vector in batch]
+
+def rebuild_bm25(collection, db_path: str) -> int:
+    """
+    Rebuilds the keyword index from every chunk currently in the collection.
+    """
+    stored = collection.get(include=["documents"])
+    index = BM25Index.build(zip(stored["ids"], stored["documents"]))
+    index.save(bm25_path(db_path))
+    return len(index)
+
+def ensure_source_dir(source_dir: str):
     if not os.path.exists(source_dir):
         os.makedirs(source_dir)
         # Create dummy policy if empty
@@ -50,41 +133,106 @@ def seed_knowledge_base():
             print("creating dummy policy.txt...")
             with open(dummy_file, "w") as f:
                 f.write("IT Security Policy 2025: All passwords must be 16 characters long. use the portal at vpn.example.com.")
-    
-    # 2. Load
-    docs = load_documents(source_dir)
-    if not docs:
-        print("No documents found.")
+
+def seed_knowledge_base(
+    source_dir: str = "data/source_docs",
+    batch_size: int = settings.INGEST_BATCH_SIZE,
+    concurrency: int = settings.INGEST_EMBED_CONCURRENCY,
+    workers: int = settings.INGEST_WORKERS,
+    full: bool = False,
+):
+    """
+    Incrementally ingests documents into ChromaDB.
+
+    Unchanged files (same content hash as in the manifest) are skipped, changed
+    files have their old chunks replaced, and files that disappeared are purged.
+    """
+    start = time.perf_counter()
+
+    # 1. Setup Data Directory
+    ensure_source_dir(source_dir)
+
+    client = chromadb.PersistentClient(path=settings.CHROMA_DB_PATH)
+    manifest = {} if full else load_manifest(settings.CHROMA_DB_PATH)
+    if not manifest:
+        # No manifest means chunk ids are unknown (or a full rebuild was asked): start clean
+        try:
+            client.delete_collection(COLLECTION_NAME)
+        except Exception:
+            pass
+    collection = client.get_or_create_collection(name=COLLECTION_NAME)
+
+    # 2. Diff against the manifest
+    files = discover_files(source_dir)
+    hashes = {path: file_hash(path) for path in files}
+    category_map = load_category_map(source_dir)
+    categories = {path: infer_category(path, source_dir, category_map) for path in files}
+    # A re-categorised file is re-ingested so its chunks carry the new tag
+    changed = [p for p in files if manifest.get(p, {}).get("hash") != hashes[p]
+               or manifest.get(p, {}).get("category") != categories[p]]
+    removed = [p for p in manifest if p not in hashes]
+    print(f"Files: {len(files)} total, {len(changed)} new/changed, {len(removed)} removed, "
+          f"{len(files) - len(changed)} unchanged")
+
+    stale_ids = [cid for p in changed + removed for cid in manifest.get(p, {}).get("chunk_ids", [])]
+    if stale_ids:
+        collection.delete(ids=stale_ids)
+        print(f"Deleted {len(stale_ids)} stale chunks")
+    for p in removed:
+        del manifest[p]
+
+    if not changed and not removed:
+        if not os.path.exists(bm25_path(settings.CHROMA_DB_PATH)):
+            print(f"Built BM25 index over {rebuild_bm25(collection, settings.CHROMA_DB_PATH)} chunks")
+            bump_version(settings.CHROMA_DB_PATH)
+        print("Knowledge base is up to date.")
         return
 
-    # 3. Split
-    # selected chunk_size=1000 to keep enough context for the LLM to understand the policy.
-    # overlap=200 ensures continuity between chunks if sentences are cut off.
-    text_splitter = RecursiveCharacterTextSplitter(
-        chunk_size=1000,
-        chunk_overlap=200
-    )
-    splits = text_splitter.split_documents(docs)
-    print(f"Total splits created: {len(splits)}")
+    # 3. Load & split changed files in parallel
+    chunks: List[Chunk] = []
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = {p: pool.submit(load_and_split, p, chunk_id_prefix(p, source_dir, hashes[p]), categories[p]) for p in changed}
+        for path, future in futures.items():
+            try:
+                file_chunks = future.result()
+            except Exception as e:
+                print(f"Failed to load {path}: {e}")
+                manifest.pop(path, None)
+                continue
+            chunks.extend(file_chunks)
+            manifest[path] = {"hash": hashes[path], "category": categories[path],
+                              "chunk_ids": [c[0] for c in file_chunks]}
+            print(f"Loaded: {path} [{categories[path]}] ({len(file_chunks)} chunks)")
+    print(f"Total splits created: {len(chunks)}")
 
     # 4. Embed & Store
-    print(f"Embedding using model: {settings.OLLAMA_EMBEDDING_MODEL}")
-    embedding_function = OllamaEmbeddings(
-        base_url=settings.OLLAMA_BASE_URL,
-        model=settings.OLLAMA_EMBEDDING_MODEL
-    )
-    
-    # Persist to Chroma
-    # We use the standard langchain_chroma wrapper
-    vectorstore = Chroma.from_documents(
-        documents=splits,
-        embedding=embedding_function,
-        collection_name="tech_docs",
-        persist_directory=settings.CHROMA_DB_PATH
-    )
-    
-    # Note: In newer langchain_chroma versions, persistence is automatic.
-    print(f"Successfully ingested {len(splits)} chunks into ChromaDB at {settings.CHROMA_DB_PATH}.")
+    if chunks:
+        print(f"Embedding using model: {settings.OLLAMA_EMBEDDING_MODEL} "
+              f"(batch={batch_size}, concurrency={concurrency})")
+        embed_start = time.perf_counter()
+        ids, texts, metadatas = (list(x) for x in zip(*chunks))
+        vectors = embed_in_batches(texts, batch_size, concurrency)
+        embed_elapsed = time.perf_counter() - embed_start
+        collection.upsert(ids=ids, embeddings=vectors, documents=texts, metadatas=metadatas)
+        print(f"Embedded {len(chunks)} chunks in {embed_elapsed:.2f}s "
+              f"({len(chunks) / max(embed_elapsed, 1e-9):.1f} chunks/s)")
+
+    save_manifest(settings.CHROMA_DB_PATH, manifest)
+    print(f"Built BM25 index over {rebuild_bm25(collection, settings.CHROMA_DB_PATH)} chunks")
+    # Bump the version marker so running API processes reload the collection.
+    bump_version(settings.CHROMA_DB_PATH)
+
+    elapsed = time.perf_counter() - start
+    print(f"Successfully ingested {len(chunks)} chunks into ChromaDB at {settings.CHROMA_DB_PATH} "
+          f"in {elapsed:.2f}s ({len(chunks) / max(elapsed, 1e-9):.1f} chunks/s overall).")
+    print(f"Embedding cache: {embedding_cache.stats()}")
 
 if __name__ == "__main__":
-    seed_knowledge_base()
+    parser = argparse.ArgumentParser(description="Incrementally ingest source docs into ChromaDB.")
+    parser.add_argument("--source-dir", default="data/source_docs")
+    parser.add_argument("--batch-size", type=int, default=settings.INGEST_BATCH_SIZE)
+    parser.add_argument("--concurrency", type=int, default=settings.INGEST_EMBED_CONCURRENCY)
+    parser.add_argument("--workers", type=int, default=settings.INGEST_WORKERS)
+    parser.add_argument("--full", action="store_true", help="Ignore the manifest and rebuild everything")
+    args = parser.parse_args()
+    seed_knowledge_base(args.source_dir, args.batch_size, args.concurrency, args.workers, args.full)
@@ -11,8 +11,8 @@ def test_trace():
     
     try:
         response = requests.post(url, json=payload)
-        if response.status_code == 200:
-            print("Request successful! Check LangSmith dashboard.")
+        if response.status_code in (200, 202):
+            print("Ticket queued! The worker pool will pick it up; check LangSmith dashboard.")
             print(f"Response: {response.json()}")
         else:
             print(f"Request failed: {response.status_code} - {response.text}")
@@ -0,0 +1,76 @@
+import asyncio
+import time
+from typing import Any, AsyncIterator, List, Optional
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage, AIMessageChunk, BaseMessage
+from langchain_core.outputs import ChatGeneration, ChatGenerationChunk, ChatResult
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker, AsyncSession
+from app.agents import llm_engine
+from app.models.sql_models import Base
+from app.agents.ollama_router import OllamaRouter
+from scripts.fake_ollama import FakeOllamaServer
+
+class SleepyChatModel(BaseChatModel):
+    """
+    Fake LLM that takes `delay` seconds to answer.
+    The sync path blocks the thread, the async path yields to the event loop,
+    so a node calling `invoke` instead of `ainvoke` serialises the whole graph.
+    """
+    reply: str = "ok"
+    delay: float = 0.2
+
+    @property
+    def _llm_type(self) -> str:
+        return "sleepy-fake"
+
+    def _generate(self, messages: List[BaseMessage], stop: Optional[List[str]] = None, run_manager: Any = None, **kwargs) -> ChatResult:
+        time.sleep(self.delay)
+        return ChatResult(generations=[ChatGeneration(message=AIMessage(content=self.reply))])
+
+    async def _agenerate(self, messages: List[BaseMessage], stop: Optional[List[str]] = None, run_manager: Any = None, **kwargs) -> ChatResult:
+        await asyncio.sleep(self.delay)
+        return ChatResult(generations=[ChatGeneration(message=AIMessage(content=self.reply))])
+
+class StreamingChatModel(SleepyChatModel):
+    """
+    Fake LLM that streams `reply` word by word, sleeping `delay` seconds per token.
+    """
+
+    async def _astream(self, messages: List[BaseMessage], stop: Optional[List[str]] = None, run_manager: Any = None, **kwargs) -> AsyncIterator[ChatGenerationChunk]:
+        words = self.reply.split(" ")
+        for i, word in enumerate(words):
+            await asyncio.sleep(self.delay)
+            token = word if i == len(words) - 1 else word + " "
+            yield ChatGenerationChunk(message=AIMessageChunk(content=token))
+
+def route_to(monkeypatch, *servers: FakeOllamaServer, **router_kwargs) -> OllamaRouter:
+    """
+    Points the shared LLM clients at the given fake servers.
+    """
+    router_kwargs.setdefault("probe_interval", 0)
+    router = OllamaRouter([s.base_url for s in servers], llm_engine.ollama_transport.session, **router_kwargs)
+    monkeypatch.setattr(llm_engine, "ollama_router", router)
+    monkeypatch.setattr(llm_engine, "_clients", {})
+    return router
+
+class FlakyChatModel(StreamingChatModel):
+    """
+    Streams `reply`, but the first `failures` calls time out.
+    """
+    failures: int = 1
+
+    async def _astream(self, messages, stop=None, run_manager=None, **kwargs):
+        if self.failures > 0:
+            self.failures -= 1
+            raise TimeoutError("Ollama timed out")
+        async for chunk in super()._astream(messages, stop, run_manager, **kwargs):
+            yield chunk
+
+async def sqlite_sessions(path):
+    """
+    Throwaway SQLite database with the app's tables; returns (engine, session factory).
+    """
+    engine = create_async_engine(f"sqlite+aiosqlite:///{path}")
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    return engine, async_sessionmaker(bind=engine, class_=AsyncSession, expire_on_commit=False)
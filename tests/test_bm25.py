@@ -0,0 +1,34 @@
+import numpy as np
+from app.agents.bm25 import BM25Index, tokenize, reciprocal_rank_fusion
+
+CHUNKS = [
+    ("a", "Connect to the VPN portal at vpn.example.com using your SSO credentials."),
+    ("b", "Error 0x800704cf means the network location cannot be reached."),
+    ("c", "Passwords must be 16 characters long and rotated every 90 days."),
+    ("d", "The VPN client must be updated before connecting from home."),
+]
+
+def test_tokenize_keeps_compound_tokens_and_parts():
+    tokens = tokenize("Cannot reach vpn.example.com (error 0x800704CF)")
+    assert "vpn.example.com" in tokens and "vpn" in tokens and "example" in tokens
+    assert "0x800704cf" in tokens
+
+def test_exact_tokens_rank_first_and_index_round_trips(tmp_path):
+    index = BM25Index.build(CHUNKS)
+    assert index.search("error 0x800704cf", k=2)[0][0] == "b"
+    assert index.search("vpn.example.com down", k=3)[0][0] == "a"
+    assert index.search("printer toner", k=3) == []
+
+    index.save(str(tmp_path / "bm25"))
+    loaded = BM25Index.load(str(tmp_path / "bm25"))
+    assert isinstance(loaded.postings_docs, np.memmap)
+    assert loaded.search("vpn client", k=4) == index.search("vpn client", k=4)
+
+    # Saving again replaces the previous index in place
+    BM25Index.build(CHUNKS[:1]).save(str(tmp_path / "bm25"))
+    assert len(BM25Index.load(str(tmp_path / "bm25"))) == 1
+
+def test_reciprocal_rank_fusion_rewards_agreement():
+    fused = reciprocal_rank_fusion([["x", "y", "z"], ["y", "w"]], k=60)
+    assert fused[0] == "y"
+    assert set(fused) == {"x", "y", "z", "w"}
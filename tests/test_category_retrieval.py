@@ -0,0 +1,59 @@
+import hashlib
+from typing import List
+import chromadb
+from langchain_core.embeddings import Embeddings
+from app.core.config import settings
+from app.agents.bm25 import tokenize
+from app.agents.retriever import KnowledgeRetriever, COLLECTION_NAME, bump_version, rerank_by_category
+
+class BagOfWordsEmbeddings(Embeddings):
+    DIM = 32
+
+    def _embed(self, text: str) -> List[float]:
+        vector = [0.0] * self.DIM
+        for token in tokenize(text):
+            vector[int(hashlib.md5(token.encode()).hexdigest(), 16) % self.DIM] += 1.0
+        return vector
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        return [self._embed(t) for t in texts]
+
+    def embed_query(self, text: str) -> List[float]:
+        return self._embed(text)
+
+DOCS = [
+    ("net-1", "Reset the VPN client and reconnect to the corporate network.", "Network"),
+    ("net-2", "Wi-Fi drops in meeting rooms: forget the network and rejoin.", "Network"),
+    ("acc-1", "Reset your password through the self service portal.", "Access"),
+    ("gen-1", "Contact the service desk if the issue persists after a reset.", "General"),
+]
+
+def _retriever(tmp_path, monkeypatch) -> KnowledgeRetriever:
+    monkeypatch.setattr(settings, "HYBRID_RETRIEVAL_ENABLED", False)
+    embedder = BagOfWordsEmbeddings()
+    db_path = str(tmp_path / "chroma")
+    collection = chromadb.PersistentClient(path=db_path).get_or_create_collection(COLLECTION_NAME)
+    collection.upsert(
+        ids=[d[0] for d in DOCS],
+        documents=[d[1] for d in DOCS],
+        metadatas=[{"category": d[2]} for d in DOCS],
+        embeddings=embedder.embed_documents([d[1] for d in DOCS]),
+    )
+    bump_version(db_path)
+    return KnowledgeRetriever(db_path, embedder=embedder)
+
+def test_search_returns_chunk_categories_for_post_join_rerank(tmp_path, monkeypatch):
+    retriever = _retriever(tmp_path, monkeypatch)
+    monkeypatch.setattr(settings, "RETRIEVAL_MIN_CATEGORY_HITS", 2)
+    try:
+        chunks = retriever.search("reset", n_results=4)
+        assert {c.category for c in chunks} == {"Network", "Access", "General"}
+        candidates = [{"text": c.text, "category": c.category} for c in chunks]
+
+        # The category is applied after retrieval, once triage has run
+        assert set(rerank_by_category(candidates, "Access", 4)) == {DOCS[2][1], DOCS[3][1]}
+        assert rerank_by_category(candidates, "General", 2) == [c.text for c in chunks[:2]]
+        # Only one Billing candidate (the shared one): keep the global ranking
+        assert rerank_by_category(candidates, "Billing", 3) == [c.text for c in chunks[:3]]
+    finally:
+        retriever.close()
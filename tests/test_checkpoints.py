@@ -0,0 +1,62 @@
+import asyncio
+import json
+from langchain_core.output_parsers import JsonOutputParser
+from app.agents import nodes
+from app.agents.checkpoints import CheckpointStore, ticket_config
+from app.agents.nodes import TriageOutput
+from app.agents.worker import run_ticket_graph
+from app.core.config import settings
+from tests.fakes import FlakyChatModel, SleepyChatModel
+
+def test_failed_run_resumes_from_the_drafter(tmp_path, monkeypatch):
+    calls = {"triage": 0, "research": 0}
+    parser = JsonOutputParser(pydantic_object=TriageOutput)
+    triage_llm = SleepyChatModel(reply=json.dumps({"category": "Network", "priority": "High"}), delay=0)
+    drafter_llm = FlakyChatModel(reply="Restart the VPN client.", delay=0)
+
+    def structured_llm(*_):
+        calls["triage"] += 1
+        return triage_llm, parser, parser.get_format_instructions()
+
+    def knowledge_base(query):
+        calls["research"] += 1
+        return [{"text": "VPN guide", "category": "Network"}]
+
+    monkeypatch.setattr(settings, "TRIAGE_FAST_PATH_ENABLED", False)
+    monkeypatch.setattr(settings, "CHECKPOINT_BACKEND", "sqlite")
+    monkeypatch.setattr(settings, "CHECKPOINT_SQLITE_PATH", str(tmp_path / "checkpoints.sqlite3"))
+    monkeypatch.setattr(nodes, "get_structured_llm", structured_llm)
+    monkeypatch.setattr(nodes, "get_llm", lambda *_: drafter_llm)
+    monkeypatch.setattr(nodes, "_query_knowledge_base", knowledge_base)
+
+    async def scenario():
+        store = CheckpointStore()
+        await store.open()
+        try:
+            config = ticket_config(7, "user@example.com")
+            try:
+                await run_ticket_graph(7, "VPN not connecting", config)
+                raise AssertionError("drafter failure should fail the run")
+            except TimeoutError:
+                pass
+
+            saved = await store.saved_run(config)
+            assert saved.next == ("drafter",)
+            assert saved.values["category"] == "Network"
+
+            final_state = await run_ticket_graph(7, "VPN not connecting", config, saved)
+            assert final_state["draft_response"] == "Restart the VPN client."
+            assert final_state["retrieved_docs"] == ["VPN guide"]
+
+            # Finished runs are reused as-is, then dropped once persisted
+            saved = await store.saved_run(config)
+            assert saved.next == ()
+            assert (await run_ticket_graph(7, "VPN not connecting", config, saved))["draft_response"] == "Restart the VPN client."
+            await store.discard(7)
+            assert await store.saved_run(config) is None
+        finally:
+            await store.close()
+
+    asyncio.run(scenario())
+    # Triage and retrieval ran once; only the drafter was repeated
+    assert calls == {"triage": 1, "research": 1}
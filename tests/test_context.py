@@ -0,0 +1,44 @@
+from app.agents.context import build_context, estimate_tokens, split_sentences
+
+# Adjacent chunks overlap, as RecursiveCharacterTextSplitter produces them at seed time
+DOCS = [
+    "The VPN client must be updated monthly. Open the portal at vpn.example.com. "
+    "Sign in with your SSO account. Restart the laptop after the install.",
+    "n with your SSO account. Restart the laptop after the install. "
+    "If error 0x800704cf appears, reset the network adapter from Settings.",
+    "Printer toner is ordered through facilities. Allow two days for delivery.",
+]
+
+def test_overlap_is_deduplicated_and_unrelated_chunks_dropped():
+    context = build_context("VPN error 0x800704cf", DOCS, budget_tokens=1000)
+    assert context.text.count("Restart the laptop after the install.") == 1
+    assert context.text.count("with your SSO account") == 1
+    assert "Printer toner" not in context.text
+    assert context.chunks_dropped == 1
+    assert context.tokens < context.source_tokens
+
+def test_tight_budget_keeps_the_most_relevant_sentences_in_order():
+    context = build_context("VPN error 0x800704cf", DOCS, budget_tokens=40)
+    assert context.tokens <= 40
+    assert "0x800704cf" in context.text
+    sentences = split_sentences(context.text)
+    positions = [" ".join(DOCS).index(s) for s in sentences]
+    assert positions == sorted(positions)
+
+def test_top_hit_is_kept_without_lexical_overlap():
+    # Dense-only matches share no words with the query, but still reach the prompt
+    context = build_context("my screen stays black", DOCS[2:], budget_tokens=1000)
+    assert context.text.startswith("Printer toner")
+    assert estimate_tokens("abcd" * 10) == 10
+
+def test_dedupe_keeps_distinct_sentences_that_share_words():
+    docs = [
+        "Restart the VPN client and sign in again. Contact the service desk if it fails.",
+        "Restart the VPN client. Sign in again. Contact the serv",
+        "e service desk if it fails.",
+    ]
+    context = build_context("VPN sign in", docs, budget_tokens=1000, min_relative_score=0)
+    # Substrings of a longer sentence are still distinct sentences
+    assert "Restart the VPN client." in context.text and "Sign in again." in context.text
+    # Fragments cut at either chunk edge are dropped
+    assert context.text.count("serv") == 1
@@ -0,0 +1,65 @@
+from typing import List
+from langchain_core.embeddings import Embeddings
+from app.agents import embeddings
+from app.agents.embeddings import EmbeddingCache, CachedEmbeddings
+
+class CountingEmbeddings(Embeddings):
+    def __init__(self):
+        self.calls: List[str] = []
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        self.calls.extend(texts)
+        return [[float(len(t)), 0.5] for t in texts]
+
+    def embed_query(self, text: str) -> List[float]:
+        self.calls.append(text)
+        return [float(len(text)), 1.5]
+
+def test_cache_hits_survive_restart_and_normalize_text(tmp_path):
+    path = str(tmp_path / "cache.sqlite3")
+    underlying = CountingEmbeddings()
+    cached = CachedEmbeddings(underlying, "test-model", EmbeddingCache(path, max_entries=100, memory_entries=10))
+
+    first = cached.embed_documents(["Reset password", "VPN not connecting", "Reset password"])
+    assert underlying.calls == ["Reset password", "VPN not connecting"]
+    assert first[0] == first[2]
+
+    # Case and whitespace differences hit the same entry
+    assert cached.embed_query("VPN not connecting") == [18.0, 1.5]
+    assert cached.embed_query("  vpn   NOT connecting ") == [18.0, 1.5]
+    assert len(underlying.calls) == 3
+    cached.cache.close()
+
+    # A fresh process reads vectors back from disk as float32
+    reopened = CachedEmbeddings(underlying, "test-model", EmbeddingCache(path, max_entries=100, memory_entries=10))
+    assert reopened.embed_documents(["VPN not connecting"]) == [[18.0, 0.5]]
+    assert len(underlying.calls) == 3
+    assert reopened.cache.stats()["disk_hits"] == 1
+
+    # Another model never shares vectors
+    other = CachedEmbeddings(underlying, "other-model", reopened.cache)
+    other.embed_documents(["VPN not connecting"])
+    assert len(underlying.calls) == 4
+
+def test_disk_entries_are_bounded(tmp_path):
+    cache = EmbeddingCache(str(tmp_path / "cache.sqlite3"), max_entries=3, memory_entries=1)
+    for i in range(5):
+        cache.put_many("m", [f"text {i}"], [[float(i)]])
+    found = cache.get_many("m", [f"text {i}" for i in range(5)])
+    assert sorted(found) == [2, 3, 4]
+
+def test_memory_hits_keep_vectors_on_disk(tmp_path, monkeypatch):
+    clock = iter(range(1000))
+    monkeypatch.setattr(embeddings.time, "time", lambda: float(next(clock)))
+    path = str(tmp_path / "cache.sqlite3")
+    cache = EmbeddingCache(path, max_entries=3, memory_entries=10)
+    for i in range(3):
+        cache.put_many("m", [f"text {i}"], [[float(i)]])
+    # "text 0" is hot, but only ever served from memory
+    assert cache.get_many("m", ["text 0"]) == {0: [0.0]}
+    cache.put_many("m", ["text 3", "text 4"], [[3.0], [4.0]])
+    cache.close()
+
+    reopened = EmbeddingCache(path, max_entries=3, memory_entries=10)
+    assert sorted(reopened.get_many("m", [f"text {i}" for i in range(5)])) == [0, 3, 4]
+    assert reopened._rows == 3
@@ -0,0 +1,66 @@
+import asyncio
+import json
+import logging
+from langchain_core.output_parsers import JsonOutputParser
+from fastapi.testclient import TestClient
+from app.agents import nodes
+from app.agents.graph import graph
+from app.agents.nodes import TriageOutput
+from app.agents.worker import agent_log_values, initial_state_for
+from app.core.config import settings
+from app.core.logs import JsonFormatter
+from app.main import app
+from tests.fakes import SleepyChatModel, StreamingChatModel
+
+TOKEN_DELAY = 0.02
+DRAFT = "Restart the VPN client and sign in again."
+
+def _patch_nodes(monkeypatch):
+    monkeypatch.setattr(settings, "TRIAGE_FAST_PATH_ENABLED", False)
+    # One drafter slot: the second ticket has to queue for it
+    monkeypatch.setattr(settings, "DRAFTER_CONCURRENCY", 1)
+    triage_llm = SleepyChatModel(reply=json.dumps({"category": "Network", "priority": "High"}), delay=0)
+    parser = JsonOutputParser(pydantic_object=TriageOutput)
+    monkeypatch.setattr(nodes, "get_structured_llm", lambda *_: (triage_llm, parser, parser.get_format_instructions()))
+    monkeypatch.setattr(nodes, "get_llm", lambda *_: StreamingChatModel(reply=DRAFT, delay=TOKEN_DELAY))
+    monkeypatch.setattr(nodes, "_query_knowledge_base", lambda query: [
+        {"text": "VPN guide", "category": "Network"},
+        {"text": "Password reset", "category": "Access"},
+        {"text": "Service desk hours", "category": "General"},
+    ])
+
+def test_every_node_is_measured_and_stored_with_the_log(monkeypatch):
+    _patch_nodes(monkeypatch)
+
+    async def run_two():
+        return await asyncio.gather(*(graph.ainvoke(initial_state_for(i, f"VPN down #{i}")) for i in range(2)))
+
+    states = asyncio.run(run_two())
+    for state in states:
+        metrics = state["node_metrics"]
+        assert set(metrics) == {"triage", "research", "rerank", "drafter", "quality_gate"}
+        assert all(m["wall_ms"] >= 0 for m in metrics.values())
+        assert metrics["triage"]["llm_calls"] == 1 and metrics["triage"]["prompt_tokens"] > 0
+        assert metrics["research"]["retrieval_hits"] == 3
+        assert metrics["rerank"]["retrieval_hits"] == 2
+        assert metrics["drafter"]["completion_tokens"] > 0
+        assert metrics["drafter"]["prompt_tokens"] == state["prompt_tokens"]
+        assert agent_log_values(1, state)["node_metrics"] == metrics
+
+    # The drafter that lost the race for the single slot waited for the other's generation
+    waits = sorted(s["node_metrics"]["drafter"]["queue_wait_ms"] for s in states)
+    generation_ms = TOKEN_DELAY * len(DRAFT.split(" ")) * 1000
+    assert waits[0] < generation_ms / 2 and waits[1] >= generation_ms / 2
+
+    body = TestClient(app).get("/metrics").text
+    assert 'agent_node_duration_seconds_count{node="drafter"}' in body
+    assert 'agent_node_queue_wait_seconds_bucket{le="0.005",node="triage"}' in body
+    assert 'agent_retrieval_hits_count{node="research"}' in body
+
+def test_json_log_lines_carry_extra_fields():
+    record = logging.LogRecord("app.agents.worker", logging.INFO, __file__, 1, "ticket processed", None, None)
+    record.ticket_id = 7
+    record.status = "Resolved"
+    entry = json.loads(JsonFormatter().format(record))
+    assert entry["msg"] == "ticket processed" and entry["level"] == "INFO"
+    assert entry["ticket_id"] == 7 and entry["status"] == "Resolved"
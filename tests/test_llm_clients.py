@@ -0,0 +1,62 @@
+import asyncio
+import time
+from langchain_core.messages import HumanMessage
+from app.agents import llm_engine, nodes
+from app.agents.nodes import TriageOutput
+from app.core.config import settings
+from tests.fakes import FakeOllamaServer, route_to
+
+def test_clients_are_shared_and_reuse_pooled_connections(monkeypatch):
+    async def scenario():
+        async with FakeOllamaServer(reply="ok", delay=0) as server:
+            route_to(monkeypatch, server)
+            monkeypatch.setattr(settings, "LLM_DEDUP_ENABLED", False)
+
+            assert llm_engine.get_llm() is llm_engine.get_llm()
+            llm, parser, _ = llm_engine.get_structured_llm(TriageOutput)
+            assert llm is llm_engine.get_llm("triage")
+            assert parser is llm_engine.get_structured_llm(TriageOutput)[1]
+
+            for i in range(20):
+                await llm_engine.get_llm().ainvoke([HumanMessage(content=f"ticket {i}")])
+            assert len(server.requests) == 20
+            # Sequential calls ride one keep-alive connection
+            assert len(server.connections) == 1
+
+            await llm_engine.close_llm_clients()
+            assert llm_engine._clients == {}
+
+    asyncio.run(scenario())
+
+def test_nodes_use_their_own_models_and_slots(monkeypatch):
+    monkeypatch.setattr(settings, "TRIAGE_FAST_PATH_ENABLED", False)
+    monkeypatch.setattr(settings, "LLM_DEDUP_ENABLED", False)
+    monkeypatch.setattr(settings, "TRIAGE_MODEL", "tiny")
+    monkeypatch.setattr(settings, "DRAFTER_MODEL", "large")
+    monkeypatch.setattr(settings, "DRAFTER_CONCURRENCY", 1)
+
+    async def timed(coro):
+        start = time.perf_counter()
+        result = await coro
+        return result, time.perf_counter() - start
+
+    async def scenario():
+        async with FakeOllamaServer(reply='{"category": "Network", "priority": "High"}', delay=0.2) as server:
+            route_to(monkeypatch, server, max_concurrency=8)
+            drafts = [nodes.drafter_node({"user_query": f"q{i}", "retrieved_docs": ["doc"]}) for i in range(3)]
+            results = await asyncio.gather(*(timed(d) for d in drafts), timed(nodes.triage_node({"user_query": "VPN down"})))
+            await llm_engine.close_llm_clients()
+            return server.requests, results
+
+    requests, results = asyncio.run(scenario())
+    (triage, triage_elapsed) = results[-1]
+    assert triage["category"] == "Network" and triage["triage_tier"] == "llm"
+    # Drafts run one at a time, triage doesn't queue behind them
+    assert max(elapsed for _, elapsed in results[:3]) >= 0.55
+    assert triage_elapsed < 0.4
+
+    by_model = {r["model"]: r for r in requests}
+    assert by_model["tiny"]["format"] == "json"
+    assert by_model["tiny"]["options"]["num_predict"] == settings.TRIAGE_NUM_PREDICT
+    assert by_model["large"]["format"] is None
+    assert by_model["large"]["options"]["num_ctx"] == settings.DRAFTER_NUM_CTX
@@ -0,0 +1,84 @@
+import asyncio
+from langchain_core.messages import HumanMessage
+from app.agents import llm_engine, nodes
+from app.agents.instrumentation import instrumented
+from app.agents.llm_engine import LLMCallCache
+from app.agents.worker import initial_state_for
+from app.core.config import settings
+from tests.fakes import FakeOllamaServer, route_to
+
+def _use_server(monkeypatch, server: FakeOllamaServer, ttl: float = 30.0) -> LLMCallCache:
+    cache = LLMCallCache(ttl_seconds=ttl, max_entries=16)
+    monkeypatch.setattr(llm_engine, "llm_cache", cache)
+    route_to(monkeypatch, server)
+    monkeypatch.setattr(settings, "LLM_DEDUP_ENABLED", True)
+    return cache
+
+def test_concurrent_identical_prompts_share_one_request(monkeypatch):
+    async def scenario():
+        async with FakeOllamaServer(reply="Restart the VPN client.", delay=0.2) as server:
+            cache = _use_server(monkeypatch, server)
+            prompt = [HumanMessage(content="VPN is down")]
+            replies = await asyncio.gather(*(llm_engine.get_llm().ainvoke(prompt) for _ in range(10)))
+            assert {r.content for r in replies} == {"Restart the VPN client."}
+            assert {r.response_metadata["eval_count"] for r in replies} == {4}
+            assert len(server.requests) == 1
+            assert cache.stats()["coalesced"] == 9
+
+            # Finished result is reused within the TTL, including for streaming callers
+            chunks = [c async for c in llm_engine.get_llm().astream(prompt)]
+            assert "".join(c.content for c in chunks) == "Restart the VPN client."
+            assert [c.response_metadata.get("eval_count") for c in chunks if c.response_metadata] == [4]
+            assert len(server.requests) == 1
+
+            await llm_engine.get_llm().ainvoke([HumanMessage(content="Printer jammed")])
+            assert len(server.requests) == 2
+            await llm_engine.close_llm_clients()
+            return cache.stats()
+
+    stats = asyncio.run(scenario())
+    assert (stats["hits"], stats["coalesced"], stats["misses"]) == (1, 9, 2)
+    assert stats["in_flight"] == 0
+
+def test_streaming_leader_feeds_followers_and_errors_propagate(monkeypatch):
+    async def stream(prompt):
+        return "".join([c.content async for c in llm_engine.get_llm().astream(prompt)])
+
+    async def scenario():
+        async with FakeOllamaServer(reply="one two three", delay=0.1) as server:
+            cache = _use_server(monkeypatch, server, ttl=0)
+            prompt = [HumanMessage(content="draft")]
+            assert await asyncio.gather(stream(prompt), stream(prompt)) == ["one two three"] * 2
+            assert len(server.requests) == 1
+            # ttl=0 disables the result cache; only in-flight calls are shared
+            await stream(prompt)
+            assert len(server.requests) == 2
+
+        # Server gone: the leader's failure reaches its follower, nothing stays in flight
+        results = await asyncio.gather(stream(prompt), stream(prompt), return_exceptions=True)
+        assert all(isinstance(r, Exception) for r in results)
+        assert cache.stats()["in_flight"] == 0
+        await llm_engine.close_llm_clients()
+
+    asyncio.run(scenario())
+
+def test_shared_results_keep_ollama_token_counts(monkeypatch):
+    monkeypatch.setattr(settings, "TRIAGE_FAST_PATH_ENABLED", False)
+    triage = instrumented("triage", nodes.triage_node)
+    reply = '{"category": "Network", "priority": "High"}'
+
+    async def scenario():
+        async with FakeOllamaServer(reply="unused", json_reply=reply, delay=0.1) as server:
+            _use_server(monkeypatch, server)
+            state = initial_state_for(1, "VPN is down")
+            # Leader and follower, then a result-cache hit
+            updates = await asyncio.gather(triage(state), triage(state))
+            updates.append(await triage(state))
+            assert len(server.requests) == 1
+            await llm_engine.close_llm_clients()
+            return updates
+
+    updates = asyncio.run(scenario())
+    assert {u["category"] for u in updates} == {"Network"}
+    # eval_count from Ollama, not the 4-characters-per-token estimate
+    assert [u["node_metrics"]["triage"]["completion_tokens"] for u in updates] == [len(reply.split(" "))] * 3
@@ -0,0 +1,47 @@
+import asyncio
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker, AsyncSession
+from app.agents import worker
+from app.agents.worker import TicketWorkerPool
+from app.models.sql_models import Base, Ticket, AgentLog, TicketStatus
+from scripts.load_test import percentiles, regressions
+
+def test_percentiles_use_nearest_rank():
+    stats = percentiles([float(i) for i in range(1, 101)])
+    assert (stats["p50"], stats["p95"], stats["p99"], stats["max"]) == (50.0, 95.0, 99.0, 100.0)
+    assert percentiles([])["p99"] == 0.0
+
+def test_regressions_flag_throughput_and_latency():
+    baseline = {"throughput_tickets_per_s": 10.0, "latency_ms": {"p50": 100.0, "p95": 200.0, "p99": 300.0}}
+    same = {"throughput_tickets_per_s": 9.5, "latency_ms": {"p50": 105.0, "p95": 210.0, "p99": 300.0}}
+    worse = {"throughput_tickets_per_s": 8.0, "latency_ms": {"p50": 100.0, "p95": 260.0, "p99": 300.0}}
+    assert regressions(same, baseline, 0.1) == []
+    assert len(regressions(worse, baseline, 0.1)) == 2
+
+def test_concurrent_claims_on_sqlite_hand_out_each_ticket_once(tmp_path, monkeypatch):
+    # SQLite has no SELECT ... FOR UPDATE SKIP LOCKED; the status guard must keep claims exclusive
+    engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'tickets.sqlite3'}")
+    sessions = async_sessionmaker(bind=engine, class_=AsyncSession, expire_on_commit=False)
+    monkeypatch.setattr(worker, "AsyncSessionLocal", sessions)
+    pool = TicketWorkerPool(concurrency=8, poll_interval=1.0, max_queue_depth=100)
+
+    async def scenario():
+        async with engine.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all)
+        async with sessions() as db:
+            db.add_all([Ticket(user_email="u@example.com", issue_description=f"VPN down #{i}") for i in range(5)])
+            db.add(AgentLog(ticket_id=1, rag_docs=["VPN guide"], node_metrics={"drafter": {"wall_ms": 1.0}}))
+            await db.commit()
+        claims = await asyncio.gather(*(pool._claim_next() for _ in range(8)))
+        async with sessions() as db:
+            statuses = (await db.execute(select(Ticket.status))).scalars().all()
+            log = (await db.execute(select(AgentLog))).scalars().one()
+        await engine.dispose()
+        return claims, statuses, log
+
+    claims, statuses, log = asyncio.run(scenario())
+    claimed_ids = [c[0] for c in claims if c is not None]
+    assert sorted(claimed_ids) == [1, 2, 3, 4, 5]
+    assert statuses == [TicketStatus.PROCESSING] * 5
+    # JSON columns fall back from JSONB to JSON off Postgres
+    assert log.rag_docs == ["VPN guide"] and log.node_metrics["drafter"]["wall_ms"] == 1.0
@@ -0,0 +1,54 @@
+import asyncio
+from langchain_core.messages import HumanMessage
+from app.agents import llm_engine
+from app.core.config import settings
+from tests.fakes import FakeOllamaServer, route_to
+
+def _prompt(i: int):
+    return [HumanMessage(content=f"ticket {i}")]
+
+def test_calls_spread_across_backends_within_caps(monkeypatch):
+    monkeypatch.setattr(settings, "LLM_DEDUP_ENABLED", False)
+
+    async def scenario():
+        async with FakeOllamaServer(delay=0.1) as a, FakeOllamaServer(delay=0.1) as b:
+            router = route_to(monkeypatch, a, b, max_concurrency=2)
+            llm = llm_engine.get_llm()
+            await asyncio.gather(*(llm.ainvoke(_prompt(i)) for i in range(8)))
+            assert len(a.requests) == len(b.requests) == 4
+            assert a.max_in_flight <= 2 and b.max_in_flight <= 2
+            stats = router.stats()
+            assert [s["requests"] for s in stats] == [4, 4]
+            assert all(s["latency_ms"] is not None and s["queue_depth"] == 0 for s in stats)
+            await llm_engine.close_llm_clients()
+
+    asyncio.run(scenario())
+
+def test_failed_backend_is_retried_elsewhere_and_circuit_opens(monkeypatch):
+    monkeypatch.setattr(settings, "LLM_DEDUP_ENABLED", False)
+
+    async def scenario():
+        async with FakeOllamaServer(reply="from good") as good, FakeOllamaServer() as bad:
+            bad.status = 500
+            router = route_to(monkeypatch, bad, good, failure_threshold=2, cooldown=60)
+            llm = llm_engine.get_llm()
+            for i in range(4):
+                reply = await llm.ainvoke(_prompt(i))
+                assert reply.content == "from good"
+            # Two failures opened the circuit, later calls skip the bad backend
+            assert len(bad.requests) == 2
+            assert router.stats()[0]["circuit"] == "open"
+
+            # The health probe sees it recover and lets a trial request through
+            bad.status = 200
+            await router.probe()
+            assert router.stats()[0]["circuit"] == "half_open"
+            await asyncio.gather(*(llm.ainvoke(_prompt(i)) for i in range(4, 8)))
+            assert router.stats()[0]["circuit"] == "closed"
+
+            good.status = 503
+            await router.probe()
+            assert router.stats()[1]["healthy"] is False
+            await llm_engine.close_llm_clients()
+
+    asyncio.run(scenario())
@@ -0,0 +1,172 @@
+import asyncio
+import json
+from typing import Any
+from langchain_core.messages import AIMessage
+from langchain_core.output_parsers import JsonOutputParser
+from langchain_core.outputs import ChatGeneration, ChatResult
+from app.agents import nodes, worker
+from app.agents.graph import graph
+from app.agents.nodes import TriageOutput
+from app.agents.scheduler import PriorityScheduler
+from app.agents.worker import TicketWorkerPool, agent_log_values, initial_state_for
+from app.core.config import settings
+from app.models.sql_models import Ticket
+from tests.fakes import SleepyChatModel, StreamingChatModel, sqlite_sessions
+
+async def _hold(scheduler: PriorityScheduler, priority: str, order: list, release: asyncio.Event):
+    async with scheduler.slot(priority):
+        order.append(priority)
+        await release.wait()
+
+async def _until(condition):
+    while not condition():
+        await asyncio.sleep(0.01)
+
+def test_waiting_drafts_are_admitted_by_priority(monkeypatch):
+    monkeypatch.setattr(settings, "DRAFTER_CONCURRENCY", 1)
+    scheduler = PriorityScheduler()
+
+    async def scenario():
+        order, release = [], asyncio.Event()
+        release.set()
+        blocker = asyncio.Event()
+        first = asyncio.create_task(_hold(scheduler, "Low", order, blocker))
+        await asyncio.sleep(0)
+        # Queue up in the worst order while the only slot is busy
+        waiters = []
+        for priority in ("Low", "Medium", "High", "Medium"):
+            waiters.append(asyncio.create_task(_hold(scheduler, priority, order, release)))
+            await asyncio.sleep(0)
+        # A cancelled waiter must not take (or leak) a slot
+        cancelled = asyncio.create_task(_hold(scheduler, "High", order, release))
+        await asyncio.sleep(0)
+        cancelled.cancel()
+        assert scheduler.waiting() == 5
+        blocker.set()
+        await asyncio.gather(first, *waiters)
+        return order
+
+    order = asyncio.run(scenario())
+    assert order == ["Low", "High", "Medium", "Medium", "Low"]
+    assert scheduler.running == 0
+    stats = scheduler.stats()
+    assert stats["High"]["admitted"] == 1 and stats["Medium"]["admitted"] == 2 and stats["Low"]["admitted"] == 2
+    assert stats["Low"]["max_wait_ms"] > 0
+
+def test_overdue_low_drafts_are_admitted_before_new_high_ones(monkeypatch):
+    monkeypatch.setattr(settings, "DRAFTER_CONCURRENCY", 1)
+    monkeypatch.setattr(settings, "DRAFTER_MAX_WAIT_SECONDS", 0.05)
+    scheduler = PriorityScheduler()
+
+    async def scenario():
+        order, release = [], asyncio.Event()
+        release.set()
+        blocker = asyncio.Event()
+        first = asyncio.create_task(_hold(scheduler, "High", order, blocker))
+        await asyncio.sleep(0)
+        low = asyncio.create_task(_hold(scheduler, "Low", order, release))
+        await asyncio.sleep(0.1)
+        # Fresh High tickets keep arriving after the Low one is overdue
+        highs = [asyncio.create_task(_hold(scheduler, "High", order, release)) for _ in range(2)]
+        await asyncio.sleep(0)
+        blocker.set()
+        await asyncio.gather(first, low, *highs)
+        return order
+
+    assert asyncio.run(scenario()) == ["High", "Low", "High", "High"]
+
+def test_low_tickets_are_shed_to_review_under_overload(monkeypatch):
+    monkeypatch.setattr(settings, "DRAFTER_CONCURRENCY", 1)
+    monkeypatch.setattr(settings, "DRAFTER_SHED_QUEUE_DEPTH", 2)
+    monkeypatch.setattr(settings, "TRIAGE_FAST_PATH_ENABLED", False)
+    scheduler = PriorityScheduler()
+    monkeypatch.setattr(nodes, "drafter_scheduler", scheduler)
+    triage_llm = SleepyChatModel(reply=json.dumps({"category": "Access", "priority": "Low"}), delay=0)
+    parser = JsonOutputParser(pydantic_object=TriageOutput)
+    monkeypatch.setattr(nodes, "get_structured_llm", lambda *_: (triage_llm, parser, parser.get_format_instructions()))
+    monkeypatch.setattr(nodes, "get_llm", lambda *_: SleepyChatModel(reply="Reset it in the portal.", delay=0))
+    monkeypatch.setattr(nodes, "_query_knowledge_base", lambda query: [{"text": "Password reset guide", "category": "Access"}])
+
+    async def scenario():
+        order, release = [], asyncio.Event()
+        # One draft running, two waiting: the drafter is overloaded
+        busy = [asyncio.create_task(_hold(scheduler, p, order, release)) for p in ("High", "High", "Medium")]
+        await asyncio.sleep(0)
+        assert scheduler.should_shed("High") is False
+        shed_state = await graph.ainvoke(initial_state_for(1, "Forgot my password"))
+        release.set()
+        await asyncio.gather(*busy)
+        # Backlog drained: Low tickets are drafted again
+        drafted_state = await graph.ainvoke(initial_state_for(2, "Forgot my password again"))
+        return shed_state, drafted_state
+
+    shed_state, drafted_state = asyncio.run(scenario())
+    assert shed_state["shed"] is True and shed_state["draft_response"] == ""
+    assert shed_state["needs_human_review"] is True
+    assert shed_state["retrieved_docs"] == ["Password reset guide"]
+    assert agent_log_values(1, shed_state)["response"] is None
+    assert scheduler.stats()["Low"]["shed"] == 1
+
+    assert drafted_state["shed"] is False and drafted_state["draft_response"] == "Reset it in the portal."
+
+class _KeywordTriageModel(SleepyChatModel):
+    """
+    Triage LLM that rates outages High and everything else Low.
+    """
+    async def _agenerate(self, messages, stop=None, run_manager=None, **kwargs):
+        priority = "High" if "outage" in messages[-1].content else "Low"
+        return ChatResult(generations=[ChatGeneration(message=AIMessage(
+            content=json.dumps({"category": "Network", "priority": priority})
+        ))])
+
+class _RecordingDrafter(StreamingChatModel):
+    """
+    Records the prompts it drafts for; the first draft holds its slot until `gate` is set.
+    """
+    started: list
+    gate: Any = None
+
+    async def _astream(self, messages, stop=None, run_manager=None, **kwargs):
+        self.started.append(messages[-1].content)
+        if len(self.started) == 1:
+            await self.gate.wait()
+        async for chunk in super()._astream(messages, stop, run_manager, **kwargs):
+            yield chunk
+
+def test_worker_backlog_reaches_the_drafter_queue_in_priority_order(tmp_path, monkeypatch):
+    # With the defaults, enough tickets get past triage to fill the drafter queue up to its shed depth
+    assert settings.WORKER_CONCURRENCY > settings.DRAFTER_CONCURRENCY + settings.DRAFTER_SHED_QUEUE_DEPTH
+    monkeypatch.setattr(settings, "DRAFTER_CONCURRENCY", 1)
+    monkeypatch.setattr(settings, "LOAD_SHEDDING_ENABLED", False)
+    monkeypatch.setattr(settings, "TRIAGE_FAST_PATH_ENABLED", False)
+    monkeypatch.setattr(settings, "CHECKPOINT_BACKEND", "none")
+    scheduler = PriorityScheduler()
+    monkeypatch.setattr(nodes, "drafter_scheduler", scheduler)
+    parser = JsonOutputParser(pydantic_object=TriageOutput)
+    monkeypatch.setattr(nodes, "get_structured_llm", lambda *_: (_KeywordTriageModel(delay=0), parser, parser.get_format_instructions()))
+    drafter = _RecordingDrafter(reply="Restart the VPN client now please.", delay=0, started=[])
+    monkeypatch.setattr(nodes, "get_llm", lambda *_: drafter)
+    monkeypatch.setattr(nodes, "_query_knowledge_base", lambda query: [{"text": "VPN guide", "category": "Network"}])
+    # Oldest first: four routine tickets, then an outage
+    texts = [f"VPN slow for me #{i}" for i in range(4)] + ["Company-wide VPN outage"]
+
+    async def scenario():
+        drafter.gate = asyncio.Event()
+        engine, sessions = await sqlite_sessions(tmp_path / "tickets.sqlite3")
+        monkeypatch.setattr(worker, "AsyncSessionLocal", sessions)
+        async with sessions() as db:
+            db.add_all([Ticket(user_email="u@example.com", issue_description=text) for text in texts])
+            await db.commit()
+        pool = TicketWorkerPool(concurrency=len(texts) + 1, poll_interval=0.05, max_queue_depth=100)
+        await pool.start()
+        # Every ticket but the one drafting reaches the drafter queue (none waits in the database)
+        await asyncio.wait_for(_until(lambda: scheduler.waiting() == len(texts) - 1), timeout=10)
+        drafter.gate.set()
+        await asyncio.wait_for(_until(lambda: len(drafter.started) == len(texts) and not pool.in_flight), timeout=10)
+        await pool.stop()
+        await engine.dispose()
+
+    asyncio.run(scenario())
+    order = [next(i for i, text in enumerate(texts) if text in prompt) for prompt in drafter.started]
+    # Only the ticket already holding the slot goes before the outage
+    assert order.index(4) <= 1 and sorted(order) == list(range(len(texts)))
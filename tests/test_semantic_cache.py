@@ -0,0 +1,40 @@
+from app.agents.semantic_cache import SemanticCache, CachedResolution
+
+def _resolution(ticket_id: int, response: str = "Restart the VPN client.") -> CachedResolution:
+    return CachedResolution(
+        source_ticket_id=ticket_id,
+        category="Network",
+        priority="High",
+        rag_docs=["VPN guide"],
+        response=response,
+        confidence_score=0.9
+    )
+
+def test_lookup_respects_threshold():
+    cache = SemanticCache(threshold=0.95, ttl_seconds=60, max_entries=10)
+    cache.store([1.0, 0.0, 0.0], _resolution(1))
+
+    hit = cache.lookup([0.99, 0.05, 0.0])
+    assert hit is not None and hit.source_ticket_id == 1
+    assert cache.lookup([0.5, 0.5, 0.0]) is None
+    assert cache.stats() == {"hits": 1, "misses": 1, "entries": 1}
+
+def test_ttl_size_and_version_eviction():
+    version = {"value": 1}
+    cache = SemanticCache(threshold=0.9, ttl_seconds=60, max_entries=2, version_fn=lambda: version["value"])
+    cache.store([1.0, 0.0], _resolution(1))
+    cache.store([0.0, 1.0], _resolution(2))
+    cache.store([0.7, 0.7], _resolution(3))
+    # Oldest entry evicted beyond max_entries
+    assert cache.lookup([1.0, 0.0]) is None
+    assert cache.lookup([0.0, 1.0]).source_ticket_id == 2
+
+    # Re-seeding the knowledge base invalidates everything
+    version["value"] = 2
+    assert cache.lookup([0.0, 1.0]) is None
+    assert cache.stats()["entries"] == 0
+
+    # Expired entries are never returned
+    expired = SemanticCache(threshold=0.9, ttl_seconds=0, max_entries=2)
+    expired.store([1.0, 0.0], _resolution(4))
+    assert expired.lookup([1.0, 0.0]) is None
@@ -0,0 +1,85 @@
+import asyncio
+import json
+import time
+from langchain_core.output_parsers import JsonOutputParser
+from sqlalchemy import select
+from app.agents import nodes, worker
+from app.core.config import settings
+from app.agents.nodes import TriageOutput
+from app.agents.streaming import stream_graph_events, format_sse
+from app.agents.worker import initial_state_for
+from app.api import routes
+from app.api.routes import TicketRequest
+from app.models.sql_models import Ticket, TicketStatus
+from tests.fakes import SleepyChatModel, StreamingChatModel, sqlite_sessions
+
+TOKEN_DELAY = 0.05
+DRAFT = "Please restart the VPN client and sign in again at vpn.example.com today."
+
+def _patch_nodes(monkeypatch):
+    # Force the LLM triage path
+    monkeypatch.setattr(settings, "TRIAGE_FAST_PATH_ENABLED", False)
+    triage_llm = SleepyChatModel(reply=json.dumps({"category": "Network", "priority": "High"}), delay=0.01)
+    parser = JsonOutputParser(pydantic_object=TriageOutput)
+    monkeypatch.setattr(nodes, "get_structured_llm", lambda *_: (triage_llm, parser, parser.get_format_instructions()))
+    monkeypatch.setattr(nodes, "get_llm", lambda *_: StreamingChatModel(reply=DRAFT, delay=TOKEN_DELAY))
+    monkeypatch.setattr(nodes, "_query_knowledge_base", lambda query: [{"text": "VPN guide", "category": "Network"}])
+
+def test_events_arrive_in_order_and_tokens_stream(monkeypatch):
+    _patch_nodes(monkeypatch)
+
+    async def collect():
+        start = time.perf_counter()
+        events = []
+        async for event, payload in stream_graph_events(initial_state_for(1, "VPN not connecting"), {}):
+            events.append((event, payload, time.perf_counter() - start))
+        return events
+
+    events = asyncio.run(collect())
+    names = [e[0] for e in events]
+    tokens = [e for e in events if e[0] == "token"]
+
+    assert names[0] == "triage" and events[0][1] == {"category": "Network", "priority": "High", "triage_tier": "llm"}
+    assert names[1] == "docs" and events[1][1] == {"retrieved_docs": ["VPN guide"]}
+    assert names[-2:] == ["verdict", "state"]
+    assert "".join(t[1]["text"] for t in tokens) == DRAFT
+    assert len(tokens) == len(DRAFT.split(" "))
+
+    # The first token is delivered long before the whole draft is generated
+    full_generation = TOKEN_DELAY * len(tokens)
+    assert tokens[0][2] < full_generation / 2
+    assert events[-1][1]["draft_response"] == DRAFT
+    assert events[-1][1]["needs_human_review"] is False
+    # Prompt size and time to first token are recorded for the ticket
+    assert events[-1][1]["prompt_tokens"] > 0
+    assert TOKEN_DELAY * 1000 <= events[-1][1]["prefill_ms"] < full_generation * 1000
+
+def test_format_sse():
+    assert format_sse("token", {"text": "hi"}) == 'event: token\ndata: {"text": "hi"}\n\n'
+
+def test_abandoned_stream_marks_the_ticket_failed(tmp_path, monkeypatch):
+    _patch_nodes(monkeypatch)
+
+    async def scenario():
+        engine, sessions = await sqlite_sessions(tmp_path / "tickets.sqlite3")
+        monkeypatch.setattr(worker, "AsyncSessionLocal", sessions)
+        async with sessions() as db:
+            response = await routes.create_ticket_stream(TicketRequest(user_email="u@example.com", issue_description="VPN not connecting"), db)
+        received = []
+
+        async def client():
+            async for chunk in response.body_iterator:
+                received.append(chunk)
+
+        # Starlette cancels the response task when the client disconnects
+        task = asyncio.create_task(client())
+        while not any("event: token" in chunk for chunk in received):
+            await asyncio.sleep(0.01)
+        task.cancel()
+        await asyncio.gather(task, return_exceptions=True)
+        async with sessions() as db:
+            status = (await db.execute(select(Ticket.status))).scalar_one()
+        await engine.dispose()
+        return status
+
+    assert asyncio.run(scenario()) == TicketStatus.FAILED
@@ -0,0 +1,156 @@
+import asyncio
+from datetime import datetime, timedelta
+import httpx
+from fastapi import FastAPI
+from sqlalchemy import inspect, select
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker, AsyncSession
+from app.agents import batch, worker
+from app.agents.worker import agent_log_values, initial_state_for, worker_pool
+from app.api import routes
+from app.core.database import create_schema
+from app.models.sql_models import AgentLog, Ticket, TicketStatus
+from tests.fakes import sqlite_sessions
+
+def test_stats_bucket_hours_on_sqlite(tmp_path, monkeypatch):
+    monkeypatch.setattr(routes, "_stats_cache", {})
+    now = datetime.utcnow().replace(minute=30, second=0, microsecond=0)
+
+    async def scenario():
+        engine, sessions = await sqlite_sessions(tmp_path / "tickets.sqlite3")
+        async with sessions() as db:
+            db.add_all([
+                Ticket(user_email="u@example.com", issue_description="VPN down", created_at=now),
+                Ticket(user_email="u@example.com", issue_description="VPN down again", created_at=now + timedelta(minutes=10),
+                       status=TicketStatus.RESOLVED),
+                Ticket(user_email="u@example.com", issue_description="Printer jam", created_at=now - timedelta(hours=1)),
+            ])
+            await db.commit()
+            stats = await routes.ticket_stats(hours=24, db=db)
+        await engine.dispose()
+        return stats
+
+    stats = asyncio.run(scenario())
+    assert stats.total == 3 and stats.by_status == {"Open": 2, "Resolved": 1}
+    hour = now.replace(minute=0)
+    assert [(h.hour, h.count) for h in stats.by_hour] == [
+        ((hour - timedelta(hours=1)).isoformat(), 1), (hour.isoformat(), 2)
+    ]
+
+def test_upgrade_adds_columns_to_tables_from_an_older_version(tmp_path):
+    async def scenario():
+        engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'tickets.sqlite3'}")
+        async with engine.begin() as conn:
+            # agent_logs as the first release created it
+            await conn.exec_driver_sql(
+                "CREATE TABLE tickets (id INTEGER PRIMARY KEY, user_email VARCHAR, issue_description VARCHAR,"
+                " status VARCHAR(15), created_at DATETIME)"
+            )
+            await conn.exec_driver_sql(
+                "CREATE TABLE agent_logs (id INTEGER PRIMARY KEY, ticket_id INTEGER REFERENCES tickets(id),"
+                " category VARCHAR, rag_docs JSON, response VARCHAR, confidence_score FLOAT, created_at DATETIME)"
+            )
+        for _ in range(2):
+            async with engine.begin() as conn:
+                await conn.run_sync(create_schema)
+        sessions = async_sessionmaker(bind=engine, class_=AsyncSession, expire_on_commit=False)
+        async with sessions() as db:
+            db.add(Ticket(user_email="u@example.com", issue_description="VPN down"))
+            await db.flush()
+            db.add(AgentLog(**agent_log_values(1, {**initial_state_for(1, "VPN down"), "priority": "High",
+                                                   "node_metrics": {"drafter": {"wall_ms": 1.0}}})))
+            await db.commit()
+            log = (await db.execute(select(AgentLog))).scalars().one()
+        async with engine.connect() as conn:
+            indexes = await conn.run_sync(lambda c: {i["name"] for i in inspect(c).get_indexes("agent_logs")})
+        await engine.dispose()
+        return log, indexes
+
+    log, indexes = asyncio.run(scenario())
+    assert log.priority == "High" and log.from_cache is False and log.node_metrics == {"drafter": {"wall_ms": 1.0}}
+    assert "ix_agent_logs_ticket_id_created_at" in indexes
+
+class _FakeGraph:
+    """
+    Stands in for the agent graph in batch runs: tickets mentioning "crash" raise.
+    Records each ticket's claim time as its run starts.
+    """
+    def __init__(self, sessions):
+        self.sessions = sessions
+        self.claimed_at = {}
+
+    async def ainvoke(self, state, config):
+        async with self.sessions() as db:
+            self.claimed_at[state["ticket_id"]] = await db.scalar(
+                select(Ticket.claimed_at).where(Ticket.id == state["ticket_id"]))
+        if "crash" in state["user_query"]:
+            raise RuntimeError("Ollama timed out")
+        return {**state, "category": "Network", "priority": "High", "retrieved_docs": ["VPN guide"],
+                "draft_response": "Restart the VPN client.", "confidence_score": 0.9}
+
+def _api(sessions) -> httpx.AsyncClient:
+    app = FastAPI()
+    app.include_router(routes.router, prefix="/api/v1")
+
+    async def get_db():
+        async with sessions() as db:
+            yield db
+
+    app.dependency_overrides[routes.get_db] = get_db
+    return httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test/api/v1")
+
+def test_batch_isolates_ticket_failures_and_respects_backpressure(tmp_path, monkeypatch):
+    monkeypatch.setattr(worker_pool, "max_queue_depth", 4)
+    # The third ticket's log can't be stored, which fails the bulk write
+    log_values = batch.agent_log_values
+    monkeypatch.setattr(batch, "agent_log_values", lambda ticket_id, state: {
+        **log_values(ticket_id, state), **({"rag_docs": [object()]} if ticket_id == 3 else {})
+    })
+    tickets = [{"user_email": "u@example.com", "issue_description": text} for text in ("VPN down", "crash me", "VPN slow")]
+
+    async def scenario():
+        engine, sessions = await sqlite_sessions(tmp_path / "tickets.sqlite3")
+        monkeypatch.setattr(batch, "AsyncSessionLocal", sessions)
+        monkeypatch.setattr(worker, "AsyncSessionLocal", sessions)
+        monkeypatch.setattr(batch, "graph", fake_graph := _FakeGraph(sessions))
+        async with _api(sessions) as client:
+            done = (await client.post("/tickets/batch", json={"tickets": tickets, "wait": True})).json()
+            async with sessions() as db:
+                db.add_all([Ticket(user_email="u@example.com", issue_description="queued") for _ in range(3)])
+                await db.commit()
+            # 3 OPEN tickets waiting, room for one more
+            rejected = await client.post("/tickets/batch", json={"tickets": tickets[:2]})
+            async with sessions() as db:
+                statuses = dict((await db.execute(select(Ticket.id, Ticket.status).where(Ticket.id <= 3))).all())
+                logged = (await db.execute(select(AgentLog.ticket_id))).scalars().all()
+        await engine.dispose()
+        return done, rejected, statuses, logged, fake_graph.claimed_at
+
+    done, rejected, statuses, logged, claimed_at = asyncio.run(scenario())
+    # Each ticket's lease started with its own run
+    assert sorted(claimed_at) == [1, 2, 3] and all(claimed_at.values())
+    assert [(r["ticket_id"], r["status"]) for r in done["results"]] == [(1, "Resolved"), (2, "Failed"), (3, "Failed")]
+    assert done["results"][1]["error"] == "Ollama timed out" and done["results"][2]["error"]
+    assert statuses == {1: TicketStatus.RESOLVED, 2: TicketStatus.FAILED, 3: TicketStatus.FAILED}
+    assert logged == [1]
+    assert rejected.status_code == 503 and rejected.headers["Retry-After"] == "30"
+
+def test_stream_respects_backpressure(tmp_path, monkeypatch):
+    monkeypatch.setattr(worker_pool, "max_queue_depth", 1)
+
+    async def scenario():
+        engine, sessions = await sqlite_sessions(tmp_path / "tickets.sqlite3")
+        async with sessions() as db:
+            db.add(Ticket(user_email="u@example.com", issue_description="queued"))
+            await db.commit()
+        async with _api(sessions) as client:
+            rejected = await client.post("/tickets/stream", json={"user_email": "u@example.com",
+                                                                  "issue_description": "VPN down"})
+            async with sessions() as db:
+                count = len((await db.execute(select(Ticket.id))).all())
+        await engine.dispose()
+        return rejected, count
+
+    rejected, count = asyncio.run(scenario())
+    assert rejected.status_code == 503 and rejected.headers["Retry-After"] == "30"
+    # Nothing was created for the rejected request
+    assert count == 1
@@ -0,0 +1,78 @@
+import asyncio
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker, AsyncSession
+from app.agents import worker
+from app.agents.events import RESET, TicketEventBus, ticket_row
+from app.agents.worker import TicketWorkerPool
+from app.api import routes
+from app.models.sql_models import Base, Ticket, TicketStatus
+from dashboard.feed import TicketFeed, parse_sse
+
+def _row(ticket_id: int, status: TicketStatus = TicketStatus.OPEN):
+    return ticket_row(ticket_id, "u@example.com", f"VPN down #{ticket_id}", status)
+
+def test_reconnects_replay_missed_events_or_reset():
+    bus = TicketEventBus(buffer_size=3, queue_size=2)
+    for i in range(1, 4):
+        bus.created(_row(i))
+    assert [e.seq for e in bus.replay(f"{bus.epoch}-1")] == [2, 3]
+    assert bus.replay(bus.last_id) == [] and bus.replay(None) == []
+    bus.created(_row(4))
+    bus.created(_row(5))
+    # Event 2 has left the buffer, a different epoch is a restarted server
+    assert bus.replay(f"{bus.epoch}-1") is None
+    assert [e.seq for e in bus.replay(f"{bus.epoch}-2")] == [3, 4, 5]
+    assert bus.replay("deadbeef-4") is None
+
+    async def slow_subscriber():
+        async with bus.subscribe() as queue:
+            for i in range(6, 9):
+                bus.status_changed(_row(i, TicketStatus.PROCESSING))
+            return [queue.get_nowait() for _ in range(queue.qsize())]
+
+    # The queue overflowed: its backlog is replaced by a reset
+    assert asyncio.run(slow_subscriber()) == [RESET]
+    assert bus.subscribers == 0
+
+def test_dashboard_cache_follows_the_change_feed(tmp_path, monkeypatch):
+    engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'tickets.sqlite3'}")
+    sessions = async_sessionmaker(bind=engine, class_=AsyncSession, expire_on_commit=False)
+    monkeypatch.setattr(worker, "AsyncSessionLocal", sessions)
+    bus = TicketEventBus(buffer_size=100, queue_size=100)
+    monkeypatch.setattr(worker, "ticket_events", bus)
+    monkeypatch.setattr(routes, "ticket_events", bus)
+    pool = TicketWorkerPool(concurrency=1, poll_interval=1.0, max_queue_depth=100)
+    feed = TicketFeed("http://api", session=None)
+    # Stands in for the initial GET /tickets page
+    feed.resync = lambda: feed._tickets.update({1: {"id": 1, "status": "Open", "created_at": "2026-01-01T00:00:00"}})
+
+    async def scenario():
+        async with engine.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all)
+        async with sessions() as db:
+            db.add_all([Ticket(user_email="u@example.com", issue_description=f"VPN down #{i}") for i in range(2)])
+            await db.commit()
+        stream = (await routes.ticket_event_feed(after=None, last_event_id=None)).body_iterator
+        chunks = [await stream.__anext__()]
+        claimed = await pool._claim_next()
+        await worker.mark_failed(claimed[0])
+        chunks += [await stream.__anext__() for _ in range(2)]
+        await stream.aclose()
+        await engine.dispose()
+        return chunks
+
+    chunks = asyncio.run(scenario())
+    needs_resync = feed.consume(parse_sse("".join(chunks).splitlines()), needs_resync=True)
+    assert needs_resync is False
+    assert feed.last_event_id == f"{bus.epoch}-2"
+    [ticket] = feed.tickets(status="Failed")
+    # Status events update the cached row in place
+    assert ticket["id"] == 1 and ticket["issue_description"] == "VPN down #0"
+    assert feed.tickets(status="Open") == [] and bus.subscribers == 0
+
+def test_dashboard_cache_keeps_the_newest_page_of_each_status():
+    feed = TicketFeed("http://api", session=None, page_size=2)
+    for i in range(1, 5):
+        feed.apply("created", _row(i))
+    feed.apply("status", _row(1, TicketStatus.FAILED))
+    assert [t["id"] for t in feed.tickets(status="Open")] == [4, 3]
+    assert [t["id"] for t in feed.tickets()] == [4, 3, 1]
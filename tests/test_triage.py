@@ -0,0 +1,41 @@
+from typing import List
+from langchain_core.embeddings import Embeddings
+from app.agents.triage import rule_triage, CentroidClassifier
+
+VOCAB = ["vpn", "password", "invoice", "screen", "urgent"]
+
+class BagOfWordsEmbeddings(Embeddings):
+    """
+    Deterministic stand-in for Ollama: one dimension per vocabulary word.
+    """
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        return [self.embed_query(t) for t in texts]
+
+    def embed_query(self, text: str) -> List[float]:
+        words = text.lower().split()
+        return [float(words.count(w)) + 0.01 for w in VOCAB]
+
+def test_rules_decide_unambiguous_tickets():
+    decision = rule_triage("VPN keeps dropping, the whole office is affected - urgent")
+    assert (decision.category, decision.priority, decision.tier) == ("Network", "High", "rules")
+
+    assert rule_triage("How do I get a copy of my invoice?").priority == "Low"
+    assert rule_triage("Reset password").category == "Access"
+    # Ambiguous (Access + Billing) and unmatched tickets are left to later tiers
+    assert rule_triage("Cannot log in to the billing portal") is None
+    assert rule_triage("My screen flickers") is None
+
+def test_centroid_tier_classifies_close_tickets_and_abstains_otherwise():
+    classifier = CentroidClassifier(BagOfWordsEmbeddings(), min_similarity=0.8, margin=0.05)
+    classifier.fit([
+        {"text": "screen broken", "category": "General", "priority": "Medium"},
+        {"text": "screen flicker screen", "category": "General", "priority": "Medium"},
+        {"text": "vpn down urgent", "category": "Network", "priority": "High"},
+        {"text": "invoice wrong", "category": "Billing", "priority": "Low"},
+    ])
+
+    decision = classifier.classify("my screen is dim")
+    assert (decision.category, decision.priority, decision.tier) == ("General", "Medium", "centroid")
+    # Equidistant from several centroids: abstain so the LLM decides
+    assert classifier.classify("vpn invoice screen") is None
@@ -0,0 +1,166 @@
+import asyncio
+import contextlib
+import json
+from datetime import datetime, timedelta
+from langchain_core.output_parsers import JsonOutputParser
+from sqlalchemy import select
+from app.agents import nodes, worker
+from app.agents.checkpoints import ticket_config
+from app.agents.nodes import TriageOutput
+from app.agents.semantic_cache import SemanticCache
+from app.agents.worker import TicketWorkerPool
+from app.core.config import settings
+from app.models.sql_models import AgentLog, Ticket, TicketStatus
+from tests.fakes import FlakyChatModel, SleepyChatModel, sqlite_sessions
+
+async def _add_tickets(sessions, count: int):
+    async with sessions() as db:
+        db.add_all([Ticket(user_email="u@example.com", issue_description=f"VPN down #{i}") for i in range(count)])
+        await db.commit()
+
+async def _statuses(sessions):
+    async with sessions() as db:
+        return dict((await db.execute(select(Ticket.id, Ticket.status).order_by(Ticket.id))).all())
+
+def test_crashed_tickets_fail_and_stopped_runs_are_requeued(tmp_path, monkeypatch):
+    started = []
+
+    async def process_ticket(ticket_id, user_email, issue_description):
+        started.append(ticket_id)
+        if ticket_id == 1:
+            raise RuntimeError("database went away mid-persist")
+        await asyncio.Event().wait()
+
+    monkeypatch.setattr(worker, "process_ticket", process_ticket)
+
+    async def scenario():
+        engine, sessions = await sqlite_sessions(tmp_path / "tickets.sqlite3")
+        monkeypatch.setattr(worker, "AsyncSessionLocal", sessions)
+        await _add_tickets(sessions, 2)
+        pool = TicketWorkerPool(concurrency=1, poll_interval=0.05, max_queue_depth=100)
+        await pool.start()
+        while len(started) < 2:
+            await asyncio.sleep(0.01)
+        # The single worker survived ticket 1 and is busy with ticket 2
+        assert pool.in_flight == 1
+        await pool.stop()
+        statuses = await _statuses(sessions)
+        await engine.dispose()
+        return statuses
+
+    assert asyncio.run(scenario()) == {1: TicketStatus.FAILED, 2: TicketStatus.OPEN}
+
+def test_resolved_tickets_feed_the_semantic_cache_and_duplicates_replay(tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "SEMANTIC_CACHE_ENABLED", True)
+    monkeypatch.setattr(worker, "semantic_cache", SemanticCache(threshold=0.95, ttl_seconds=60, max_entries=10))
+    monkeypatch.setattr(worker.embedder, "embed_query", lambda text: [1.0, 0.0, 0.0])
+    runs = []
+
+    async def run_ticket_graph(ticket_id, issue_description, config, saved=None):
+        runs.append(ticket_id)
+        return {**worker.initial_state_for(ticket_id, issue_description), "category": "Access", "priority": "Low",
+                "triage_tier": "rules", "retrieved_docs": ["Password reset guide"],
+                "draft_response": "Reset it in the portal.", "confidence_score": 0.9}
+
+    monkeypatch.setattr(worker, "run_ticket_graph", run_ticket_graph)
+
+    async def scenario():
+        engine, sessions = await sqlite_sessions(tmp_path / "tickets.sqlite3")
+        monkeypatch.setattr(worker, "AsyncSessionLocal", sessions)
+        await _add_tickets(sessions, 2)
+        for ticket_id in (1, 2):
+            await worker.process_ticket(ticket_id, "u@example.com", "Forgot my password")
+        statuses = await _statuses(sessions)
+        async with sessions() as db:
+            logs = (await db.execute(select(AgentLog).order_by(AgentLog.ticket_id))).scalars().all()
+        await engine.dispose()
+        return statuses, logs
+
+    statuses, logs = asyncio.run(scenario())
+    assert runs == [1]
+    assert statuses == {1: TicketStatus.RESOLVED, 2: TicketStatus.RESOLVED}
+    assert [(log.from_cache, log.triage_tier, log.response) for log in logs] == [
+        (False, "rules", "Reset it in the portal."), (True, "rules", "Reset it in the portal.")
+    ]
+
+def test_runs_orphaned_by_a_restart_resume_from_their_checkpoint(tmp_path, monkeypatch):
+    calls = {"triage": 0}
+    parser = JsonOutputParser(pydantic_object=TriageOutput)
+    triage_llm = SleepyChatModel(reply=json.dumps({"category": "Network", "priority": "High"}), delay=0)
+    # The first drafter call dies with the "old process"
+    drafter_llm = FlakyChatModel(reply="Restart the VPN client.", delay=0)
+
+    def structured_llm(*_):
+        calls["triage"] += 1
+        return triage_llm, parser, parser.get_format_instructions()
+
+    monkeypatch.setattr(settings, "TRIAGE_FAST_PATH_ENABLED", False)
+    monkeypatch.setattr(settings, "CHECKPOINT_BACKEND", "sqlite")
+    monkeypatch.setattr(settings, "CHECKPOINT_SQLITE_PATH", str(tmp_path / "checkpoints.sqlite3"))
+    monkeypatch.setattr(nodes, "get_structured_llm", structured_llm)
+    monkeypatch.setattr(nodes, "get_llm", lambda *_: drafter_llm)
+    monkeypatch.setattr(nodes, "_query_knowledge_base", lambda query: [{"text": "VPN guide", "category": "Network"}])
+
+    async def scenario():
+        engine, sessions = await sqlite_sessions(tmp_path / "tickets.sqlite3")
+        monkeypatch.setattr(worker, "AsyncSessionLocal", sessions)
+        now = datetime.utcnow()
+        async with sessions() as db:
+            db.add_all([
+                Ticket(user_email="u@example.com", issue_description="VPN not connecting",
+                       status=TicketStatus.PROCESSING, claimed_at=now - timedelta(hours=2)),
+                # Still within its lease: another process may be running it
+                Ticket(user_email="u@example.com", issue_description="Printer jam",
+                       status=TicketStatus.PROCESSING, claimed_at=now),
+            ])
+            await db.commit()
+        await worker.checkpoints.open()
+        try:
+            with contextlib.suppress(TimeoutError):
+                await worker.run_ticket_graph(1, "VPN not connecting", ticket_config(1, "u@example.com"))
+            pool = TicketWorkerPool(concurrency=1, poll_interval=0.05, max_queue_depth=100, lease_seconds=3600)
+            await pool.start()
+            while (await _statuses(sessions))[1] in (TicketStatus.OPEN, TicketStatus.PROCESSING):
+                await asyncio.sleep(0.02)
+            await pool.stop()
+        finally:
+            await worker.checkpoints.close()
+        statuses = await _statuses(sessions)
+        async with sessions() as db:
+            log = (await db.execute(select(AgentLog))).scalars().one()
+        await engine.dispose()
+        return statuses, log
+
+    statuses, log = asyncio.run(scenario())
+    assert statuses[2] == TicketStatus.PROCESSING
+    assert log.ticket_id == 1 and log.response == "Restart the VPN client." and log.category == "Network"
+    # Resumed at the drafter: triage didn't run again
+    assert calls["triage"] == 1
+
+def test_leases_of_tickets_running_here_are_renewed_not_requeued(tmp_path, monkeypatch):
+    monkeypatch.setattr(worker, "running_tickets", {1})
+
+    async def scenario():
+        engine, sessions = await sqlite_sessions(tmp_path / "tickets.sqlite3")
+        monkeypatch.setattr(worker, "AsyncSessionLocal", sessions)
+        expired = datetime.utcnow() - timedelta(hours=2)
+        async with sessions() as db:
+            # A long run in this process, and one whose process is gone
+            db.add_all([Ticket(user_email="u@example.com", issue_description=f"VPN down #{i}",
+                               status=TicketStatus.PROCESSING, claimed_at=expired) for i in range(2)])
+            await db.commit()
+        pool = TicketWorkerPool(concurrency=1, poll_interval=60, max_queue_depth=100, lease_seconds=3600)
+        # Only the sweep runs, so the requeued ticket stays OPEN
+        task = asyncio.create_task(pool._lease_loop())
+        while (await _statuses(sessions))[2] == TicketStatus.PROCESSING:
+            await asyncio.sleep(0.02)
+        task.cancel()
+        async with sessions() as db:
+            claims = dict((await db.execute(select(Ticket.id, Ticket.claimed_at))).all())
+        statuses = await _statuses(sessions)
+        await engine.dispose()
+        return statuses, claims, expired
+
+    statuses, claims, expired = asyncio.run(scenario())
+    assert statuses == {1: TicketStatus.PROCESSING, 2: TicketStatus.OPEN}
+    assert claims[1] > expired and claims[2] is None